@@ -0,0 +1,206 @@
+import importlib
+from functools import cached_property
+
+
+class LazyImport:
+    #Модуль (или его атрибут), который импортируется при первом обращении
+
+    def __init__(self, module: str, attribute: str = None):
+        self._module = module
+        self._attribute = attribute
+        self._target = None
+
+    def _resolve(self):
+        if self._target is None:
+            target = importlib.import_module(self._module)
+            self._target = getattr(target, self._attribute) if self._attribute else target
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+
+class DeferredHandlers:
+    #Обработчики объявляются при импорте, а в aiogram регистрируются только при создании Dispatcher
+
+    def __init__(self):
+        self.registrations = []
+
+    def message(self, *filters, command: str = None):
+        def decorator(handler):
+            self.registrations.append(("message", handler, filters, command))
+            return handler
+        return decorator
+
+    def callback_query(self, *filters):
+        def decorator(handler):
+            self.registrations.append(("callback_query", handler, filters, None))
+            return handler
+        return decorator
+
+    def register(self, dp):
+        from aiogram.filters import Command
+        for kind, handler, filters, command in self.registrations:
+            handler_filters = [Command(command), *filters] if command else list(filters)
+            getattr(dp, kind).register(handler, *handler_filters)
+
+
+class AppContainer:
+    #Все тяжелые объекты бота создаются при первом обращении, а не при импорте main.py
+
+    def __init__(self, overrides: dict = None):
+        # Настройки поверх config.py (например, для рабочих процессов webhook-режима)
+        self.overrides = dict(overrides or {})
+        # Номер текущего каталога (растет при каждой горячей перезагрузке)
+        self.catalogue_version = 1
+
+    @cached_property
+    def config(self):
+        return importlib.import_module("config")
+
+    def setting(self, name: str, default=None):
+        if name in self.overrides:
+            return self.overrides[name]
+        return getattr(self.config, name, default)
+
+    @cached_property
+    def catalogue(self):
+        # Каталог (из снимка, если таблица не менялась): места, кнопки интересов, статистика и индекс интересов
+        return self.load_catalogue()
+
+    @property
+    def landmarks(self):
+        return self.catalogue.landmarks
+
+    @property
+    def interests(self):
+        return self.catalogue.interests
+
+    @cached_property
+    def route_optimizer(self):
+        return self.build_route_optimizer(self.catalogue)
+
+    @cached_property
+    def routing(self):
+        # Расчет маршрутов в пуле процессов (ROUTING_WORKERS=0 - в event loop, как раньше)
+        from routing_service import RoutingService
+        return RoutingService(
+            self.setting('CATALOGUE_PATH', 'cultural_objects_mnn.xlsx'),
+            self.setting('CATALOGUE_SNAPSHOT_PATH', 'cultural_objects_mnn.snapshot'),
+            workers=self.setting('ROUTING_WORKERS', 2),
+            max_queue=self.setting('ROUTING_MAX_QUEUE', 16),
+            timeout=self.setting('ROUTING_TIMEOUT', 3.0),
+            optimizer_options=self.route_optimizer_options()
+        )
+
+    def load_catalogue(self):
+        from catalogue_snapshot import load_catalogue
+        return load_catalogue(
+            self.setting('CATALOGUE_PATH', 'cultural_objects_mnn.xlsx'),
+            self.setting('CATALOGUE_SNAPSHOT_PATH', 'cultural_objects_mnn.snapshot')
+        )
+
+    def route_optimizer_options(self) -> dict:
+        # ROUTE_SOLVER: "rating" (топ по рейтингу, число мест по таблице) или "orienteering" (по бюджету времени)
+        return {
+            'solver': self.setting('ROUTE_SOLVER', 'rating'),
+            'solver_deadline_ms': self.setting('ROUTE_SOLVER_DEADLINE_MS', 50.0),
+        }
+
+    def build_route_optimizer(self, catalogue):
+        from optimazer import RouteOptimizer
+        return RouteOptimizer(catalogue.landmarks, keyword_ids=catalogue.keyword_ids, **self.route_optimizer_options())
+
+    def swap_catalogue(self, catalogue, route_optimizer):
+        #Подмена каталога целиком (вызывается из event loop): запросы, уже взявшие старые объекты,
+        #дорабатывают на них, новые сразу видят новый каталог
+        self.__dict__['catalogue'] = catalogue
+        self.__dict__['route_optimizer'] = route_optimizer
+        if self.is_initialized('yandex_gpt'):
+            self.yandex_gpt.LANDMARKS = catalogue.landmarks
+        if self.is_initialized('routing'):
+            # Процессы пула загружают каталог при старте - поднимаем новые на свежем снимке
+            self.routing.restart()
+        self.catalogue_version += 1
+
+    @cached_property
+    def yandex_gpt(self):
+        from yandex_gpt import GPTScheduler, YandexGPT
+        from llm_cache import LLMCache
+        from description_store import DescriptionStore
+        yandex_gpt = YandexGPT(
+            api_key=self.setting('YANDEX_GPT_API_KEY', ''),
+            folder_id=self.setting('YANDEX_FOLDER_ID', ''),
+            LANDMARKS=self.landmarks,
+            cache=LLMCache(self.setting('LLM_CACHE_PATH', 'llm_cache.sqlite3')),
+            pregenerated=DescriptionStore.load(
+                self.setting('PREGENERATED_DESCRIPTIONS_PATH', 'pregenerated_descriptions.json.gz')
+            ),
+            # Квоты YandexGPT (запросов в секунду, токенов в минуту) и число одновременных запросов
+            scheduler=GPTScheduler(
+                requests_per_second=self.setting('YANDEX_GPT_RPS', 10.0),
+                tokens_per_minute=self.setting('YANDEX_GPT_TOKENS_PER_MINUTE', 0),
+                max_concurrency=self.setting('GPT_MAX_CONCURRENCY', 5)
+            )
+        )
+        if self.setting('YANDEX_GPT_URL'):
+            # Другой completion-эндпоинт (например, локальная заглушка)
+            yandex_gpt.url = self.setting('YANDEX_GPT_URL')
+        return yandex_gpt
+
+    @cached_property
+    def geocoder(self):
+        # Геокодирование адресов (домен можно переопределить на локальный Nominatim)
+        from geocoder import GeocodingService
+        from llm_cache import LLMCache
+        return GeocodingService(
+            domain=self.setting('GEOCODER_DOMAIN', 'nominatim.openstreetmap.org'),
+            scheme=self.setting('GEOCODER_SCHEME', 'https'),
+            rate=self.setting('GEOCODER_RATE', 1.0),
+            cache=LLMCache(self.setting('GEOCODER_CACHE_PATH', 'geocode_cache.sqlite3'), ttl=30 * 24 * 3600)
+        )
+
+    @cached_property
+    def sessions(self):
+        # Состояние диалогов: "memory" (LRU + TTL в процессе) или "redis" (общее для процессов, переживает перезапуск)
+        from session_store import create_session_store
+        return create_session_store(
+            self.setting('SESSION_BACKEND', 'memory'),
+            max_sessions=self.setting('SESSION_MAX_USERS', 10000),
+            ttl=self.setting('SESSION_TTL', 24 * 3600),
+            url=self.setting('REDIS_URL', 'redis://localhost:6379/0')
+        )
+
+    @cached_property
+    def telegram_limits(self):
+        # Лимиты Telegram на отправку (на бота и на чат) и повтор после 429
+        from delivery import RateLimitMiddleware
+        return RateLimitMiddleware(
+            global_rate=self.setting('TELEGRAM_GLOBAL_RATE', 30.0),
+            chat_rate=self.setting('TELEGRAM_CHAT_RATE', 1.0),
+            chat_burst=self.setting('TELEGRAM_CHAT_BURST', 5)
+        )
+
+    @cached_property
+    def bot(self):
+        from aiogram import Bot
+        from aiogram.client.session.aiohttp import AiohttpSession
+        api_url = self.setting('TELEGRAM_API_URL')
+        if api_url:
+            # Локальный Bot API сервер или заглушка
+            from aiogram.client.telegram import TelegramAPIServer
+            session = AiohttpSession(api=TelegramAPIServer.from_base(api_url))
+        else:
+            session = AiohttpSession()
+        session.middleware(self.telegram_limits)
+        return Bot(token=self.setting('TELEGRAM_TOKEN'), session=session)
+
+    def warm_up(self):
+        #Прогрев перед запуском бота, чтобы первый пользователь не ждал загрузки каталога и индексов
+        return self.route_optimizer, self.yandex_gpt, self.geocoder, self.routing
+
+    def is_initialized(self, name: str) -> bool:
+        return name in self.__dict__
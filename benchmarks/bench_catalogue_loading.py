@@ -0,0 +1,113 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+import pandas as pd
+from parserxsl import Parser
+from benchmarks.synthetic import generate_landmarks
+
+# Загрузка каталога: чтение xlsx и разбор строк (колоночный разбор против прежнего iterrows)
+#   python -m benchmarks.bench_catalogue_loading --rows 100000
+
+
+def synthetic_dataframe(rows: int, seed: int = 11) -> pd.DataFrame:
+    #Таблица в формате cultural_objects_mnn.xlsx с небольшой долей "плохих" строк
+    rnd = random.Random(seed)
+    landmarks = generate_landmarks(rows, seed)
+    records = []
+    for i, (name, data) in enumerate(landmarks.items()):
+        lat, lon = data['coordinates']
+        coordinate = f"POINT ({lon} {lat})"
+        if rnd.random() < 0.01:
+            coordinate = rnd.choice(["", "POINT (10.0 20.0)", "нет данных"])
+        records.append({
+            "id": i,
+            "address": "Нижний Новгород",
+            "coordinate": coordinate,
+            "description": data['description'],
+            "title": name if rnd.random() > 0.005 else None,
+            "category_id": rnd.randint(1, 10),
+            "rating": data['rating'],
+            "features": ", ".join(data['features']),
+        })
+    return pd.DataFrame.from_records(records)
+
+
+def legacy_landmarks_from_dataframe(df: pd.DataFrame) -> dict:
+    #Прежний построчный разбор (iterrows + parse_point_coordinates) для сравнения
+    columns = Parser.detect_columns(df.columns)
+    landmarks = {}
+    for index, row in df.iterrows():
+        try:
+            if pd.isna(row.iloc[columns['name']]):
+                continue
+            name = str(row.iloc[columns['name']]).strip()
+            if not name or name == 'nan':
+                continue
+            coords = Parser.parse_point_coordinates(str(row.iloc[columns['coords']]))
+            if not coords:
+                print(f"❌ Не удалось распарсить координаты для {name}")
+                continue
+            category_val = row.iloc[columns['category']]
+            category = str(category_val).strip().lower() if not pd.isna(category_val) else "other"
+            rating = 4.0
+            try:
+                rating_val = row.iloc[columns['rating']]
+                if not pd.isna(rating_val):
+                    rating = float(rating_val)
+            except (TypeError, ValueError):
+                pass
+            desc_val = row.iloc[columns['description']]
+            description = str(desc_val).strip() if not pd.isna(desc_val) else ""
+            features_val = row.iloc[columns['features']]
+            features = [f.strip() for f in str(features_val).split(',') if f.strip()] if not pd.isna(features_val) else []
+            landmarks[name] = {
+                'coordinates': coords, 'category': category, 'rating': rating, 'visit_time': 1.0,
+                'description': description, 'features': features, 'original_description': description
+            }
+            print(f"✅ Загружено: {name} - {coords} - категория: {category}")
+        except Exception as e:
+            print(f"❌ Ошибка в строке {index}: {e}")
+    return landmarks
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    # Вывод в stdout тоже часть стоимости - пишем его в буфер, а не отбрасываем
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run(rows: int, with_excel: bool = True):
+    df = synthetic_dataframe(rows)
+    result = {"rows": rows}
+
+    columnar, result["parse_columnar_ms"] = timed(Parser.landmarks_from_dataframe, df)
+    legacy, result["parse_legacy_ms"] = timed(legacy_landmarks_from_dataframe, df)
+    result["loaded"] = len(columnar)
+    result["same_result"] = columnar == legacy
+
+    if with_excel:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "catalogue.xlsx")
+            _, result["write_xlsx_ms"] = timed(df.to_excel, path)
+            _, result["read_xlsx_ms"] = timed(Parser.read_excel, path)
+
+    print(f"📊 {rows} строк: колоночный разбор {result['parse_columnar_ms']:.0f} мс, "
+          f"iterrows {result['parse_legacy_ms']:.0f} мс, загружено {result['loaded']}, "
+          f"совпадает: {result['same_result']}"
+          + (f", чтение xlsx {result['read_xlsx_ms']:.0f} мс" if with_excel else ""))
+    return result
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк загрузки каталога")
+    arg_parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000])
+    arg_parser.add_argument("--no-excel", action="store_true", help="не замерять чтение/запись xlsx (долго на 100k)")
+    args = arg_parser.parse_args()
+    for row_count in args.rows:
+        run(row_count, not args.no_excel)
@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import statistics
+import time
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from delivery import RateLimitMiddleware, merge_cards
+from local_stubs import create_bot_api_stub_app, start_stub
+
+# Доставка маршрута в Telegram: отдельное сообщение на каждое место против склеенных карточек,
+# с ведрами токенов и повтором после 429 и без них. Заглушка Bot API отвечает 429, как Telegram,
+# если в чат пишут чаще chat_rate сообщений в секунду.
+#   python -m benchmarks.bench_delivery --users 20 --places 8
+
+TOKEN = "123456:bench-delivery-token"
+DESCRIPTION = ("Старинная усадьба на высоком берегу Волги, откуда открывается вид на Стрелку и заречную часть города. "
+               "Здесь сохранились кованые ограды, парадная лестница и липовая аллея, а по выходным проходят "
+               "экскурсии по залам с подлинной мебелью XIX века. ") * 2
+
+
+def route_messages(places: int, merged: bool):
+    #Сообщения одного маршрута: заставка, правка заставки, заголовок, карточки мест, итог
+    cards = []
+    for i in range(1, places + 1):
+        text = f"📍 **{i}. Место {i}**\n━━━━━━━━━━━━━━━━━━━━━\n\n📖 **Описание:**\n_{DESCRIPTION}_\n\n"
+        cards.append((text, [[InlineKeyboardButton(text=f"🗺️ {i}. Место {i}", url=f"https://yandex.ru/maps/?pt={i}")]]))
+    if merged:
+        cards = merge_cards(cards)
+    return ["🎨 Создаю уникальные описания...", "edit", "🎯 **ВАШ ПЕРСОНАЛЬНЫЙ МАРШРУТ ГОТОВ!**", *cards,
+            "🎉 МАРШРУТ УСПЕШНО СОЗДАН!"]
+
+
+async def deliver(bot: Bot, chat_id: int, messages: list) -> int:
+    #Отправка маршрута; возвращает число потерянных сообщений
+    lost = 0
+    intro = None
+    for item in messages:
+        try:
+            if item == "edit":
+                if intro is not None:
+                    await bot.edit_message_text("✨ Описания готовы!", chat_id=chat_id, message_id=intro.message_id)
+            elif isinstance(item, tuple):
+                text, buttons = item
+                await bot.send_message(chat_id, text, parse_mode="Markdown",
+                                       reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
+            else:
+                sent = await bot.send_message(chat_id, item)
+                intro = intro or sent
+        except TelegramRetryAfter:
+            lost += 1
+    return lost
+
+
+async def run_case(api_url: str, bot_api, users: int, places: int, merged: bool, limited: bool):
+    session = AiohttpSession(api=TelegramAPIServer.from_base(api_url))
+    middleware = RateLimitMiddleware()
+    if limited:
+        session.middleware(middleware)
+    bot = Bot(token=TOKEN, session=session)
+    state = bot_api["state"]
+    requests_before, flood_before = state["requests"], state["flood_errors"]
+    messages = route_messages(places, merged)
+
+    async def one(chat_id: int):
+        started = time.perf_counter()
+        lost = await deliver(bot, chat_id, messages)
+        return time.perf_counter() - started, lost
+
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(one(chat_id) for chat_id in range(1, users + 1)))
+    total = time.perf_counter() - started
+    await session.close()
+
+    durations = sorted(duration for duration, _ in outcomes)
+    result = {
+        "mode": f"{'склеенные' if merged else 'по одному'}{' + лимиты' if limited else ''}",
+        "messages_per_route": len(messages),
+        "api_calls_per_route": (state["requests"] - requests_before) / users,
+        "flood_429": state["flood_errors"] - flood_before,
+        "lost_messages": sum(lost for _, lost in outcomes),
+        "route_p50_s": statistics.median(durations),
+        "route_max_s": durations[-1],
+        "total_s": total,
+        "retries": middleware.stats["retries"],
+    }
+    print(f"📊 {result['mode']}: {result['messages_per_route']} сообщений, "
+          f"{result['api_calls_per_route']:.1f} запросов к Bot API на маршрут, 429: {result['flood_429']}, "
+          f"потеряно: {result['lost_messages']}, повторов: {result['retries']}, "
+          f"маршрут p50 {result['route_p50_s']:.2f} с, max {result['route_max_s']:.2f} с")
+    return result
+
+
+async def run(users: int = 20, places: int = 8, chat_rate: float = 1.0, chat_burst: int = 5, delay: float = 0.01):
+    bot_api = create_bot_api_stub_app(delay=delay, chat_rate=chat_rate, chat_burst=chat_burst)
+    runner, api_url = await start_stub(bot_api)
+    results = []
+    try:
+        for merged, limited in ((False, False), (False, True), (True, True)):
+            results.append(await run_case(api_url, bot_api, users, places, merged, limited))
+            # Ведра заглушки наполняются заново перед следующим режимом
+            await asyncio.sleep(chat_burst / chat_rate)
+    finally:
+        await runner.cleanup()
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк доставки маршрута в Telegram")
+    arg_parser.add_argument("--users", type=int, default=20)
+    arg_parser.add_argument("--places", type=int, default=8)
+    arg_parser.add_argument("--chat-rate", type=float, default=1.0, help="лимит заглушки на чат, сообщений/с")
+    arg_parser.add_argument("--chat-burst", type=int, default=5)
+    arg_parser.add_argument("--delay", type=float, default=0.01, help="задержка ответа заглушки, с")
+    args = arg_parser.parse_args()
+    asyncio.run(run(args.users, args.places, args.chat_rate, args.chat_burst, args.delay))
@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+from local_stubs import create_gpt_stub_app, start_stub
+from yandex_gpt import GPTScheduler, YandexGPT
+
+# Очередь запросов к YandexGPT под всплеском: N маршрутов (вступление + описания мест) одновременно
+# с фоновой предгенерацией против заглушки с квотой (429 сверх quota_rps в секунду).
+# "без очереди" - прежнее поведение: только ограничение одновременных запросов, без лимита и повторов.
+#   python -m benchmarks.bench_gpt_scheduler --users 10 --places 8 --batch 100 --quota-rps 10
+
+DEADLINE = 15.0
+
+
+async def run_case(url: str, stub, name: str, scheduler: GPTScheduler, users: int, places: int, batch: int,
+                   priorities: bool):
+    yandex_gpt = YandexGPT("stub", "stub", {}, scheduler=scheduler)
+    yandex_gpt.url = url
+    await yandex_gpt.start()
+    throttled_before = stub["state"]["throttled"]
+    batch_priority = GPTScheduler.PRIORITY_BATCH if priorities else GPTScheduler.PRIORITY_FIRST
+
+    async def with_deadline(prompt: str, priority: int):
+        deadline = time.monotonic() + DEADLINE
+        try:
+            return await asyncio.wait_for(yandex_gpt.generate_text(prompt, priority=priority, deadline=deadline), DEADLINE)
+        except asyncio.TimeoutError:
+            return None
+
+    async def route(user: int):
+        started = time.perf_counter()
+        first_stop = []
+
+        async def description(position: int):
+            text = await with_deadline(f"маршрут {user} место {position}", position if priorities else 0)
+            if position == 0:
+                first_stop.append(time.perf_counter() - started)
+            return text
+
+        texts = await asyncio.gather(with_deadline(f"маршрут {user} вступление", 0),
+                                     *(description(position) for position in range(places)))
+        return first_stop[0], time.perf_counter() - started, sum(1 for text in texts if text is None)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        batch_task = asyncio.gather(*(yandex_gpt.generate_text(f"фон {i}", priority=batch_priority)
+                                      for i in range(batch)))
+        # Фоновая очередь уже стоит, когда приходят пользователи
+        await asyncio.sleep(0.05)
+        routes = await asyncio.gather(*(route(user) for user in range(users)))
+        batch_texts = await batch_task
+    await yandex_gpt.close()
+
+    first = sorted(item[0] for item in routes)
+    full = sorted(item[1] for item in routes)
+    result = {
+        "mode": name,
+        "first_stop_p50_s": statistics.median(first),
+        "first_stop_max_s": first[-1],
+        "route_p50_s": statistics.median(full),
+        "route_max_s": full[-1],
+        "interactive_failed": sum(item[2] for item in routes),
+        "batch_failed": sum(1 for text in batch_texts if text is None),
+        "api_429": stub["state"]["throttled"] - throttled_before,
+        "scheduler": scheduler.get_stats(),
+    }
+    print(f"📊 {name}: первое место p50 {result['first_stop_p50_s']:.2f} с (max {result['first_stop_max_s']:.2f}), "
+          f"маршрут p50 {result['route_p50_s']:.2f} с (max {result['route_max_s']:.2f}), "
+          f"без описания: {result['interactive_failed']}, фоновых без ответа: {result['batch_failed']}/{batch}, "
+          f"ответов 429: {result['api_429']}, повторов: {result['scheduler']['retries']}, "
+          f"ожидание в очереди p95 {result['scheduler']['wait_p95_ms']:.0f} мс")
+    return result
+
+
+async def run(users: int = 10, places: int = 8, batch: int = 100, quota_rps: float = 10.0, delay: float = 0.2,
+              concurrency: int = 5):
+    stub = create_gpt_stub_app(delay=delay, quota_rps=quota_rps)
+    runner, base_url = await start_stub(stub)
+    url = f"{base_url}/foundationModels/v1/completion"
+    results = []
+    try:
+        cases = [
+            ("без очереди", GPTScheduler(requests_per_second=0, max_concurrency=concurrency, max_retries=0), False),
+            ("очередь с лимитом и приоритетами",
+             GPTScheduler(requests_per_second=quota_rps, max_concurrency=concurrency), True),
+        ]
+        for name, scheduler, priorities in cases:
+            results.append(await run_case(url, stub, name, scheduler, users, places, batch, priorities))
+            await asyncio.sleep(1.0)
+    finally:
+        await runner.cleanup()
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк очереди запросов к YandexGPT")
+    arg_parser.add_argument("--users", type=int, default=10)
+    arg_parser.add_argument("--places", type=int, default=8)
+    arg_parser.add_argument("--batch", type=int, default=100, help="фоновых запросов предгенерации")
+    arg_parser.add_argument("--quota-rps", type=float, default=10.0, help="квота заглушки, запросов/с")
+    arg_parser.add_argument("--delay", type=float, default=0.2, help="задержка ответа заглушки, с")
+    arg_parser.add_argument("--concurrency", type=int, default=5)
+    args = arg_parser.parse_args()
+    asyncio.run(run(args.users, args.places, args.batch, args.quota_rps, args.delay, args.concurrency))
@@ -0,0 +1,51 @@
+import argparse
+import random
+from optimazer import RouteOptimizer
+from distance_matrix import nearest_neighbour_order
+from route_solvers import RouteImprover, with_end_node
+from benchmarks.synthetic import generate_landmarks, random_point
+
+# Насколько 2-opt/Or-opt сокращает маршрут "ближайшего соседа" и сколько это стоит по времени
+#   python -m benchmarks.bench_route_improvement --stops 5 10 20 30
+
+
+def run(stops_list, routes: int = 50, time_limit_ms: float = 30.0):
+    rnd = random.Random(3)
+    landmarks = generate_landmarks(2000)
+    optimizer = RouteOptimizer(landmarks, matrix_cache_dir=None, post_optimizers=[])
+    improver = RouteImprover(time_limit_ms=time_limit_ms)
+    names = list(landmarks)
+    results = []
+    for stops in stops_list:
+        for variant in ("open", "return", "fixed_end"):
+            improvements, elapsed = [], []
+            for _ in range(routes):
+                start = random_point(rnd)
+                route = rnd.sample(names, stops)
+                matrix = optimizer.build_route_matrix(route, start)
+                route_end = random_point(rnd) if variant == "fixed_end" else variant
+                end_row = optimizer.end_row(matrix, route_end, start, route)
+                order = nearest_neighbour_order(matrix)
+                _, report = improver.improve(order, with_end_node(matrix, end_row), len(matrix))
+                improvements.append(report["improvement_pct"])
+                elapsed.append(report["elapsed_ms"])
+            elapsed.sort()
+            row = {
+                "stops": stops,
+                "variant": variant,
+                "avg_improvement_pct": sum(improvements) / routes,
+                "p50_ms": elapsed[routes // 2],
+                "max_ms": elapsed[-1],
+            }
+            results.append(row)
+            print(f"📊 {stops:>3} точек, {variant:>9}: сокращение {row['avg_improvement_pct']:5.1f}% | "
+                  f"p50 {row['p50_ms']:6.2f} мс | max {row['max_ms']:6.2f} мс")
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк пост-оптимизации маршрута")
+    arg_parser.add_argument("--stops", type=int, nargs="+", default=[5, 10, 20, 30])
+    arg_parser.add_argument("--routes", type=int, default=50)
+    args = arg_parser.parse_args()
+    run(args.stops, args.routes)
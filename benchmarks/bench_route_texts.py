@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+import main
+from delivery import StreamedText
+from local_stubs import create_gpt_stub_app, start_stub
+from yandex_gpt import GPTScheduler, YandexGPT
+from benchmarks.synthetic import generate_landmarks
+
+# Тексты маршрута: отдельные запросы (рекомендация + описание на каждое место) против одного пакетного
+# JSON-запроса. Считаются запросы к API, токены (по usage заглушки) и отдельные запросы вместо негодных
+# пакетных описаний.
+#   python -m benchmarks.bench_route_texts --routes 20 --places 8 --malformed-every 4
+
+
+async def run_case(url: str, landmarks: dict, routes: int, places: int, batched: bool):
+    scheduler = GPTScheduler(requests_per_second=0, max_concurrency=20)
+    yandex_gpt = YandexGPT("stub", "stub", landmarks, scheduler=scheduler)
+    yandex_gpt.url = url
+    await yandex_gpt.start()
+    names = list(landmarks)
+    fallbacks = 0
+    started = time.perf_counter()
+
+    async def one(index: int):
+        nonlocal fallbacks
+        route = names[index * places:(index + 1) * places]
+        deadline = time.monotonic() + 15.0
+        recommendation = StreamedText(YandexGPT.DEFAULT_RECOMMENDATION)
+        descriptions = {landmark: StreamedText(YandexGPT.DEFAULT_DESCRIPTION) for landmark in route}
+        gpt_tasks = []
+        if batched:
+            await main.fill_route_texts(yandex_gpt, landmarks, route, "🏛️ История", "2 часа", deadline,
+                                        recommendation, descriptions, gpt_tasks)
+            fallbacks += len(gpt_tasks)
+        else:
+            main.start_separate_requests(yandex_gpt, landmarks, route, "🏛️ История", "2 часа", deadline,
+                                         recommendation, descriptions, gpt_tasks)
+        await asyncio.gather(*gpt_tasks)
+        texts = [recommendation, *descriptions.values()]
+        return sum(1 for streamed in texts if streamed.text in (YandexGPT.DEFAULT_RECOMMENDATION,
+                                                                YandexGPT.DEFAULT_DESCRIPTION))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        defaults = sum(await asyncio.gather(*(one(index) for index in range(routes))))
+    elapsed = time.perf_counter() - started
+    stats = scheduler.get_stats()
+    await yandex_gpt.close()
+    result = {
+        "mode": "один запрос" if batched else "1 + N запросов",
+        "requests_per_route": stats["started"] / routes,
+        "tokens_per_route": stats["tokens_used"] / routes,
+        "fallback_requests": fallbacks,
+        "default_texts": defaults,
+        "routes_per_s": routes / elapsed,
+    }
+    print(f"📊 {result['mode']}: {result['requests_per_route']:.1f} запросов и {result['tokens_per_route']:.0f} токенов "
+          f"на маршрут, отдельных запросов вместо негодных: {result['fallback_requests']}, "
+          f"текстов-заглушек: {result['default_texts']}")
+    return result
+
+
+async def run(routes: int = 20, places: int = 8, malformed_every: int = 4, delay: float = 0.2):
+    landmarks = generate_landmarks(routes * places)
+    runner, base_url = await start_stub(create_gpt_stub_app(delay=delay, malformed_every=malformed_every))
+    url = f"{base_url}/foundationModels/v1/completion"
+    try:
+        return [await run_case(url, landmarks, routes, places, batched) for batched in (False, True)]
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк пакетного запроса текстов маршрута")
+    arg_parser.add_argument("--routes", type=int, default=20)
+    arg_parser.add_argument("--places", type=int, default=8)
+    arg_parser.add_argument("--malformed-every", type=int, default=4, help="каждое k-е пакетное описание негодное")
+    arg_parser.add_argument("--delay", type=float, default=0.2)
+    args = arg_parser.parse_args()
+    asyncio.run(run(args.routes, args.places, args.malformed_every, args.delay))
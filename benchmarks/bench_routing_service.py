@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+from catalogue_snapshot import Catalogue, write_snapshot
+from optimazer import RouteOptimizer
+from routing_service import RoutingService
+from benchmarks.synthetic import generate_landmarks, random_point
+
+# Отзывчивость event loop при расчете маршрутов: в event loop (workers=0) против пула процессов.
+# Пока идут запросы, отдельная корутина каждые 5 мс меряет задержку цикла - столько ждали бы
+# сообщения остальных пользователей.
+#   python -m benchmarks.bench_routing_service --landmarks 3000 --requests 64 --workers 0 2 4
+
+INTERESTS = ["🏛️ История", "🌳 Парки", "🎨 Искусство", "🌟 Любые достопримечательности"]
+# Плотный исторический центр: до кандидатов можно дойти, маршруты длинные - решателю есть что считать
+CENTRE_BOUNDS = (56.30, 43.97, 56.34, 44.05)
+TIMES = ["1 час", "2 часа", "3 часа", "4 часа"]
+
+
+async def measure(service: RoutingService, optimizer: RouteOptimizer, requests: int, concurrency: int, seed: int = 5):
+    rnd = random.Random(seed)
+    cases = [(rnd.choice(INTERESTS), random_point(rnd, CENTRE_BOUNDS), rnd.choice(TIMES)) for _ in range(requests)]
+    lags = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append((time.perf_counter() - started - 0.005) * 1000)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(case):
+        async with semaphore:
+            interest, start, available_time = case
+            return await service.plan_route(optimizer, interest, start, available_time, 8)
+
+    ticker_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        routes = await asyncio.gather(*(one(case) for case in cases))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker_task
+
+    lags.sort()
+    return {
+        "routes_per_s": requests / elapsed,
+        "loop_lag_p50_ms": statistics.median(lags),
+        "loop_lag_p99_ms": lags[int(len(lags) * 0.99) - 1] if len(lags) > 1 else lags[-1],
+        "loop_lag_max_ms": lags[-1],
+        "avg_stops": sum(len(route) for _, route in routes) / requests,
+    }
+
+
+def run(landmark_count: int = 3000, requests: int = 64, concurrency: int = 16, workers_options=(0, 2),
+        solver_deadline_ms: float = 50.0):
+    landmarks = generate_landmarks(landmark_count, bounds=CENTRE_BOUNDS)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, "catalogue.snapshot")
+        with contextlib.redirect_stdout(io.StringIO()):
+            catalogue = Catalogue.from_landmarks(landmarks)
+            write_snapshot(catalogue, snapshot_path)
+            optimizer = RouteOptimizer(landmarks, keyword_ids=catalogue.keyword_ids,
+                                       solver_deadline_ms=solver_deadline_ms)
+        # Таблицы нет - процессы пула читают каталог из снимка
+        missing_excel = os.path.join(tmp, "missing.xlsx")
+
+        for workers in workers_options:
+            service = RoutingService(missing_excel, snapshot_path, workers=workers, max_queue=concurrency * 2,
+                                     timeout=10.0, optimizer_options={"solver_deadline_ms": solver_deadline_ms})
+            service.start()
+            if workers:
+                # Даем процессам загрузить каталог, чтобы мерить расчет, а не старт пула
+                asyncio.run(measure(service, optimizer, workers * 2, workers))
+            result = {"workers": workers, **asyncio.run(measure(service, optimizer, requests, concurrency))}
+            result["fallbacks"] = service.stats["saturated"] + service.stats["timeouts"]
+            service.close()
+            results.append(result)
+            print(f"📊 workers={workers}: {result['routes_per_s']:.1f} маршрутов/с, задержка event loop "
+                  f"p50 {result['loop_lag_p50_ms']:.1f} мс, p99 {result['loop_lag_p99_ms']:.1f} мс, "
+                  f"max {result['loop_lag_max_ms']:.1f} мс, мест в маршруте {result['avg_stops']:.1f}, "
+                  f"упрощенных маршрутов {result['fallbacks']}")
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк расчета маршрутов вне event loop")
+    arg_parser.add_argument("--landmarks", type=int, default=3000)
+    arg_parser.add_argument("--requests", type=int, default=64)
+    arg_parser.add_argument("--concurrency", type=int, default=16)
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    arg_parser.add_argument("--solver-deadline-ms", type=float, default=50.0)
+    args = arg_parser.parse_args()
+    run(args.landmarks, args.requests, args.concurrency, args.workers, args.solver_deadline_ms)
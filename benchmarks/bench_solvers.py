@@ -0,0 +1,69 @@
+import argparse
+import random
+import time
+from optimazer import RouteOptimizer
+from benchmarks.synthetic import generate_landmarks, random_point
+
+# Сравнение решателей RouteOptimizer: "rating" (топ-N + ближайший сосед) и "orienteering"
+#   python -m benchmarks.bench_solvers --sizes 8 50 200 --routes 100
+
+BUDGETS = {"1 час": 60, "2 часа": 120, "3 часа": 180, "4 часа": 240}
+# Верхняя граница мест в маршруте, как MAX_ROUTE_PLACES в main.py
+MAX_PLACES = 8
+
+
+def evaluate(optimizer: RouteOptimizer, solver: str, cases):
+    latencies, ratings, stops, over_budget, durations = [], [], [], 0, []
+    for landmarks, start, available_time in cases:
+        budget = BUDGETS[available_time]
+        started = time.perf_counter()
+        # "rating" берет число мест из таблицы, "orienteering" - сколько уложится в бюджет
+        max_places = optimizer.calculate_places_by_time(available_time) if solver == "rating" else MAX_PLACES
+        route = optimizer.find_optimal_route(landmarks, start, max_places=max_places, time_budget=budget, solver=solver)
+        latencies.append((time.perf_counter() - started) * 1000)
+        duration = optimizer.route_duration_minutes(route, start)
+        durations.append(duration / budget)
+        over_budget += duration > budget
+        ratings.append(sum(optimizer.landmarks[landmark]['rating'] for landmark in route))
+        stops.append(len(route))
+
+    latencies.sort()
+    count = len(cases)
+    return {
+        "solver": solver,
+        "latency_p50_ms": latencies[count // 2],
+        "latency_max_ms": latencies[-1],
+        "avg_total_rating": sum(ratings) / count,
+        "avg_stops": sum(stops) / count,
+        "avg_budget_usage": sum(durations) / count,
+        "over_budget_share": over_budget / count,
+    }
+
+
+def run(sizes, routes: int = 100, candidates: int = 40):
+    rnd = random.Random(7)
+    results = []
+    for size in sizes:
+        landmarks = generate_landmarks(size)
+        optimizer = RouteOptimizer(landmarks, matrix_cache_dir=None)
+        cases = []
+        for _ in range(routes):
+            # Кандидаты - ближайшие к пользователю места, как при прогулке от текущей точки
+            start = random_point(rnd)
+            nearby = [name for name, _ in optimizer.nearest_landmarks(start, candidates)]
+            cases.append((nearby, start, rnd.choice(list(BUDGETS))))
+        for solver in RouteOptimizer.SOLVERS:
+            row = {"size": size, **evaluate(optimizer, solver, cases)}
+            results.append(row)
+            print(f"📊 n={size:>5} {solver:>12}: p50 {row['latency_p50_ms']:6.2f} мс (max {row['latency_max_ms']:6.2f}) | "
+                  f"рейтинг {row['avg_total_rating']:5.1f} | мест {row['avg_stops']:.1f} | "
+                  f"бюджет {row['avg_budget_usage'] * 100:5.1f}% | превышений {row['over_budget_share'] * 100:5.1f}%")
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк решателей маршрута")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[8, 50, 200])
+    arg_parser.add_argument("--routes", type=int, default=100)
+    args = arg_parser.parse_args()
+    run(args.sizes, args.routes)
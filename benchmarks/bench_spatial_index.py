@@ -0,0 +1,69 @@
+import argparse
+import random
+import time
+from geopy.distance import geodesic
+from spatial_index import SpatialIndex
+from benchmarks.synthetic import generate_landmarks, random_point
+
+# Сравнение SpatialIndex с линейным перебором через geodesic (как в RouteOptimizer)
+#   python -m benchmarks.bench_spatial_index --sizes 8 500 5000
+
+
+def linear_nearest(landmarks, point, k):
+    distances = [(name, geodesic(point, data['coordinates']).km) for name, data in landmarks.items()]
+    distances.sort(key=lambda item: item[1])
+    return distances[:k]
+
+
+def linear_within(landmarks, point, radius_km, category=None):
+    result = []
+    for name, data in landmarks.items():
+        if category and category not in data['category']:
+            continue
+        distance = geodesic(point, data['coordinates']).km
+        if distance <= radius_km:
+            result.append((name, distance))
+    return sorted(result, key=lambda item: item[1])
+
+
+def measure(func, points, *args):
+    started = time.perf_counter()
+    for point in points:
+        func(point, *args)
+    return (time.perf_counter() - started) / len(points) * 1000
+
+
+def run(sizes, queries: int = 50, k: int = 5, radius_km: float = 1.0, category: str = "парк"):
+    rnd = random.Random(0)
+    points = [random_point(rnd) for _ in range(queries)]
+    results = []
+    for size in sizes:
+        landmarks = generate_landmarks(size)
+        started = time.perf_counter()
+        index = SpatialIndex(landmarks)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        row = {
+            "size": size,
+            "build_ms": build_ms,
+            "knn_index_ms": measure(lambda p: index.nearest(p, k), points),
+            "knn_linear_ms": measure(lambda p: linear_nearest(landmarks, p, k), points),
+            "radius_index_ms": measure(lambda p: index.within(p, radius_km), points),
+            "radius_linear_ms": measure(lambda p: linear_within(landmarks, p, radius_km), points),
+            "radius_category_index_ms": measure(lambda p: index.within(p, radius_km, category), points),
+            "radius_category_linear_ms": measure(lambda p: linear_within(landmarks, p, radius_km, category), points),
+        }
+        results.append(row)
+        print(f"📊 n={size:>6}: построение {build_ms:7.1f} мс | "
+              f"kNN {row['knn_index_ms']:.3f} vs {row['knn_linear_ms']:.3f} мс | "
+              f"радиус {row['radius_index_ms']:.3f} vs {row['radius_linear_ms']:.3f} мс | "
+              f"радиус+категория {row['radius_category_index_ms']:.3f} vs {row['radius_category_linear_ms']:.3f} мс")
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк пространственного индекса")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[8, 500, 5000, 20000])
+    arg_parser.add_argument("--queries", type=int, default=50)
+    args = arg_parser.parse_args()
+    run(args.sizes, args.queries)
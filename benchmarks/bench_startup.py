@@ -0,0 +1,85 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Холодный старт: время импорта main.py по -X importtime и тяжелые модули, попавшие в импорт.
+#   python -m benchmarks.bench_startup --max-ms 150
+# Код выхода 1, если время импорта выше порога или main.py снова тянет тяжелые зависимости
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("aiogram", "aiohttp", "pandas", "numpy", "geopy", "openpyxl", "config")
+
+
+def import_profile(module: str = "main"):
+    #Один запуск чистого интерпретатора: {модуль: (self мкс, cumulative мкс)} в порядке импорта
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} завершился с ошибкой:\n{completed.stderr[-2000:]}")
+
+    profile = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def warm_up_ms():
+    #Время app.warm_up() (каталог, индексы, клиенты) - нужен config.py
+    code = ("import time, main; started = time.perf_counter(); main.app.warm_up(); "
+            "print((time.perf_counter() - started) * 1000)")
+    completed = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"warm_up завершился с ошибкой:\n{completed.stderr[-2000:]}")
+    return float(completed.stdout.strip().splitlines()[-1])
+
+
+def run(repeats: int = 5, module: str = "main", top: int = 10, with_warm_up: bool = False):
+    profiles = [import_profile(module) for _ in range(repeats)]
+    totals = [profile[module][1] / 1000 for profile in profiles]
+    last = profiles[-1]
+
+    result = {
+        "module": module,
+        "import_ms_median": statistics.median(totals),
+        "import_ms_min": min(totals),
+        "heavy_imported": sorted({
+            name.split(".")[0] for name in last if name.split(".")[0] in HEAVY_MODULES
+        }),
+    }
+
+    print(f"🚀 import {module}: медиана {result['import_ms_median']:.1f} мс, "
+          f"минимум {result['import_ms_min']:.1f} мс ({repeats} запусков)")
+    print("📦 Самые дорогие модули (self):")
+    for name, (self_us, cumulative_us) in sorted(last.items(), key=lambda item: -item[1][0])[:top]:
+        print(f"  - {name}: {self_us / 1000:.1f} мс (cumulative {cumulative_us / 1000:.1f} мс)")
+    if result["heavy_imported"]:
+        print(f"⚠️ При импорте загружены тяжелые модули: {', '.join(result['heavy_imported'])}")
+
+    if with_warm_up:
+        result["warm_up_ms"] = warm_up_ms()
+        print(f"🔥 app.warm_up(): {result['warm_up_ms']:.0f} мс")
+    return result
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк холодного старта main.py")
+    arg_parser.add_argument("--repeats", type=int, default=5)
+    arg_parser.add_argument("--module", default="main")
+    arg_parser.add_argument("--top", type=int, default=10)
+    arg_parser.add_argument("--max-ms", type=float, default=None, help="порог медианного времени импорта")
+    arg_parser.add_argument("--warm-up", action="store_true", help="замерить и app.warm_up() (нужен config.py)")
+    args = arg_parser.parse_args()
+
+    result = run(args.repeats, args.module, args.top, args.warm_up)
+    failed = bool(result["heavy_imported"])
+    if args.max_ms is not None and result["import_ms_median"] > args.max_ms:
+        print(f"❌ Импорт {result['import_ms_median']:.1f} мс превышает порог {args.max_ms:.1f} мс")
+        failed = True
+    sys.exit(1 if failed else 0)
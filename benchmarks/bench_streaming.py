@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Chat, Message
+from delivery import RateLimitMiddleware, StreamedText, edit_progressively
+from local_stubs import create_bot_api_stub_app, create_gpt_stub_app, start_stub
+from yandex_gpt import GPTScheduler, YandexGPT
+
+# Когда пользователь видит первые слова ответа: потоковая генерация с правкой сообщения против ожидания
+# полного ответа. Заглушка YandexGPT отдает ответ частями за delay секунд, заглушка Bot API считает правки.
+#   python -m benchmarks.bench_streaming --users 10 --gpt-delay 3
+
+TOKEN = "123456:bench-streaming-token"
+
+
+async def run_case(bot: Bot, yandex_gpt: YandexGPT, bot_api, users: int, streaming: bool):
+    methods_before = dict(bot_api["state"]["methods"])
+
+    async def one(chat_id: int):
+        message = Message(message_id=0, date=0, chat=Chat(id=chat_id, type="private")).as_(bot)
+        first_shown = []
+        started = time.perf_counter()
+
+        def render(text: str) -> str:
+            if not first_shown:
+                first_shown.append(time.perf_counter() - started)
+            return f"💫 Рекомендация:\n{text}"
+
+        prompt = f"Рекомендация для пользователя {chat_id} " * 5
+        if streaming:
+            streamed = StreamedText(YandexGPT.DEFAULT_RECOMMENDATION)
+            consumer = asyncio.create_task(streamed.consume(yandex_gpt.stream_text(prompt), 15.0))
+            await edit_progressively(message, render, streamed)
+            await consumer
+        else:
+            text = await yandex_gpt.generate_text(prompt) or YandexGPT.DEFAULT_RECOMMENDATION
+            await message.answer(render(text))
+        return first_shown[0], time.perf_counter() - started
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        outcomes = await asyncio.gather(*(one(chat_id) for chat_id in range(1, users + 1)))
+    methods = bot_api["state"]["methods"]
+    first = sorted(item[0] for item in outcomes)
+    full = sorted(item[1] for item in outcomes)
+    result = {
+        "mode": "поток" if streaming else "полный ответ",
+        "first_text_p50_s": statistics.median(first),
+        "first_text_max_s": first[-1],
+        "full_text_p50_s": statistics.median(full),
+        "edits_per_answer": (methods.get("editMessageText", 0) - methods_before.get("editMessageText", 0)) / users,
+    }
+    print(f"📊 {result['mode']}: первые слова p50 {result['first_text_p50_s']:.2f} с "
+          f"(max {result['first_text_max_s']:.2f}), полный ответ p50 {result['full_text_p50_s']:.2f} с, "
+          f"правок на ответ {result['edits_per_answer']:.1f}")
+    return result
+
+
+async def run(users: int = 10, gpt_delay: float = 3.0, stream_parts: int = 20):
+    gpt_runner, gpt_base = await start_stub(create_gpt_stub_app(delay=gpt_delay, stream_parts=stream_parts))
+    bot_api = create_bot_api_stub_app()
+    bot_runner, bot_api_url = await start_stub(bot_api)
+    session = AiohttpSession(api=TelegramAPIServer.from_base(bot_api_url))
+    session.middleware(RateLimitMiddleware())
+    bot = Bot(token=TOKEN, session=session)
+    yandex_gpt = YandexGPT("stub", "stub", {}, scheduler=GPTScheduler(requests_per_second=0, max_concurrency=users))
+    yandex_gpt.url = f"{gpt_base}/foundationModels/v1/completion"
+    await yandex_gpt.start()
+    try:
+        results = [await run_case(bot, yandex_gpt, bot_api, users, streaming) for streaming in (False, True)]
+    finally:
+        await yandex_gpt.close()
+        await session.close()
+        await bot_runner.cleanup()
+        await gpt_runner.cleanup()
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк потоковой генерации ответов")
+    arg_parser.add_argument("--users", type=int, default=10)
+    arg_parser.add_argument("--gpt-delay", type=float, default=3.0, help="время полного ответа заглушки, с")
+    arg_parser.add_argument("--stream-parts", type=int, default=20)
+    args = arg_parser.parse_args()
+    asyncio.run(run(args.users, args.gpt_delay, args.stream_parts))
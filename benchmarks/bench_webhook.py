@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import aiohttp
+from local_stubs import create_bot_api_stub_app, start_gpt_stub, start_stub
+
+# Нагрузочный тест webhook-режима: webhook.py с N рабочими процессами, заглушки Bot API и YandexGPT,
+# синтетические пользователи проходят диалог /start -> интерес -> время -> геолокация.
+#   python -m benchmarks.bench_webhook --workers 4 --users 200
+# Нужен config.py с TELEGRAM_TOKEN в формате токена бота (запросы уходят только в заглушки)
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET = "bench-secret"
+DONE_MARKER = "МАРШРУТ УСПЕШНО СОЗДАН"
+RESTART_MARKERS = ("Начнем сначала", "начнем сначала")
+
+
+def dialog_updates(user_id: int, interest: str, first_update_id: int):
+    #Обновления Telegram одного пользователя в порядке диалога
+    now = int(time.time())
+    user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+    chat = {"id": user_id, "type": "private"}
+    lat, lon = 56.32 + (user_id % 50) * 0.0004, 44.0 + (user_id % 37) * 0.0005
+    messages = [
+        {"text": "/start", "entities": [{"type": "bot_command", "offset": 0, "length": 6}]},
+        {"text": interest},
+        {"text": "2 часа"},
+        {"location": {"latitude": lat, "longitude": lon}},
+    ]
+    return [
+        {"update_id": first_update_id + i,
+         "message": {"message_id": first_update_id + i, "date": now, "chat": chat, "from": user, **body}}
+        for i, body in enumerate(messages)
+    ]
+
+
+async def wait_ready(session: aiohttp.ClientSession, router_url: str, workers: int, timeout: float = 120.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            async with session.get(f"{router_url}/stats") as response:
+                data = await response.json()
+                if len(data["workers"]) == workers and all(data["workers"]):
+                    return
+        except (aiohttp.ClientError, ValueError):
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("webhook.py не запустился")
+
+
+async def run(workers: int = 2, users: int = 50, port: int = 8180, gpt_delay: float = 0.05,
+              interest: str = "🌟 Любые достопримечательности", timeout: float = 300.0):
+    gpt_runner, gpt_url = await start_gpt_stub(delay=gpt_delay)
+    bot_api = create_bot_api_stub_app()
+    bot_runner, bot_api_url = await start_stub(bot_api)
+    command = [sys.executable, "webhook.py", "--workers", str(workers), "--host", "127.0.0.1",
+               "--port", str(port), "--worker-base-port", str(port + 1), "--secret", SECRET,
+               "--telegram-api-url", bot_api_url, "--gpt-url", gpt_url]
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(command, cwd=REPO_DIR, stdout=log, stderr=subprocess.STDOUT)
+    router_url = f"http://127.0.0.1:{port}"
+    result = {"workers": workers, "users": users}
+    try:
+        async with aiohttp.ClientSession() as session:
+            try:
+                await wait_ready(session, router_url, workers)
+            except RuntimeError:
+                log.seek(0)
+                print(log.read().decode("utf-8", "replace")[-3000:])
+                raise
+
+            async def user_dialog(user_id: int):
+                # Пользователь шлет весь диалог подряд, не дожидаясь ответов бота
+                started = time.perf_counter()
+                for update in dialog_updates(user_id, interest, user_id * 10):
+                    async with session.post(f"{router_url}/webhook", json=update,
+                                            headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}) as response:
+                        if response.status != 200:
+                            raise RuntimeError(f"webhook ответил {response.status}")
+                return started
+
+            started = time.perf_counter()
+            sent_at = dict(zip(range(1, users + 1), await asyncio.gather(*(user_dialog(i) for i in range(1, users + 1)))))
+            result["accept_s"] = time.perf_counter() - started
+
+            # Ждем итоговое сообщение маршрута в каждом чате
+            chats = bot_api["state"]["chats"]
+            finished_at = {}
+            deadline = time.perf_counter() + timeout
+            while len(finished_at) < users and time.perf_counter() < deadline:
+                now = time.perf_counter()
+                for user_id in sent_at:
+                    if user_id not in finished_at and any(DONE_MARKER in text for _, text in chats.get(user_id, [])):
+                        finished_at[user_id] = now
+                await asyncio.sleep(0.05)
+            result["total_s"] = time.perf_counter() - started
+
+            async with session.get(f"{router_url}/stats") as response:
+                result["stats"] = await response.json()
+
+        latencies = sorted(finished_at[user_id] - sent_at[user_id] for user_id in finished_at)
+        result["completed"] = len(finished_at)
+        result["updates_per_s"] = users * 4 / result["accept_s"]
+        result["routes_per_s"] = len(finished_at) / result["total_s"]
+        result["latency_p50_s"] = statistics.median(latencies) if latencies else None
+        result["latency_p95_s"] = latencies[int(len(latencies) * 0.95) - 1] if latencies else None
+        # Нарушение порядка видно по ответу "начнем сначала": шаг пришел раньше предыдущего
+        result["out_of_order_chats"] = sum(
+            1 for user_id in sent_at
+            if any(marker in text for _, text in chats.get(user_id, []) for marker in RESTART_MARKERS)
+        )
+        result["bot_api_requests"] = bot_api["state"]["requests"]
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.close()
+        await bot_runner.cleanup()
+        await gpt_runner.cleanup()
+
+    per_worker = result["stats"]["router"]["per_worker"]
+    print(f"📊 {workers} процессов, {users} пользователей: прием {result['updates_per_s']:.0f} обновлений/с, "
+          f"маршрутов {result['completed']}/{users} за {result['total_s']:.1f} с "
+          f"({result['routes_per_s']:.1f}/с), p50 {result['latency_p50_s']:.2f} с, p95 {result['latency_p95_s']:.2f} с")
+    print(f"🔀 Распределение по процессам: {per_worker}; нарушений порядка: {result['out_of_order_chats']}; "
+          f"запросов к Bot API: {result['bot_api_requests']}")
+    return result
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Нагрузочный тест webhook-режима")
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    arg_parser.add_argument("--users", type=int, default=50)
+    arg_parser.add_argument("--port", type=int, default=8180)
+    arg_parser.add_argument("--gpt-delay", type=float, default=0.05, help="задержка ответа заглушки YandexGPT, с")
+    args = arg_parser.parse_args()
+    for worker_count in args.workers:
+        outcome = asyncio.run(run(worker_count, args.users, args.port, args.gpt_delay))
+        if outcome["completed"] < args.users or outcome["out_of_order_chats"]:
+            sys.exit(1)
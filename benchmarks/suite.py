@@ -0,0 +1,285 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from benchmarks.bench_catalogue_loading import synthetic_dataframe
+from benchmarks.synthetic import random_point
+
+# Воспроизводимый набор замеров для сравнения коммитов: синтетические каталоги в формате
+# cultural_objects_mnn.xlsx в масштабе Нижнего Новгорода и в 10-100 раз больше, фиксированные seed.
+# Замеры: загрузка таблицы, подбор мест по интересу, расчет маршрута (время и длина), ссылки на
+# Яндекс Карты и полный generate_and_send_route против заглушек Bot API и YandexGPT.
+# Результат - JSON {метрика: значение}; с --baseline метрики времени (*_ms) сравниваются с прошлым
+# прогоном, и рост больше порога считается регрессией (код выхода 1).
+#   python -m benchmarks.suite --output benchmarks/results/new.json --baseline benchmarks/results/old.json
+#   python -m benchmarks.suite --scales 1 --routes 20 --users 5   (быстрый прогон)
+
+# Строк в cultural_objects_mnn.xlsx
+NN_SCALE = 259
+SEED = 2024
+BUDGETS = ("1 час", "2 часа", "3 часа", "4 часа")
+# Разница меньше этой не считается регрессией, как бы ни вырос процент (шум на микрозамерах)
+MIN_REGRESSION_MS = 0.05
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def timed_ms(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def bench_parser(excel_path: str, repeats: int) -> dict:
+    from parserxsl import Parser
+    durations = []
+    for _ in range(repeats):
+        landmarks, duration = timed_ms(Parser.load_landmarks_from_excel, excel_path)
+        durations.append(duration)
+    return {"parser_load_ms": statistics.median(durations), "parser_loaded": len(landmarks)}
+
+
+def bench_interest(optimizer, interests, repeats: int) -> dict:
+    #Время одного подбора мест по интересу (по всем кнопкам интересов бота)
+    durations = []
+    found = []
+    for _ in range(repeats):
+        for interest in interests:
+            landmarks, duration = timed_ms(optimizer.get_landmarks_by_interest, interest, 40)
+            durations.append(duration)
+            found.append(len(landmarks))
+    return {"interest_p50_ms": percentile(durations, 0.5), "interest_p95_ms": percentile(durations, 0.95),
+            "interest_avg_found": statistics.mean(found)}
+
+
+def route_cases(optimizer, count: int, seed: int = SEED, candidates: int = 40):
+    #Кандидаты - ближайшие к пользователю места (как при прогулке от текущей точки) и бюджет времени
+    rnd = random.Random(seed)
+    cases = []
+    for _ in range(count):
+        start = random_point(rnd)
+        nearby = [name for name, _ in optimizer.nearest_landmarks(start, candidates)]
+        cases.append((nearby, start, rnd.choice(BUDGETS)))
+    return cases
+
+
+def route_length_km(optimizer, route, start) -> float:
+    points = [start, *(optimizer.landmarks[landmark]['coordinates'] for landmark in route)]
+    return sum(optimizer.calculate_distance(a, b) for a, b in zip(points, points[1:]))
+
+
+def bench_routes(optimizer, cases) -> dict:
+    #find_optimal_route решателем по умолчанию: время расчета и качество маршрута
+    durations, lengths, minutes, stops = [], [], [], []
+    for candidates, start, available_time in cases:
+        route, duration = timed_ms(optimizer.find_optimal_route, candidates, start, max_places=8,
+                                   time_budget=optimizer.time_budget_minutes(available_time))
+        durations.append(duration)
+        lengths.append(route_length_km(optimizer, route, start))
+        minutes.append(optimizer.route_duration_minutes(route, start))
+        stops.append(len(route))
+    return {"route_p50_ms": percentile(durations, 0.5), "route_p95_ms": percentile(durations, 0.95),
+            "route_avg_km": statistics.mean(lengths), "route_avg_minutes": statistics.mean(minutes),
+            "route_avg_stops": statistics.mean(stops)}
+
+
+def bench_links(landmarks: dict, routes, repeats: int) -> dict:
+    #Ссылки одного маршрута: на каждое место и на весь маршрут
+    from yandex_gpt import YandexMaps
+    durations = []
+    for _ in range(repeats):
+        for route, start in routes:
+            started = time.perf_counter()
+            for landmark in route:
+                YandexMaps.generate_yandex_map_link(landmarks[landmark]['coordinates'], landmark)
+            YandexMaps.generate_route_map_link(route, start, landmarks)
+            durations.append((time.perf_counter() - started) * 1000)
+    return {"links_per_route_p50_ms": percentile(durations, 0.5)}
+
+
+async def bench_pipeline(excel_path: str, snapshot_path: str, users: int, interests, gpt_delay: float) -> dict:
+    #generate_and_send_route целиком: пул маршрутов, очередь YandexGPT, потоковые правки и лимиты Telegram
+    import main
+    from aiogram.types import Message
+    from app_container import AppContainer
+    from local_stubs import create_bot_api_stub_app, create_gpt_stub_app, start_stub
+
+    gpt_api = create_gpt_stub_app(delay=gpt_delay)
+    gpt_runner, gpt_url = await start_stub(gpt_api)
+    bot_api = create_bot_api_stub_app()
+    bot_runner, bot_url = await start_stub(bot_api)
+    app = AppContainer({
+        'CATALOGUE_PATH': excel_path,
+        'CATALOGUE_SNAPSHOT_PATH': snapshot_path,
+        'TELEGRAM_TOKEN': "123456:bench-suite-token",
+        'TELEGRAM_API_URL': bot_url,
+        'YANDEX_GPT_API_KEY': "stub",
+        'YANDEX_FOLDER_ID': "stub",
+        'YANDEX_GPT_URL': f"{gpt_url}/foundationModels/v1/completion",
+        'LLM_CACHE_PATH': None,
+        'PREGENERATED_DESCRIPTIONS_PATH': None,
+        'METRICS_PORT': 0,
+    })
+    # Только настройки выше и значения по умолчанию - config.py разработчика не влияет на результат
+    app.config = types.SimpleNamespace()
+    bot_app, main.app = main.app, app
+    gpt_state, bot_state = gpt_api["state"], bot_api["state"]
+
+    async def one(user_id: int, interest: str) -> float:
+        await app.sessions.reset(user_id, step="processing", interest=interest, time="2 часа",
+                                 location=random_point(random.Random(user_id)))
+        message = Message.model_validate({
+            "message_id": user_id, "date": int(time.time()), "text": "📍 Отправить геолокацию",
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+        }, context={"bot": app.bot})
+        started = time.perf_counter()
+        await main.generate_and_send_route(message)
+        return (time.perf_counter() - started) * 1000
+
+    try:
+        app.warm_up()
+        await app.yandex_gpt.start()
+        app.routing.start()
+        # Первый маршрут дожидается процессов пула - в замер не входит
+        await one(0, interests[0])
+        gpt_before, bot_before = gpt_state["requests"], bot_state["requests"]
+        started = time.perf_counter()
+        durations = await asyncio.gather(*(one(user_id, interests[user_id % len(interests)])
+                                           for user_id in range(1, users + 1)))
+        total = time.perf_counter() - started
+        return {"pipeline_route_p50_ms": percentile(durations, 0.5),
+                "pipeline_route_p95_ms": percentile(durations, 0.95),
+                "pipeline_routes_per_s": users / total,
+                "pipeline_gpt_requests_per_route": (gpt_state["requests"] - gpt_before) / users,
+                "pipeline_bot_api_calls_per_route": (bot_state["requests"] - bot_before) / users,
+                "pipeline_inline_routes": app.routing.get_stats()["inline"]}
+    finally:
+        main.app = bot_app
+        app.routing.close()
+        await app.yandex_gpt.close()
+        await app.bot.session.close()
+        await app.sessions.close()
+        await gpt_runner.cleanup()
+        await bot_runner.cleanup()
+
+
+def run_scale(scale: int, workdir: str, args) -> dict:
+    from catalogue_snapshot import load_catalogue
+    from optimazer import RouteOptimizer
+    rows = NN_SCALE * scale
+    excel_path = os.path.join(workdir, f"catalogue_x{scale}.xlsx")
+    snapshot_path = os.path.join(workdir, f"catalogue_x{scale}.snapshot")
+    synthetic_dataframe(rows, seed=SEED).to_excel(excel_path, index=False)
+
+    result = {"rows": rows, **bench_parser(excel_path, args.repeats)}
+    catalogue = load_catalogue(excel_path, snapshot_path)
+    optimizer = RouteOptimizer(catalogue.landmarks, keyword_ids=catalogue.keyword_ids,
+                               matrix_cache_dir=os.path.join(workdir, "matrix_cache"))
+    result.update(bench_interest(optimizer, catalogue.interests, args.repeats * 10))
+    cases = route_cases(optimizer, args.routes)
+    result.update(bench_routes(optimizer, cases))
+    routes = [(optimizer.find_optimal_route(candidates, start, max_places=8), start) for candidates, start, _ in cases]
+    result.update(bench_links(catalogue.landmarks, routes, args.repeats * 10))
+    if args.users:
+        result.update(asyncio.run(bench_pipeline(excel_path, snapshot_path, args.users, catalogue.interests,
+                                                 args.gpt_delay)))
+    print(f"📊 x{scale} ({rows} мест): загрузка {result['parser_load_ms']:.0f} мс, "
+          f"интерес p50 {result['interest_p50_ms']:.3f} мс, маршрут p50 {result['route_p50_ms']:.2f} мс "
+          f"({result['route_avg_km']:.1f} км, {result['route_avg_stops']:.1f} мест), "
+          f"ссылки {result['links_per_route_p50_ms']:.3f} мс"
+          + (f", бот p50 {result['pipeline_route_p50_ms']:.0f} мс" if args.users else ""))
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(results: dict) -> dict:
+    #{"x1": {"route_p50_ms": ...}} -> {"x1.route_p50_ms": ...}
+    return {f"{scale}.{name}": value for scale, metrics in results.items() for name, value in metrics.items()}
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    #Метрики времени (*_ms), выросшие больше чем в (1 + threshold) раз; остальные выводятся для справки
+    regressions = []
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    print(f"🔎 Сравнение с {baseline['meta'].get('commit')} (порог {threshold * 100:.0f}%):")
+    for name in sorted(set(old) & set(new)):
+        before, after = old[name], new[name]
+        if not isinstance(before, (int, float)) or not isinstance(after, (int, float)):
+            continue
+        change = (after - before) / before if before else 0.0
+        regressed = (name.endswith("_ms") and change > threshold and after - before > MIN_REGRESSION_MS)
+        if regressed:
+            regressions.append(name)
+        print(f"  {'❌' if regressed else '  '} {name}: {before:.3f} -> {after:.3f} ({change * 100:+.1f}%)")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Набор бенчмарков для сравнения коммитов")
+    arg_parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                            help="размеры каталогов в долях Нижнего Новгорода (259 мест)")
+    arg_parser.add_argument("--repeats", type=int, default=3)
+    arg_parser.add_argument("--routes", type=int, default=100, help="маршрутов на каталог")
+    arg_parser.add_argument("--users", type=int, default=10, help="маршрутов через бота (0 - без прогона бота)")
+    arg_parser.add_argument("--gpt-delay", type=float, default=0.05, help="задержка заглушки YandexGPT, с")
+    arg_parser.add_argument("--output", default=None, help="файл результатов (по умолчанию benchmarks/results/<коммит>.json)")
+    arg_parser.add_argument("--baseline", default=None, help="прошлые результаты для проверки регрессий")
+    arg_parser.add_argument("--current", default=None, help="сравнить готовый файл результатов вместо прогона")
+    arg_parser.add_argument("--threshold", type=float, default=0.2, help="допустимый рост времени, доля")
+    args = arg_parser.parse_args()
+
+    if args.current:
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+    else:
+        from logs import setup_logging
+        # Журнал бота в прогоне не нужен - только предупреждения (строки с ошибками в таблице - намеренные)
+        setup_logging("WARNING", fmt="text", levels={"parserxsl": "ERROR"})
+        commit = git_commit()
+        current = {
+            "meta": {"commit": commit, "created_at": int(time.time()), "python": platform.python_version(),
+                     "platform": platform.platform(), "cpus": os.cpu_count(), "seed": SEED,
+                     "args": {key: value for key, value in vars(args).items()
+                              if key not in ("output", "baseline", "current")}},
+            "results": {},
+        }
+        with tempfile.TemporaryDirectory() as workdir:
+            for scale in args.scales:
+                current["results"][f"x{scale}"] = run_scale(scale, workdir, args)
+        output = args.output or os.path.join("benchmarks", "results", f"{commit}.json")
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"💾 Результаты: {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"❌ Регрессии: {', '.join(regressions)}")
+            sys.exit(1)
+        print("✅ Регрессий нет")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import random
+from typing import Dict
+
+# Синтетические каталоги в масштабе Нижнего Новгорода (и крупнее) для бенчмарков
+
+NN_BOUNDS = (56.20, 43.75, 56.40, 44.10)  # lat_min, lon_min, lat_max, lon_max
+
+CATEGORIES = [
+    "история", "архитектура", "музей", "искусство", "культура", "стрит-арт", "парк",
+    "природа", "отдых", "кафе", "ресторан", "магазин", "театр", "кино", "памятник",
+]
+FEATURES = ["Архитектура", "История", "Панорамные виды", "Фотолокации", "Кафе", "Природа", "Прогулки", "Выставки"]
+
+
+def generate_landmarks(count: int, seed: int = 42, bounds=NN_BOUNDS) -> Dict:
+    #Каталог в формате Parser.load_landmarks_from_excel
+    rnd = random.Random(seed)
+    lat_min, lon_min, lat_max, lon_max = bounds
+    landmarks = {}
+    for i in range(count):
+        category = rnd.choice(CATEGORIES)
+        description = f"Объект №{i}: {category}, {rnd.choice(['исторический', 'современный', 'уютный'])} {rnd.choice(['сквер', 'собор', 'музей', 'кофейня', 'театр', 'вид'])}"
+        landmarks[f"Объект {i}"] = {
+            'coordinates': (round(rnd.uniform(lat_min, lat_max), 6), round(rnd.uniform(lon_min, lon_max), 6)),
+            'category': category,
+            'rating': round(rnd.uniform(3.5, 5.0), 1),
+            'visit_time': round(rnd.choice([0.3, 0.5, 1.0, 1.5]), 1),
+            'description': description,
+            'features': rnd.sample(FEATURES, 3),
+            'original_description': description,
+        }
+    return landmarks
+
+
+def random_point(rnd: random.Random, bounds=NN_BOUNDS):
+    lat_min, lon_min, lat_max, lon_max = bounds
+    return rnd.uniform(lat_min, lat_max), rnd.uniform(lon_min, lon_max)
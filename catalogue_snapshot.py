@@ -0,0 +1,234 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Бинарный снимок каталога: все строки в одной таблице, числа - упакованными массивами.
+# Бот читает только его и не импортирует pandas/openpyxl; снимок пересобирается из xlsx,
+# когда у таблицы меняются размер/mtime и содержимое (sha1).
+
+MAGIC = b"NNCAT"
+VERSION = 1
+
+
+class Catalogue:
+    #Каталог со всем, что бот считает при старте: места, кнопки интересов, статистика, индекс интересов
+
+    def __init__(self, landmarks: Dict, interests: List[str], category_stats: Dict[str, int],
+                 keyword_ids: Optional[Dict[str, List[int]]] = None, source: Optional[dict] = None):
+        self.landmarks = landmarks
+        self.interests = interests
+        self.category_stats = category_stats
+        self.keyword_ids = keyword_ids
+        self.source = source or {}
+
+    @classmethod
+    def from_landmarks(cls, landmarks: Dict, source: Optional[dict] = None) -> "Catalogue":
+        from keybords import Keybord
+        from keyword_index import KeywordIndex
+        from optimazer import DISPLAY_TO_CATEGORY_MAPPING
+
+        category_stats = {}
+        for data in landmarks.values():
+            category_stats[data['category']] = category_stats.get(data['category'], 0) + 1
+        keyword_index = KeywordIndex(landmarks, DISPLAY_TO_CATEGORY_MAPPING)
+        keyword_ids = {keyword: sorted(ids) for keyword, ids in keyword_index.keyword_ids.items()}
+        return cls(landmarks, Keybord.create_interests_keyboard(landmarks), category_stats, keyword_ids, source)
+
+
+def source_fingerprint(path: str, with_hash: bool = True) -> dict:
+    stat = os.stat(path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        fingerprint["sha1"] = digest.hexdigest()
+    return fingerprint
+
+
+class _StringTable:
+    def __init__(self):
+        self.index = {}
+        self.strings = []
+
+    def add(self, value: str) -> int:
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return position
+
+
+def _write_array(f, values: array):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    f.write(struct.pack("<cI", values.typecode.encode("ascii"), len(values)))
+    f.write(values.tobytes())
+
+
+def _read_array(data: memoryview, offset: int):
+    typecode, count = struct.unpack_from("<cI", data, offset)
+    offset += struct.calcsize("<cI")
+    values = array(typecode.decode("ascii"))
+    size = values.itemsize * count
+    if offset + size > len(data):
+        raise ValueError("снимок каталога обрезан")
+    values.frombytes(data[offset:offset + size])
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values, offset + size
+
+
+def write_snapshot(catalogue: Catalogue, path: str):
+    strings = _StringTable()
+    names, categories, descriptions = array("I"), array("I"), array("I")
+    feature_offsets, feature_ids = array("I", [0]), array("I")
+    lats, lons, ratings, visit_times = array("d"), array("d"), array("d"), array("d")
+    for name, data in catalogue.landmarks.items():
+        names.append(strings.add(name))
+        categories.append(strings.add(data['category']))
+        descriptions.append(strings.add(data.get('description', '')))
+        for feature in data.get('features', []):
+            feature_ids.append(strings.add(feature))
+        feature_offsets.append(len(feature_ids))
+        lat, lon = data['coordinates']
+        lats.append(lat)
+        lons.append(lon)
+        ratings.append(data['rating'])
+        visit_times.append(data['visit_time'])
+
+    interests = array("I", [strings.add(interest) for interest in catalogue.interests])
+    stat_categories = array("I", [strings.add(category) for category in catalogue.category_stats])
+    stat_counts = array("I", catalogue.category_stats.values())
+
+    keyword_ids = catalogue.keyword_ids or {}
+    keywords = array("I", [strings.add(keyword) for keyword in keyword_ids])
+    keyword_offsets, keyword_values = array("I", [0]), array("I")
+    for ids in keyword_ids.values():
+        keyword_values.extend(ids)
+        keyword_offsets.append(len(keyword_values))
+
+    encoded = [value.encode("utf-8") for value in strings.strings]
+    string_offsets = array("I", [0])
+    for value in encoded:
+        string_offsets.append(string_offsets[-1] + len(value))
+
+    meta = json.dumps({"source": catalogue.source, "created_at": int(time.time())}).encode("utf-8")
+    # Временный файл свой у каждого процесса (несколько рабочих процессов могут пересобирать снимок)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<HI", VERSION, len(meta)))
+        f.write(meta)
+        _write_array(f, string_offsets)
+        f.write(struct.pack("<I", string_offsets[-1]))
+        f.write(b"".join(encoded))
+        for values in (names, categories, descriptions, feature_offsets, feature_ids, lats, lons, ratings,
+                       visit_times, interests, stat_categories, stat_counts, keywords, keyword_offsets, keyword_values):
+            _write_array(f, values)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> Catalogue:
+    with open(path, "rb") as f:
+        data = memoryview(f.read())
+    if bytes(data[:len(MAGIC)]) != MAGIC:
+        raise ValueError("не снимок каталога")
+    version, meta_size = struct.unpack_from("<HI", data, len(MAGIC))
+    if version != VERSION:
+        raise ValueError(f"неподдерживаемая версия снимка: {version}")
+    offset = len(MAGIC) + struct.calcsize("<HI")
+    meta = json.loads(bytes(data[offset:offset + meta_size]))
+    offset += meta_size
+
+    string_offsets, offset = _read_array(data, offset)
+    (blob_size,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    blob = bytes(data[offset:offset + blob_size])
+    offset += blob_size
+    strings = [blob[string_offsets[i]:string_offsets[i + 1]].decode("utf-8") for i in range(len(string_offsets) - 1)]
+
+    arrays = []
+    for _ in range(15):
+        values, offset = _read_array(data, offset)
+        arrays.append(values)
+    if offset != len(data):
+        raise ValueError("лишние данные в конце снимка каталога")
+    (names, categories, descriptions, feature_offsets, feature_ids, lats, lons, ratings,
+     visit_times, interests, stat_categories, stat_counts, keywords, keyword_offsets, keyword_values) = arrays
+
+    landmarks = {}
+    for i in range(len(names)):
+        description = strings[descriptions[i]]
+        landmarks[strings[names[i]]] = {
+            'coordinates': (lats[i], lons[i]),
+            'category': strings[categories[i]],
+            'rating': ratings[i],
+            'visit_time': visit_times[i],
+            'description': description,
+            'features': [strings[j] for j in feature_ids[feature_offsets[i]:feature_offsets[i + 1]]],
+            'original_description': description
+        }
+
+    keyword_ids = {
+        strings[keyword]: keyword_values[keyword_offsets[i]:keyword_offsets[i + 1]].tolist()
+        for i, keyword in enumerate(keywords)
+    }
+    return Catalogue(
+        landmarks,
+        [strings[i] for i in interests],
+        {strings[category]: count for category, count in zip(stat_categories, stat_counts)},
+        keyword_ids,
+        meta.get("source", {})
+    )
+
+
+def load_catalogue(excel_path: str = "cultural_objects_mnn.xlsx",
+                   snapshot_path: str = "cultural_objects_mnn.snapshot") -> Catalogue:
+    #Снимок, если он соответствует таблице; иначе разбор xlsx и запись нового снимка
+    started = time.perf_counter()
+    snapshot = None
+    if os.path.exists(snapshot_path):
+        try:
+            snapshot = read_snapshot(snapshot_path)
+        except (OSError, ValueError, IndexError, struct.error) as e:
+            logger.warning("⚠️ Снимок каталога поврежден, пересобираем: %s", e)
+
+    if snapshot is not None:
+        if not os.path.exists(excel_path):
+            logger.info("⚡ Каталог из снимка %s (таблица %s отсутствует)", snapshot_path, excel_path)
+            return snapshot
+        saved = snapshot.source
+        current = source_fingerprint(excel_path, with_hash=False)
+        fresh = saved.get("size") == current["size"] and saved.get("mtime_ns") == current["mtime_ns"]
+        if not fresh and saved.get("size") == current["size"]:
+            # mtime изменился (копирование, touch) - сверяем содержимое
+            fresh = saved.get("sha1") == source_fingerprint(excel_path)["sha1"]
+        if fresh:
+            logger.info("⚡ Каталог загружен из снимка за %.1f мс: %d мест",
+                        (time.perf_counter() - started) * 1000, len(snapshot.landmarks))
+            return snapshot
+
+    from parserxsl import Parser
+    landmarks = Parser.load_landmarks_from_excel(excel_path)
+    if len(landmarks) == 0:
+        landmarks = Parser.get_default_landmarks()
+    if not os.path.exists(excel_path):
+        return Catalogue.from_landmarks(landmarks)
+
+    catalogue = Catalogue.from_landmarks(landmarks, source_fingerprint(excel_path))
+    try:
+        write_snapshot(catalogue, snapshot_path)
+        logger.info("💾 Снимок каталога записан: %s", snapshot_path)
+    except OSError as e:
+        logger.warning("⚠️ Не удалось записать снимок каталога: %s", e)
+    return catalogue
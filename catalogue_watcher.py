@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogueWatcher:
+    #Фоновая проверка таблицы каталога: при изменении каталог, индексы, матрица расстояний и кнопки
+    #интересов пересобираются в отдельном потоке и подменяются в боте без перезапуска
+
+    def __init__(self, app, interval: float = 30.0):
+        self.app = app
+        self.interval = interval
+        self.path = app.setting('CATALOGUE_PATH', 'cultural_objects_mnn.xlsx')
+        source = app.catalogue.source
+        self.fingerprint = (source.get("size"), source.get("mtime_ns")) if source else self._current_fingerprint()
+        self._pending = None
+        self._task = None
+        self._lock = asyncio.Lock()
+        self.stats = {"checks": 0, "reloads": 0, "errors": 0, "last_reload_ms": 0.0}
+
+    def _current_fingerprint(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.exception("❌ Ошибка проверки каталога: %s", e)
+
+    async def check(self) -> bool:
+        #Перезагрузка, если таблица изменилась и не менялась с прошлой проверки (файл уже дописан)
+        self.stats["checks"] += 1
+        current = self._current_fingerprint()
+        if current is None or current == self.fingerprint:
+            self._pending = None
+            return False
+        if current != self._pending:
+            self._pending = current
+            return False
+        return await self.reload(current)
+
+    def _build(self):
+        catalogue = self.app.load_catalogue()
+        return catalogue, self.app.build_route_optimizer(catalogue)
+
+    async def reload(self, fingerprint: Optional[Tuple[int, int]] = None) -> bool:
+        async with self._lock:
+            fingerprint = fingerprint or self._current_fingerprint()
+            started = time.perf_counter()
+            logger.info("🔄 Таблица каталога изменилась, пересобираем: %s", self.path)
+            try:
+                # Разбор таблицы и построение индексов не блокируют event loop
+                catalogue, route_optimizer = await asyncio.to_thread(self._build)
+            except Exception as e:
+                self.stats["errors"] += 1
+                # Остаемся на старом каталоге; повторим, когда таблица изменится снова
+                self.fingerprint, self._pending = fingerprint, None
+                logger.exception("❌ Не удалось перезагрузить каталог, работаем на прежнем: %s", e)
+                return False
+
+            self.app.swap_catalogue(catalogue, route_optimizer)
+            self.fingerprint, self._pending = fingerprint, None
+            # Матрицы прежнего каталога копились бы при каждой перезагрузке; чистит только этот процесс,
+            # а не каждый процесс пула или бенчмарк, открывающий общий matrix_cache
+            await asyncio.to_thread(route_optimizer.prune_matrix_cache)
+            self.stats["reloads"] += 1
+            self.stats["last_reload_ms"] = (time.perf_counter() - started) * 1000
+            logger.info("✅ Каталог обновлен (версия %s): %d мест за %.0f мс",
+                        self.app.catalogue_version, len(catalogue.landmarks), self.stats['last_reload_ms'])
+            return True
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "version": self.app.catalogue_version}
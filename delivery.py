@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+from rate_limit import TokenBucket
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Доставка сообщений в Telegram: карточки мест склеиваются в минимум сообщений (лимит 4096 символов),
+# ответы YandexGPT показываются по мере генерации (правкой сообщения не чаще раза в EDIT_INTERVAL),
+# а все запросы к Bot API проходят через ведра токенов с лимитами Telegram и повторяются при 429.
+
+TELEGRAM_TEXT_LIMIT = 4096
+# Telegram: ~30 сообщений в секунду на бота, ~1 в секунду в личный чат (короткие всплески допустимы),
+# ~20 в минуту в группу
+GLOBAL_RATE = 30.0
+CHAT_RATE = 1.0
+CHAT_BURST = 5
+GROUP_RATE = 20 / 60
+# Как часто правим сообщение, пока дописывается ответ (правки тоже идут в лимит чата)
+EDIT_INTERVAL = 1.0
+# Методы, которые Telegram считает отправкой сообщений
+LIMITED_METHODS = {
+    "sendMessage", "editMessageText", "editMessageReplyMarkup", "sendLocation", "sendPhoto",
+    "sendMediaGroup", "sendDocument", "sendVenue", "copyMessage", "forwardMessage",
+}
+
+
+def telegram_length(text: str) -> int:
+    #Длина так, как ее считает Telegram (UTF-16), - эмодзи занимают по 2 единицы
+    return len(text.encode("utf-16-le")) // 2
+
+
+def fit_text(text: str, limit: int = TELEGRAM_TEXT_LIMIT) -> str:
+    #Текст длиннее лимита укорачивается (с многоточием), а не теряется
+    while telegram_length(text) > limit:
+        excess = telegram_length(text) - limit
+        text = text[:max(1, len(text) - excess - 1)].rstrip() + "…"
+    return text
+
+
+def merge_cards(cards: List[Tuple[str, list]], limit: int = TELEGRAM_TEXT_LIMIT,
+                separator: str = "\n") -> List[Tuple[str, list]]:
+    #Склейка карточек (текст, ряды кнопок) в сообщения не длиннее limit; порядок карточек сохраняется
+    messages = []
+    text, buttons = "", []
+    for card_text, card_buttons in cards:
+        card_text = fit_text(card_text, limit)
+        candidate = f"{text}{separator}{card_text}" if text else card_text
+        if text and telegram_length(candidate) > limit:
+            messages.append((text, buttons))
+            text, buttons = card_text, list(card_buttons)
+        else:
+            text = candidate
+            buttons.extend(card_buttons)
+    if text:
+        messages.append((text, buttons))
+    return messages
+
+
+class StreamedText:
+    #Ответ, который дописывается в фоне: text - уже пришедшая часть; started - пришла первая часть
+    #(или ответ завершен), done - ответ завершен. Без ответа остается fallback
+
+    def __init__(self, fallback: str = "", text: Optional[str] = None):
+        self.fallback = fallback
+        self.text = text or ""
+        self.started = asyncio.Event()
+        self.done = asyncio.Event()
+        self.first_chunk_s: Optional[float] = None
+        if text:
+            self.started.set()
+            self.done.set()
+
+    def update(self, text: str, started: Optional[float] = None):
+        #Пришла очередная часть ответа (накопленный текст)
+        if not text or self.done.is_set():
+            return
+        if self.first_chunk_s is None and started is not None:
+            self.first_chunk_s = time.monotonic() - started
+        self.text = text
+        self.started.set()
+
+    def finish(self, text: Optional[str] = None):
+        #Ответ завершен (text - окончательный вариант); без ответа остается fallback
+        if self.done.is_set():
+            return
+        if text:
+            self.text = text
+        if not self.text:
+            self.text = self.fallback
+        self.started.set()
+        self.done.set()
+
+    def reset(self):
+        #Показанная часть оказалась негодной - ответ будет получен заново
+        if not self.done.is_set():
+            self.text = ""
+            self.started.clear()
+
+    async def consume(self, chunks, timeout: Optional[float] = None) -> str:
+        #Читает асинхронный генератор накопленного текста; по таймауту остается то, что успело прийти
+        started = time.monotonic()
+
+        async def read():
+            async for text in chunks:
+                self.update(text, started)
+
+        try:
+            await asyncio.wait_for(read(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("⏱️ YandexGPT не ответил за %s с, показываем то, что успело прийти", timeout)
+            if self.text:
+                self.text = self.text.rstrip() + "…"
+        except Exception as e:
+            logger.error("❌ Ошибка генерации ответа: %s", e)
+        finally:
+            await chunks.aclose()
+            self.finish()
+        return self.text
+
+
+async def _show(message, sent, text: str, final: bool, **kwargs):
+    #Отправка или правка сообщения; незакрытая разметка в части ответа - не ошибка, а повод подождать
+    from aiogram.exceptions import TelegramBadRequest
+    try:
+        if sent is None:
+            return await message.answer(text, **kwargs), True
+        await sent.edit_text(text, **kwargs)
+        return sent, True
+    except TelegramBadRequest as e:
+        if "not modified" in str(e):
+            return sent, True
+        if not final:
+            return sent, False
+        # Полный ответ с нарушенной разметкой показываем без нее
+        kwargs.pop("parse_mode", None)
+        if sent is None:
+            return await message.answer(text, **kwargs), True
+        await sent.edit_text(text, **kwargs)
+        return sent, True
+
+
+async def _wait_more(streamed: StreamedText, interval: float):
+    # Следующая правка - через interval или сразу по завершении ответа
+    try:
+        await asyncio.wait_for(streamed.done.wait(), interval)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def edit_progressively(message, render: Callable[[str], str], streamed: StreamedText,
+                             interval: float = EDIT_INTERVAL, **kwargs):
+    #Сообщение с ответом, который дописывается: отправляется с первой частью и правится не чаще раза
+    #в interval секунд; последняя правка - полный текст. Возвращает отправленное сообщение
+    sent, shown = None, None
+    while True:
+        await streamed.started.wait()
+        finished = streamed.done.is_set()
+        text = fit_text(render(streamed.text))
+        if text != shown:
+            sent, ok = await _show(message, sent, text, finished, **kwargs)
+            if ok:
+                shown = text
+        if finished:
+            return sent
+        await _wait_more(streamed, interval)
+
+
+async def send_streamed_cards(message, cards: List[Tuple[Callable[[str], str], StreamedText, list]],
+                              interval: float = EDIT_INTERVAL, limit: int = TELEGRAM_TEXT_LIMIT,
+                              separator: str = "\n", parse_mode: Optional[str] = "Markdown") -> int:
+    #Карточки (render(описание) -> текст, описание, ряды кнопок) в порядке маршрута дописываются
+    #в текущее сообщение по мере генерации; карточка, не влезающая в лимит, начинает новое сообщение.
+    #Возвращает число отправленных сообщений
+    from aiogram.types import InlineKeyboardMarkup
+
+    sent, shown = None, None
+    done_text, done_buttons = "", []
+    messages = 0
+    for render, streamed, buttons in cards:
+        while True:
+            await streamed.started.wait()
+            finished = streamed.done.is_set()
+            card = fit_text(render(streamed.text), limit)
+            text = f"{done_text}{separator}{card}" if done_text else card
+            if done_text and telegram_length(text) > limit:
+                # Карточка не влезает: сообщение остается с готовыми карточками, эта начнет новое
+                if shown != done_text:
+                    await _show(message, sent, done_text, True, parse_mode=parse_mode,
+                                reply_markup=InlineKeyboardMarkup(inline_keyboard=done_buttons))
+                sent, shown = None, None
+                done_text, done_buttons = "", []
+                continue
+            if text != shown:
+                new_message = sent is None
+                sent, ok = await _show(message, sent, text, finished, parse_mode=parse_mode,
+                                       reply_markup=InlineKeyboardMarkup(inline_keyboard=done_buttons + buttons))
+                if ok:
+                    shown = text
+                    messages += new_message
+            if finished:
+                break
+            await _wait_more(streamed, interval)
+        done_text, done_buttons = text, done_buttons + buttons
+    return messages
+
+
+class RateLimitMiddleware:
+    #Request-middleware aiogram (bot.session.middleware): общий лимит бота, лимит на чат и повтор после 429
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, chat_rate: float = CHAT_RATE, chat_burst: int = CHAT_BURST,
+                 group_rate: float = GROUP_RATE, max_retries: int = 3, max_chats: int = 10000):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self._chat_buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self.stats = {"requests": 0, "limited": 0, "waited_s": 0.0, "retries": 0, "retry_after_s": 0.0,
+                      "failed": 0}
+
+    def _chat_bucket(self, chat_id) -> Optional[TokenBucket]:
+        if not isinstance(chat_id, int):
+            # @username канала и т.п. - только общий лимит
+            return None
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if chat_id < 0:
+                bucket = TokenBucket(self.group_rate, 1)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+            if len(self._chat_buckets) > self.max_chats:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    async def __call__(self, make_request, bot, method):
+        from aiogram.exceptions import TelegramRetryAfter
+
+        self.stats["requests"] += 1
+        limited = method.__api_method__ in LIMITED_METHODS
+        chat_bucket = self._chat_bucket(getattr(method, "chat_id", None)) if limited else None
+        attempt = 0
+        with span(f"telegram.{method.__api_method__}") as stage:
+            while True:
+                if limited:
+                    self.stats["limited"] += 1
+                    waited = 0.0
+                    if chat_bucket is not None:
+                        waited += await chat_bucket.acquire()
+                    waited += await self.global_bucket.acquire()
+                    self.stats["waited_s"] += waited
+                    stage.set(waited_ms=round(waited * 1000, 1))
+                try:
+                    return await make_request(bot, method)
+                except TelegramRetryAfter as e:
+                    attempt += 1
+                    stage.set(retries=attempt)
+                    if attempt > self.max_retries:
+                        self.stats["failed"] += 1
+                        raise
+                    self.stats["retries"] += 1
+                    self.stats["retry_after_s"] += e.retry_after
+                    logger.warning("⏳ Telegram просит подождать %s с (%s), повтор %d", e.retry_after, method.__api_method__, attempt)
+                    # Остальные запросы в этот чат тоже ждут; без чата - пауза для всего бота
+                    (chat_bucket or self.global_bucket).pause(e.retry_after)
+                    if not limited:
+                        await asyncio.sleep(e.retry_after)
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "chats": len(self._chat_buckets)}
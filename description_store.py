@@ -0,0 +1,68 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DescriptionStore:
+    #Заранее сгенерированные описания (landmark × интерес), загружаются ботом при старте
+
+    VERSION = 1
+
+    def __init__(self, items: Optional[Dict[str, str]] = None, meta: Optional[dict] = None):
+        self.items = items or {}
+        self.meta = meta or {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(landmark_name: str, landmark_data: dict, user_interest: str = "") -> str:
+        #Ключ зависит от всех полей, попадающих в промпт: при изменении таблицы запись просто не найдется
+        raw = json.dumps([
+            landmark_name,
+            landmark_data.get('category', ''),
+            list(landmark_data.get('features', [])),
+            landmark_data.get('description', ''),
+            user_interest or "",
+        ], ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+    def get(self, landmark_name: str, landmark_data: dict, user_interest: str = "") -> Optional[str]:
+        text = self.items.get(self.make_key(landmark_name, landmark_data, user_interest))
+        if text is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return text
+
+    def __len__(self):
+        return len(self.items)
+
+    @classmethod
+    def load(cls, path: str = "pregenerated_descriptions.json.gz") -> "DescriptionStore":
+        if not path or not os.path.exists(path):
+            return cls()
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") != cls.VERSION:
+                logger.warning("⚠️ Неподдерживаемая версия файла описаний: %s", payload.get('version'))
+                return cls()
+            store = cls(payload.get("items", {}), payload.get("meta", {}))
+            logger.info("📦 Загружено готовых описаний: %d", len(store))
+            return store
+        except Exception as e:
+            logger.error("❌ Ошибка загрузки готовых описаний: %s", e)
+            return cls()
+
+    def save(self, path: str = "pregenerated_descriptions.json.gz"):
+        #Атомарная запись: сначала во временный файл, затем замена
+        payload = {"version": self.VERSION, "meta": self.meta, "items": self.items}
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
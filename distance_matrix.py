@@ -0,0 +1,180 @@
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from spatial_index import EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+
+class DistanceEngine:
+    #Матрицы расстояний (км) за один проход NumPy вместо geodesic на каждую пару
+    #mode: "haversine" (по умолчанию), "equirectangular" (быстрее, для масштаба города), "geodesic" (точно, медленно)
+
+    MODES = ("haversine", "equirectangular", "geodesic")
+
+    def __init__(self, mode: str = "haversine"):
+        if mode not in self.MODES:
+            raise ValueError(f"Неизвестный режим расстояний: {mode}. Доступны: {', '.join(self.MODES)}")
+        self.mode = mode
+
+    @staticmethod
+    def _as_array(points: Sequence[Tuple[float, float]]) -> np.ndarray:
+        return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+    def matrix(self, points_a: Sequence[Tuple[float, float]],
+               points_b: Optional[Sequence[Tuple[float, float]]] = None) -> np.ndarray:
+        #Матрица len(points_a) x len(points_b) (по умолчанию points_b = points_a)
+        a = self._as_array(points_a)
+        b = a if points_b is None else self._as_array(points_b)
+
+        if self.mode == "geodesic":
+            from geopy.distance import geodesic
+            result = np.empty((len(a), len(b)), dtype=np.float64)
+            for i, coord_a in enumerate(a):
+                for j, coord_b in enumerate(b):
+                    result[i, j] = geodesic(tuple(coord_a), tuple(coord_b)).km
+            return result
+
+        lat_a, lon_a = np.radians(a[:, 0])[:, None], np.radians(a[:, 1])[:, None]
+        lat_b, lon_b = np.radians(b[:, 0])[None, :], np.radians(b[:, 1])[None, :]
+
+        if self.mode == "equirectangular":
+            x = (lon_b - lon_a) * np.cos((lat_a + lat_b) / 2)
+            y = lat_b - lat_a
+            return EARTH_RADIUS_KM * np.sqrt(x * x + y * y)
+
+        h = np.sin((lat_b - lat_a) / 2) ** 2 + np.cos(lat_a) * np.cos(lat_b) * np.sin((lon_b - lon_a) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+    def distance(self, coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
+        return float(self.matrix([coord1], [coord2])[0, 0])
+
+    def route_matrix(self, start_point: Tuple[float, float], coordinates: List[Tuple[float, float]]) -> np.ndarray:
+        #Квадратная матрица для старта (индекс 0) и точек маршрута (индексы 1..n)
+        return self.matrix([start_point, *coordinates])
+
+
+def nearest_neighbour_order(matrix: np.ndarray, start: int = 0) -> List[int]:
+    #Жадный обход "к ближайшему" по готовой матрице; возвращает индексы без стартовой точки
+    size = len(matrix)
+    unvisited = np.ones(size, dtype=bool)
+    unvisited[start] = False
+    order = []
+    current = start
+    for _ in range(size - 1):
+        distances = np.where(unvisited, matrix[current], np.inf)
+        current = int(np.argmin(distances))
+        order.append(current)
+        unvisited[current] = False
+    return order
+
+
+WALKING_SPEED_KMH = 4.5
+# Пешеходный путь по улицам длиннее прямой линии
+WALKING_DETOUR_FACTOR = 1.25
+
+
+def walking_minutes(distance_km):
+    return distance_km * WALKING_DETOUR_FACTOR / WALKING_SPEED_KMH * 60
+
+
+# Файлы матриц до появления режима в имени: {отпечаток}.distances.npy и {отпечаток}.walk.npy
+LEGACY_CACHE_RE = re.compile(r"^[0-9a-f]{16}\.(distances|walk)\.npy$")
+
+
+class LandmarkMatrix:
+    #Предрасчитанные расстояния (км) между всеми местами каталога (время пешком - walking_minutes от них).
+    #Хранятся в float32 .npy рядом с каталогом и открываются через memmap; ключ - отпечаток каталога
+
+    def __init__(self, names: List[str], distances: np.ndarray, fingerprint: str):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        self.distances = distances
+        self.fingerprint = fingerprint
+
+    @staticmethod
+    def catalogue_fingerprint(landmarks: dict, mode: str) -> str:
+        digest = hashlib.sha1(mode.encode("utf-8"))
+        for name in sorted(landmarks):
+            lat, lon = landmarks[name]['coordinates']
+            digest.update(f"{name}\t{lat:.7f}\t{lon:.7f}\n".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    @classmethod
+    def load_or_build(cls, landmarks: dict, engine: DistanceEngine, cache_dir: str = "matrix_cache",
+                      max_landmarks: int = 10000, block_size: int = 512) -> Optional["LandmarkMatrix"]:
+        if not landmarks:
+            return None
+        if len(landmarks) > max_landmarks:
+            # n² float32 не помещается в разумный объем - считаем расстояния на лету
+            logger.warning("⚠️ Каталог слишком большой для матрицы расстояний (%d > %d)", len(landmarks), max_landmarks)
+            return None
+
+        names = sorted(landmarks)
+        fingerprint = cls.catalogue_fingerprint(landmarks, engine.mode)
+        distances_path = os.path.join(cache_dir, cls.cache_name(engine.mode, fingerprint))
+
+        if os.path.exists(distances_path):
+            try:
+                distances = np.load(distances_path, mmap_mode="r")
+                if distances.shape == (len(names), len(names)):
+                    logger.info("📐 Матрица расстояний загружена из %s", distances_path)
+                    return cls(names, distances, fingerprint)
+            except (OSError, ValueError) as e:
+                logger.warning("⚠️ Не удалось прочитать матрицу расстояний: %s", e)
+
+        started = time.perf_counter()
+        os.makedirs(cache_dir, exist_ok=True)
+        coordinates = [landmarks[name]['coordinates'] for name in names]
+        size = len(names)
+        distances_tmp = f"{distances_path}.{os.getpid()}.tmp.npy"
+        distances = np.lib.format.open_memmap(distances_tmp, mode="w+", dtype=np.float32, shape=(size, size))
+        # Считаем блоками строк, чтобы не держать в памяти float64-матрицу целиком
+        for row in range(0, size, block_size):
+            distances[row:row + block_size] = engine.matrix(coordinates[row:row + block_size], coordinates)
+        distances.flush()
+        del distances
+        # Открываем до переименования: memmap остается рабочим, даже если файл потом удалят
+        distances = np.load(distances_tmp, mmap_mode="r")
+        os.replace(distances_tmp, distances_path)
+
+        logger.info("📐 Матрица расстояний %dx%d построена за %.2f с", size, size, time.perf_counter() - started)
+        return cls(names, distances, fingerprint)
+
+    @staticmethod
+    def cache_name(mode: str, fingerprint: str) -> str:
+        return f"{mode}-{fingerprint}.distances.npy"
+
+    @staticmethod
+    def prune_cache(cache_dir: str, mode: str, keep_fingerprint: str) -> int:
+        #Удаляет матрицы прежних версий каталога в том же режиме расстояний и файлы старого формата
+        #(без режима в имени, .walk.npy); недостроенные .tmp.npy других процессов не трогает.
+        #Процессы, еще работающие со старым каталогом, не пострадают: открытый memmap переживает удаление файла
+        removed = 0
+        try:
+            names = os.listdir(cache_dir)
+        except OSError:
+            return 0
+        keep = LandmarkMatrix.cache_name(mode, keep_fingerprint)
+        for name in names:
+            stale = name.startswith(f"{mode}-") and name.endswith(".distances.npy") and name != keep
+            if stale or LEGACY_CACHE_RE.match(name):
+                try:
+                    os.remove(os.path.join(cache_dir, name))
+                    removed += 1
+                except OSError:
+                    pass
+        if removed:
+            logger.info("🧹 Удалены устаревшие файлы матриц расстояний: %d", removed)
+        return removed
+
+    def submatrix(self, landmarks: List[str]) -> np.ndarray:
+        idx = [self.index[name] for name in landmarks]
+        return np.asarray(self.distances[np.ix_(idx, idx)], dtype=np.float64)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from llm_cache import LLMCache
+from rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class GeocodingService:
+    #Геокодирование адресов вне event loop: один клиент Nominatim, лимит запросов и кэш
+
+    NOT_FOUND = "-"
+
+    def __init__(self, user_agent: str = "ai-tour-bot", domain: str = "nominatim.openstreetmap.org",
+                 scheme: str = "https", rate: float = 1.0, city: str = "Нижний Новгород",
+                 cache: Optional[LLMCache] = None, timeout: float = 10.0):
+        from geopy.geocoders import Nominatim
+        # Политика Nominatim - не больше 1 запроса в секунду; для локального сервера rate можно увеличить
+        self.geolocator = Nominatim(user_agent=user_agent, domain=domain, scheme=scheme, timeout=timeout)
+        self.city = city
+        self.cache = cache
+        self.limiter = RateLimiter(rate)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="geocoder")
+        self._in_flight = {}
+        self.stats = {"requests": 0, "cache_hits": 0, "not_found": 0, "errors": 0}
+
+    @staticmethod
+    def normalize_address(address: str) -> str:
+        #Приводим адрес к единому виду, чтобы "Б. Покровская, 1" и "б.покровская 1" попадали в один ключ кэша
+        address = address.lower().replace("ё", "е")
+        address = re.sub(r"[^\w\s\-/]", " ", address)
+        return re.sub(r"\s+", " ", address).strip()
+
+    async def geocode(self, address: str) -> Optional[Tuple[float, float]]:
+        key = self.normalize_address(address)
+        if not key:
+            return None
+
+        if self.cache is not None:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                return self._decode(cached)
+
+        # Одинаковые адреса, запрошенные одновременно, геокодируем один раз
+        if key in self._in_flight:
+            return await asyncio.shield(self._in_flight[key])
+
+        task = asyncio.ensure_future(self._geocode_remote(key))
+        self._in_flight[key] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._in_flight.pop(key, None)
+            else:
+                task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+    async def _geocode_remote(self, key: str) -> Optional[Tuple[float, float]]:
+        await self.limiter.wait()
+        self.stats["requests"] += 1
+        query = f"{key}, {self.city}" if self.city else key
+        try:
+            loop = asyncio.get_running_loop()
+            location = await loop.run_in_executor(self._executor, self.geolocator.geocode, query)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("❌ Ошибка геокодирования '%s': %s", query, e)
+            raise
+
+        if not location:
+            self.stats["not_found"] += 1
+            if self.cache is not None:
+                # Ненайденные адреса помним недолго - вдруг их добавят в OSM
+                self.cache.set(key, self.NOT_FOUND, namespace="geocode", ttl=24 * 3600)
+            return None
+
+        coords = (location.latitude, location.longitude)
+        if self.cache is not None:
+            self.cache.set(key, f"{coords[0]},{coords[1]}", namespace="geocode")
+        return coords
+
+    def _decode(self, cached: str) -> Optional[Tuple[float, float]]:
+        if cached == self.NOT_FOUND:
+            return None
+        lat, lon = cached.split(",")
+        return float(lat), float(lon)
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        if self.cache is not None:
+            stats["cache"] = self.cache.get_stats()
+        return stats
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        if self.cache is not None:
+            self.cache.close()
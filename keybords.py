@@ -1,7 +1,10 @@
+import logging
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, KeyboardButton
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 from yandex_gpt import YandexMaps
 
+logger = logging.getLogger(__name__)
+
 
 class Keybord:
     @staticmethod
@@ -10,7 +13,7 @@ class Keybord:
         for landmark_data in LANDMARKS.values():
             categories.add(landmark_data['category'].lower())
         
-        print(f"📊 Найдены категории: {categories}")
+        logger.debug("📊 Найдены категории: %s", categories)
         return categories
 
     # Создание клавиатуры на основе категорий
@@ -61,7 +64,7 @@ class Keybord:
         
         interests_list.append("🌟 Любые достопримечательности")
         
-        print(f"🎯 Созданы кнопки интересов: {interests_list}")
+        logger.debug("🎯 Созданы кнопки интересов: %s", interests_list)
         return interests_list
 
     @staticmethod
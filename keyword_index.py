@@ -0,0 +1,105 @@
+import re
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+TOKEN_RE = re.compile(r"\w+(?:-\w+)*")
+
+
+def normalize_text(text: str) -> str:
+    return str(text or "").lower().replace("ё", "е")
+
+
+class KeywordIndex:
+    #Обратный индекс каталога: токен/ключевое слово -> номера мест, интерес -> готовый список мест
+
+    def __init__(self, landmarks: Dict, interest_mapping: Dict[str, List[str]],
+                 keyword_ids: Optional[Dict[str, Iterable[int]]] = None):
+        self.interest_mapping = interest_mapping
+        self.build(landmarks, keyword_ids)
+
+    def build(self, landmarks: Dict, keyword_ids: Optional[Dict[str, Iterable[int]]] = None):
+        #Полная перестройка (вызывается и при обновлении каталога).
+        #keyword_ids - готовые результаты по ключевым словам (например, из снимка каталога)
+        self.landmarks = landmarks
+        self.names = list(landmarks.keys())
+        self._tokens = None
+        self._texts = None
+
+        # Ключевые слова интересов ищутся как подстроки (как и раньше) - считаем один раз на каталог
+        self.keyword_ids: Dict[str, FrozenSet[int]] = {
+            keyword: frozenset(ids) for keyword, ids in (keyword_ids or {}).items()
+        }
+        for keywords in self.interest_mapping.values():
+            for keyword in keywords:
+                keyword = normalize_text(keyword)
+                if keyword not in self.keyword_ids:
+                    self.keyword_ids[keyword] = frozenset(
+                        landmark_id for landmark_id, texts in enumerate(self._landmark_texts())
+                        if any(keyword in text for text in texts)
+                    )
+
+        self.interest_results = {
+            interest: self._ordered(self.match_any(keywords))
+            for interest, keywords in self.interest_mapping.items() if keywords
+        }
+        self._texts = None
+
+    def _landmark_texts(self) -> List[List[str]]:
+        if self._texts is None:
+            self._texts = []
+            for name in self.names:
+                data = self.landmarks[name]
+                fields = [data.get('category', ''), data.get('description', ''), *data.get('features', [])]
+                self._texts.append([normalize_text(field) for field in fields])
+        return self._texts
+
+    @property
+    def tokens(self) -> Dict[str, set]:
+        #Словарь токенов нужен только для произвольных слов - строим при первом обращении
+        if self._tokens is None:
+            self._tokens = defaultdict(set)
+            for landmark_id, texts in enumerate(self._landmark_texts()):
+                for text in texts:
+                    for token in TOKEN_RE.findall(text):
+                        self._tokens[token].add(landmark_id)
+            self._texts = None
+        return self._tokens
+
+    def _ordered(self, ids: Iterable[int]) -> List[str]:
+        #Порядок как в каталоге
+        return [self.names[landmark_id] for landmark_id in sorted(ids)]
+
+    def lookup_keyword(self, keyword: str) -> FrozenSet[int]:
+        keyword = normalize_text(keyword)
+        ids = self.keyword_ids.get(keyword)
+        if ids is None:
+            # Произвольное слово: объединяем токены словаря, содержащие каждое слово, и пересекаем по словам
+            ids = None
+            for word in TOKEN_RE.findall(keyword):
+                word_ids = set()
+                for token, token_ids in self.tokens.items():
+                    if word in token:
+                        word_ids |= token_ids
+                ids = word_ids if ids is None else ids & word_ids
+            ids = frozenset(ids or ())
+            self.keyword_ids[keyword] = ids
+        return ids
+
+    def match_any(self, keywords: Iterable[str]) -> FrozenSet[int]:
+        result = set()
+        for keyword in keywords:
+            result |= self.lookup_keyword(keyword)
+        return frozenset(result)
+
+    def match_all(self, keywords: Iterable[str]) -> FrozenSet[int]:
+        result = None
+        for keyword in keywords:
+            ids = self.lookup_keyword(keyword)
+            result = set(ids) if result is None else result & ids
+        return frozenset(result or ())
+
+    def landmarks_for_interest(self, interest_display: str) -> List[str]:
+        #Места, подходящие интересу, в порядке каталога
+        if interest_display in self.interest_results:
+            return self.interest_results[interest_display]
+        return self._ordered(self.match_any(self.interest_mapping.get(interest_display, [])))
@@ -0,0 +1,258 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    #Двухуровневый кэш ответов YandexGPT: LRU в памяти + SQLite на диске.
+    #Запись на диск - в отдельном потоке пачками; из event loop читаем через aget, сбрасываем через ainvalidate
+
+    # Записей за одну транзакцию потока записи
+    WRITE_BATCH = 256
+    # Чистка просроченных и лишних записей - раз в столько записей, а не на каждую
+    TRIM_EVERY = 500
+
+    def __init__(self, db_path: Optional[str] = "llm_cache.sqlite3", ttl: float = 7 * 24 * 3600,
+                 max_memory_items: int = 2000, max_disk_items: int = 50000):
+        self.ttl = ttl
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self._memory = OrderedDict()  # key -> (expires_at, namespace, text)
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "writes": 0,
+            "evictions": 0,
+            "disk_items": 0,
+        }
+
+        self.db_path = db_path
+        self._db = None
+        self._writes: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        if db_path:
+            directory = os.path.dirname(os.path.abspath(db_path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = self._connect()
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, namespace TEXT, text TEXT NOT NULL, "
+                "created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_created ON llm_cache(created_at)")
+            self._db.commit()
+            self.stats["disk_items"] = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchall()[0][0]
+            self._writes = queue.Queue()
+            self._writer = threading.Thread(target=self._write_loop, name="llm-cache-writer", daemon=True)
+            self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        # WAL: чтение из event loop не ждет транзакцию потока записи
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    @staticmethod
+    def make_key(payload: dict) -> str:
+        #Ключ - хэш промпта вместе с моделью и параметрами генерации
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        #Синхронное чтение: память, затем SQLite. Из event loop - только через aget
+        now = time.time()
+        found, text = self._get_memory(key, now)
+        if found:
+            return text
+        return self._get_disk(key, now)
+
+    async def aget(self, key: str) -> Optional[str]:
+        #Чтение из event loop: попадание в память - сразу, запрос к SQLite - в потоке
+        now = time.time()
+        found, text = self._get_memory(key, now)
+        if found:
+            return text
+        if self._db is None:
+            return self._get_disk(key, now)
+        return await asyncio.to_thread(self._get_disk, key, now)
+
+    def _get_memory(self, key: str, now: float):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return False, None
+            expires_at, namespace, text = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return True, text
+            del self._memory[key]
+            self.stats["expired"] += 1
+            return False, None
+
+    def _get_disk(self, key: str, now: float) -> Optional[str]:
+        rows = []
+        # Чтение SQLite - под своей блокировкой: попадания в память его не ждут
+        with self._db_lock:
+            if self._db is not None:
+                # fetchall, а не fetchone: недочитанный запрос держит старый снимок WAL и не видит новых записей
+                rows = self._db.execute(
+                    "SELECT namespace, text, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchall()
+        with self._lock:
+            if rows:
+                namespace, text, expires_at = rows[0]
+                if expires_at > now:
+                    self._remember(key, expires_at, namespace, text)
+                    self.stats["disk_hits"] += 1
+                    return text
+                self._writes.put(("delete", key))
+                self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, text: str, namespace: str = "default", ttl: Optional[float] = None):
+        if not text:
+            return
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, expires_at, namespace, text)
+            self.stats["writes"] += 1
+        if self._writes is not None:
+            self._writes.put(("set", (key, namespace, text, now, expires_at)))
+
+    def _remember(self, key: str, expires_at: float, namespace: str, text: str):
+        self._memory[key] = (expires_at, namespace, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _write_loop(self):
+        #Поток записи: забирает из очереди все накопившееся и пишет одной транзакцией
+        db = self._connect()
+        since_trim = 0
+        running = True
+        while running:
+            batch = [self._writes.get()]
+            while len(batch) < self.WRITE_BATCH:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            results = []
+            try:
+                for kind, argument in batch:
+                    if kind == "set":
+                        db.execute(
+                            "INSERT OR REPLACE INTO llm_cache (key, namespace, text, created_at, expires_at) "
+                            "VALUES (?, ?, ?, ?, ?)", argument
+                        )
+                        since_trim += 1
+                    elif kind == "delete":
+                        db.execute("DELETE FROM llm_cache WHERE key = ?", (argument,))
+                    elif kind == "invalidate":
+                        namespace, result = argument
+                        if namespace is None:
+                            cursor = db.execute("DELETE FROM llm_cache")
+                        else:
+                            cursor = db.execute("DELETE FROM llm_cache WHERE namespace = ?", (namespace,))
+                        results.append((result, cursor.rowcount))
+                    elif kind == "stop":
+                        running = False
+                if since_trim >= self.TRIM_EVERY:
+                    self._trim_disk(db)
+                    since_trim = 0
+                db.commit()
+                # Результат сброса - только после commit, иначе чтение еще увидит удаленные записи
+                for result, removed in results:
+                    result.set_result(removed)
+            except sqlite3.Error as e:
+                logger.error("❌ Ошибка записи кэша YandexGPT: %s", e)
+                db.rollback()
+            finally:
+                for kind, argument in batch:
+                    if kind == "invalidate" and not argument[1].done():
+                        argument[1].set_result(0)
+                    self._writes.task_done()
+        db.close()
+
+    def _trim_disk(self, db: sqlite3.Connection):
+        #Удаляем просроченные и самые старые записи сверх лимита
+        db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+        count = db.execute("SELECT COUNT(*) FROM llm_cache").fetchall()[0][0]
+        overflow = count - self.max_disk_items
+        if overflow > 0:
+            db.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY created_at LIMIT ?)", (overflow,)
+            )
+        with self._lock:
+            self.stats["evictions"] += max(overflow, 0)
+            self.stats["disk_items"] = count - max(overflow, 0)
+
+    def flush(self):
+        #Дождаться записи всего, что уже поставлено в очередь (остановка, тесты)
+        if self._writes is not None:
+            self._writes.join()
+
+    async def ainvalidate(self, namespace: Optional[str] = None) -> int:
+        #invalidate для event loop: ожидание потока записи - в отдельном потоке
+        return await asyncio.to_thread(self.invalidate, namespace)
+
+    def invalidate(self, namespace: Optional[str] = None) -> int:
+        #Сброс кэша (например, после обновления таблицы с достопримечательностями).
+        #Блокируется до commit потока записи - из event loop только через ainvalidate
+        with self._lock:
+            if namespace is None:
+                removed = len(self._memory)
+                self._memory.clear()
+            else:
+                keys = [key for key, entry in self._memory.items() if entry[1] == namespace]
+                for key in keys:
+                    del self._memory[key]
+                removed = len(keys)
+
+        if self._writes is not None:
+            result = Future()
+            self._writes.put(("invalidate", (namespace, result)))
+            removed = max(removed, result.result())
+
+        logger.info("🧹 Кэш YandexGPT очищен (%s): %d записей", namespace or 'все', removed)
+        return removed
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_items"] = len(self._memory)
+        if self._writes is not None:
+            stats["write_queue"] = self._writes.qsize()
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        if self._writer is not None:
+            self._writes.put(("stop", None))
+            self._writer.join()
+            self._writer = None
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+# Локальные заглушки внешних API для проверки без сети и квот
+
+
+def create_gpt_stub_app(delay: float = 0.05, fail_every: int = 0, quota_rps: float = 0.0,
+                        stream_parts: int = 10, malformed_every: int = 0) -> web.Application:
+    #Заглушка completion-эндпоинта YandexGPT: отвечает детерминированным текстом.
+    #quota_rps > 0 - как квота Yandex Cloud, отвечает 429 на запросы сверх quota_rps в секунду.
+    #На пакетный запрос текстов маршрута отвечает JSON; malformed_every > 0 - каждое такое описание пустое
+    state = {"requests": 0, "throttled": 0}
+    window = []
+
+    async def completion(request: web.Request) -> web.Response:
+        state["requests"] += 1
+        payload = await request.json()
+        if quota_rps:
+            now = time.monotonic()
+            while window and now - window[0] >= 1.0:
+                window.pop(0)
+            if len(window) >= quota_rps:
+                state["throttled"] += 1
+                return web.json_response({"error": {"grpcCode": 8, "message": "quota limit exceed"}}, status=429)
+            window.append(now)
+        if fail_every and state["requests"] % fail_every == 0:
+            return web.json_response({"error": "stub failure"}, status=500)
+        prompt = payload["messages"][-1]["text"]
+        text = f"[stub] {' '.join(prompt.split())[:200]}"
+        if '"recommendation"' in prompt:
+            stops = re.findall(r"^\s*(\d+)\. ", prompt, re.M)
+            texts = {"recommendation": f"[stub] Рекомендация к маршруту из {len(stops)} мест, приятной прогулки!"}
+            for index, stop in enumerate(stops, 1):
+                broken = malformed_every and index % malformed_every == 0
+                texts[stop] = "" if broken else f"[stub] Описание места {stop}: история, факты и причины зайти."
+            text = json.dumps(texts, ensure_ascii=False)
+        usage = {"inputTextTokens": str(len(prompt) // 4), "completionTokens": str(len(text) // 4),
+                 "totalTokens": str(len(prompt) // 4 + len(text) // 4)}
+        if payload.get("completionOptions", {}).get("stream"):
+            # Как настоящий API: JSON-объект на строку, в каждом - весь текст, накопленный к этому моменту;
+            # первая часть приходит через delay / stream_parts, весь ответ - через delay
+            response = web.StreamResponse(headers={"Content-Type": "application/json"})
+            await response.prepare(request)
+            for part in range(1, stream_parts + 1):
+                await asyncio.sleep(delay / stream_parts)
+                final = part == stream_parts
+                chunk = {"result": {
+                    "alternatives": [{"message": {"role": "assistant", "text": text[:len(text) * part // stream_parts]},
+                                      "status": "ALTERNATIVE_STATUS_FINAL" if final else "ALTERNATIVE_STATUS_PARTIAL"}],
+                    "usage": usage,
+                }}
+                await response.write((json.dumps(chunk, ensure_ascii=False) + "\n").encode("utf-8"))
+            await response.write_eof()
+            return response
+        await asyncio.sleep(delay)
+        return web.json_response({
+            "result": {
+                "alternatives": [{"message": {"role": "assistant", "text": text}, "status": "ALTERNATIVE_STATUS_FINAL"}],
+                "usage": usage,
+            }
+        })
+
+    app = web.Application()
+    app["state"] = state
+    app.router.add_post("/foundationModels/v1/completion", completion)
+    return app
+
+
+def create_nominatim_stub_app(known_addresses: dict = None) -> web.Application:
+    #Заглушка Nominatim /search: известные адреса из словаря, остальные - центр города
+    known_addresses = known_addresses or {}
+    state = {"requests": 0}
+
+    async def search(request: web.Request) -> web.Response:
+        state["requests"] += 1
+        query = request.query.get("q", "")
+        if "не существует" in query:
+            return web.json_response([])
+        lat, lon = next((coords for key, coords in known_addresses.items() if key in query.lower()),
+                        (56.326887, 44.005986))
+        return web.json_response([{
+            "place_id": state["requests"], "lat": str(lat), "lon": str(lon), "display_name": query,
+        }])
+
+    app = web.Application()
+    app["state"] = state
+    app.router.add_get("/search", search)
+    return app
+
+
+def create_bot_api_stub_app(delay: float = 0.0, chat_rate: float = 0.0, chat_burst: int = 5,
+                            retry_after: int = 1) -> web.Application:
+    #Заглушка Telegram Bot API (/bot<token>/<method>): запоминает отправленные тексты по чатам.
+    #chat_rate > 0 - как Telegram, отвечает 429 (retry_after), если в чат пишут чаще chat_rate в секунду
+    state = {"requests": 0, "methods": {}, "chats": {}, "message_id": 0, "flood_errors": 0}
+    # Ведро на чат: [токены, время обновления]
+    flood = {}
+
+    def flooded(chat_id: int) -> bool:
+        now = time.monotonic()
+        tokens, updated = flood.get(chat_id, (chat_burst, now))
+        tokens = min(chat_burst, tokens + (now - updated) * chat_rate)
+        if tokens < 1:
+            flood[chat_id] = (tokens, now)
+            return True
+        flood[chat_id] = (tokens - 1, now)
+        return False
+
+    async def call(request: web.Request) -> web.Response:
+        state["requests"] += 1
+        method = request.match_info["method"]
+        state["methods"][method] = state["methods"].get(method, 0) + 1
+        # aiogram шлет multipart/form-data, остальные клиенты - обычно JSON
+        if request.content_type == "application/json":
+            payload = await request.json()
+        else:
+            payload = dict(await request.post())
+        if delay:
+            await asyncio.sleep(delay)
+
+        if method in ("sendMessage", "editMessageText", "sendLocation"):
+            chat_id = int(payload.get("chat_id", 0))
+            if chat_rate and flooded(chat_id):
+                state["flood_errors"] += 1
+                return web.json_response({
+                    "ok": False, "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after},
+                }, status=429)
+            text = payload.get("text", "")
+            state["chats"].setdefault(chat_id, []).append((method, text))
+            state["message_id"] += 1
+            result = {
+                "message_id": int(payload.get("message_id") or state["message_id"]),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": text,
+            }
+        elif method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "stub", "username": "stub_bot"}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    app = web.Application()
+    app["state"] = state
+    app.router.add_post("/bot{token}/{method}", call)
+    return app
+
+
+async def start_stub(app: web.Application, host: str = "127.0.0.1", port: int = 0):
+    #Запуск заглушки; возвращает runner и базовый URL
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+async def start_gpt_stub(delay: float = 0.05, fail_every: int = 0, host: str = "127.0.0.1", port: int = 0,
+                         quota_rps: float = 0.0, stream_parts: int = 10, malformed_every: int = 0):
+    runner, base_url = await start_stub(
+        create_gpt_stub_app(delay, fail_every, quota_rps, stream_parts, malformed_every), host, port
+    )
+    return runner, f"{base_url}/foundationModels/v1/completion"
+
+
+if __name__ == "__main__":
+    from logs import setup_logging
+    setup_logging(fmt="text")
+
+    async def serve():
+        runner, url = await start_gpt_stub(port=8089)
+        logger.info("🧪 Заглушка YandexGPT: %s", url)
+        geo_runner, geo_url = await start_stub(create_nominatim_stub_app(), port=8090)
+        logger.info("🧪 Заглушка Nominatim: %s (GEOCODER_DOMAIN='127.0.0.1:8090', GEOCODER_SCHEME='http')", geo_url)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+            await geo_runner.cleanup()
+
+    asyncio.run(serve())
@@ -0,0 +1,207 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+# Журнал бота поверх logging: у каждого модуля свой логгер (logging.getLogger(__name__)), запись
+# в очередь без блокировки event loop (вывод - в отдельном потоке QueueListener), JSON-строка
+# на запись, выборка однотипных сообщений и смена уровней на лету (set_level, /log-level).
+
+# Поля LogRecord, которые не попадают в JSON как дополнительные (extra=...)
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+class JsonFormatter(logging.Formatter):
+    #Одна запись - одна JSON-строка: время, уровень, логгер, текст и поля из extra
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    #Человекочитаемый вывод для локального запуска; поля extra дописываются в конец строки
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extra = {key: value for key, value in vars(record).items()
+                 if key not in _RECORD_FIELDS and not key.startswith("_")}
+        if extra:
+            line += " " + json.dumps(extra, ensure_ascii=False, default=str)
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    #Не больше limit записей одного шаблона (логгер + текст до подстановки аргументов) за window секунд;
+    #первая запись после окна получает поле sampled_out - сколько похожих было пропущено
+
+    def __init__(self, limit: int = 10, window: float = 60.0, max_keys: int = 10000):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        # ключ -> [начало окна, записей в окне, пропущено]
+        self._windows: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        self.stats = {"passed": 0, "sampled_out": 0}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0 or record.levelno >= logging.CRITICAL:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                if len(self._windows) >= self.max_keys:
+                    self._windows.clear()
+                suppressed = state[2] if state is not None else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.sampled_out = suppressed
+            elif state[1] < self.limit:
+                state[1] += 1
+            else:
+                state[2] += 1
+                self.stats["sampled_out"] += 1
+                return False
+            self.stats["passed"] += 1
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    #Запись в ограниченную очередь без ожидания: при переполнении запись отбрасывается и считается
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Аргументы подставляем сразу (объекты могут измениться до записи), трассировку исключения -
+        # в exc_text, чтобы форматтер в потоке вывода положил ее в отдельное поле
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json", levels: Optional[Dict[str, str]] = None,
+                  sample_limit: int = 10, sample_window: float = 60.0, queue_size: int = 10000,
+                  stream=None) -> logging.Handler:
+    #Корневой логгер пишет в очередь; поток QueueListener форматирует и выводит в stream (stdout).
+    #levels - уровни отдельных логгеров, например {'optimazer': 'DEBUG'}
+    global _listener, _queue_handler
+    stop_logging()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+    _queue_handler.addFilter(SamplingFilter(sample_limit, sample_window))
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, output, respect_handler_level=False)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level.upper())
+    for name, logger_level in (levels or {}).items():
+        set_level(name, logger_level)
+    # Подробные журналы библиотек - только по явному запросу через levels
+    for name in ("aiogram.event", "aiohttp.access"):
+        if name not in (levels or {}):
+            logging.getLogger(name).setLevel(logging.WARNING)
+    return _queue_handler
+
+
+def setup_from_settings(app) -> logging.Handler:
+    #Настройки LOG_LEVEL, LOG_FORMAT, LOG_LEVELS, LOG_SAMPLE_LIMIT, LOG_SAMPLE_WINDOW из config.py
+    return setup_logging(
+        level=app.setting('LOG_LEVEL', 'INFO'),
+        fmt=app.setting('LOG_FORMAT', 'json'),
+        levels=app.setting('LOG_LEVELS', {}),
+        sample_limit=app.setting('LOG_SAMPLE_LIMIT', 10),
+        sample_window=app.setting('LOG_SAMPLE_WINDOW', 60.0),
+    )
+
+
+def stop_logging():
+    #Дописывает очередь и останавливает поток вывода
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+atexit.register(stop_logging)
+
+
+def set_level(name: str, level: str) -> str:
+    #Смена уровня логгера на лету ('' или 'root' - корневой); возвращает установленный уровень
+    logger = logging.getLogger(None if name in ("", "root") else name)
+    logger.setLevel(level.upper())
+    return logging.getLevelName(logger.level)
+
+
+def get_levels() -> Dict[str, str]:
+    #Явно заданные уровни: корневой и логгеры модулей
+    levels = {"root": logging.getLevelName(logging.getLogger().level)}
+    for name, logger in sorted(logging.Logger.manager.loggerDict.items()):
+        if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET:
+            levels[name] = logging.getLevelName(logger.level)
+    return levels
+
+
+def get_stats() -> dict:
+    if _queue_handler is None:
+        return {}
+    sampling = next((f for f in _queue_handler.filters if isinstance(f, SamplingFilter)), None)
+    return {"queued": _queue_handler.queue.qsize(), "dropped": _queue_handler.dropped,
+            **(sampling.stats if sampling else {})}
+
+
+async def log_level_handler(request):
+    #GET /log-level - текущие уровни; POST /log-level?logger=optimazer&level=DEBUG - смена уровня
+    from aiohttp import web
+    if request.method == "POST":
+        name = request.query.get("logger", "root")
+        try:
+            level = set_level(name, request.query.get("level", "INFO"))
+        except (ValueError, TypeError) as e:
+            return web.json_response({"error": str(e)}, status=400)
+        logging.getLogger(__name__).warning("Уровень журнала %s: %s", name, level)
+    return web.json_response({"levels": get_levels(), "stats": get_stats()})
@@ -1,35 +1,46 @@
+from __future__ import annotations
 import asyncio
-from geopy.geocoders import Nominatim
-from aiogram import Bot, Dispatcher, types
-from aiogram.filters import Command
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-import config
-from yandex_gpt import YandexGPT,YandexMaps
-from optimazer import RouteOptimizer
-from parserxsl import Parser
-from keybords import Keybord
-
-LANDMARKS = Parser.output_lendmarks()
-
-bot = Bot(token=config.TELEGRAM_TOKEN)
-dp = Dispatcher()
-
-user_data = {}
-
-# Инициализация YandexGPT 
-yandex_gpt = YandexGPT(
-    api_key=getattr(config, 'YANDEX_GPT_API_KEY', ''),
-    folder_id=getattr(config, 'YANDEX_FOLDER_ID', ''),
-    LANDMARKS = LANDMARKS
-)
-
-INTERESTS_LIST = Keybord.create_interests_keyboard(LANDMARKS)
-route_optimizer = RouteOptimizer(LANDMARKS)
-
-@dp.message(Command("start"))
+import logging
+import time
+import logs
+from app_container import AppContainer, DeferredHandlers, LazyImport
+from delivery import StreamedText, edit_progressively, send_streamed_cards
+from tracing import current_span, numeric_stats, span, start_metrics_server, traced, tracer
+
+logger = logging.getLogger(__name__)
+
+# Тяжелые модули (aiogram, aiohttp, pandas, geopy, numpy) импортируются при первом обращении,
+# а каталог, индексы и клиенты создаются контейнером по требованию
+types = LazyImport("aiogram.types")
+InlineKeyboardMarkup = LazyImport("aiogram.types", "InlineKeyboardMarkup")
+InlineKeyboardButton = LazyImport("aiogram.types", "InlineKeyboardButton")
+YandexGPT = LazyImport("yandex_gpt", "YandexGPT")
+YandexMaps = LazyImport("yandex_gpt", "YandexMaps")
+Keybord = LazyImport("keybords", "Keybord")
+Session = LazyImport("session_store", "Session")
+
+app = AppContainer()
+handlers = DeferredHandlers()
+
+
+# Дедлайн ответов YandexGPT при генерации маршрута (лимиты и очередь - в app.yandex_gpt.scheduler)
+GPT_REQUEST_TIMEOUT = 15.0
+
+# Верхняя граница числа мест в маршруте (остальное ограничивает бюджет времени)
+MAX_ROUTE_PLACES = 8
+
+async def session_step(user_id: int) -> str:
+    #Текущий шаг диалога пользователя ("" - сессии нет или она истекла)
+    session = await app.sessions.get(user_id)
+    return session.step if session else ""
+
+async def is_waiting_address(message: types.Message) -> bool:
+    return await session_step(message.from_user.id) == "waiting_address"
+
+@handlers.message(command="start")
 async def cmd_start(message: types.Message):
     user_id = message.from_user.id
-    user_data[user_id] = {"step": "waiting_interest"}
+    await app.sessions.reset(user_id)
     
     welcome_text = f"""
 {YandexMaps.EMOJI['welcome']} **Добро пожаловать в ваш персональный AI-гид по Нижнему Новгороду!** 🌆
@@ -60,18 +71,20 @@ async def cmd_start(message: types.Message):
 👇 **Выберите, что вас интересует, и начнем наше путешествие!**
 """
     
-    await message.answer(welcome_text, parse_mode="Markdown", reply_markup=Keybord.get_interests_keyboard(INTERESTS_LIST))
+    await message.answer(welcome_text, parse_mode="Markdown", reply_markup=Keybord.get_interests_keyboard(app.interests))
 
-@dp.message(lambda message: message.text == "📝 Ввести адрес вручную")
+@handlers.message(lambda message: message.text == "📝 Ввести адрес вручную")
 async def handle_manual_location_request(message: types.Message):
     user_id = message.from_user.id
+    session = await app.sessions.get(user_id)
     
-    if user_id not in user_data or user_data[user_id].get("step") != "waiting_location":
-        user_data[user_id] = {"step": "waiting_interest"}
-        await message.answer("Давайте начнем сначала. Выберите интерес:", reply_markup=Keybord.get_interests_keyboard(INTERESTS_LIST))
+    if session is None or session.step != "waiting_location":
+        await app.sessions.reset(user_id)
+        await message.answer("Давайте начнем сначала. Выберите интерес:", reply_markup=Keybord.get_interests_keyboard(app.interests))
         return
     
-    user_data[user_id]["step"] = "waiting_address"
+    session.step = "waiting_address"
+    await app.sessions.save(user_id, session)
     
     await message.answer(
         f"{YandexMaps.EMOJI['location']} **Напишите ваш адрес:**\n(Например: ул. Большая Покровская, 1)",
@@ -79,49 +92,128 @@ async def handle_manual_location_request(message: types.Message):
         reply_markup=types.ReplyKeyboardRemove()
     )
 
-@dp.message(lambda message: user_data.get(message.from_user.id, {}).get("step") == "waiting_address")
+@handlers.message(is_waiting_address)
 async def handle_address_input(message: types.Message):
     user_id = message.from_user.id
-    user_data[user_id]["step"] = "processing_address"
+    session = await app.sessions.get(user_id) or Session()
+    session.step = "processing_address"
+    await app.sessions.save(user_id, session)
     
     loading_msg = await message.answer(f"{YandexMaps.EMOJI['loading']} **Определяю адрес...**", parse_mode="Markdown")
     
     try:
-        geolocator = Nominatim(user_agent="ai-tour-bot")
-        location = geolocator.geocode(f"{message.text}, Нижний Новгород")
+        with span("geocode"):
+            location = await app.geocoder.geocode(message.text)
         
         if not location:
             await loading_msg.edit_text(f"{YandexMaps.EMOJI['error']} **Адрес не найден.** Попробуйте другой вариант.")
-            user_data[user_id]["step"] = "waiting_location"
+            session.step = "waiting_location"
+            await app.sessions.save(user_id, session)
             await message.answer("Выберите способ:", reply_markup=Keybord.get_location_keyboard())
             return
         
-        user_data[user_id]["location"] = (location.latitude, location.longitude)
-        user_data[user_id]["step"] = "processing"
+        session.location = location
+        session.step = "processing"
+        await app.sessions.save(user_id, session)
         
         await loading_msg.edit_text(f"{YandexMaps.EMOJI['success']} **Адрес определен!** Создаю маршрут... {YandexMaps.EMOJI['ai']}")
         await generate_and_send_route(message)
         
     except Exception as e:
+        logger.exception("❌ Ошибка обработки адреса %r: %s", message.text, e)
         await loading_msg.edit_text(f"{YandexMaps.EMOJI['error']} **Ошибка.** Попробуйте еще раз.")
-        user_data[user_id]["step"] = "waiting_location"
+        session.step = "waiting_location"
+        await app.sessions.save(user_id, session)
         await message.answer("Выберите способ:", reply_markup=Keybord.get_location_keyboard())
 
 
+def start_separate_requests(yandex_gpt, LANDMARKS, route, interest: str, available_time: str, deadline: float,
+                            recommendation: StreamedText, descriptions: dict, gpt_tasks: list, keys=None):
+    #Отдельный потоковый запрос на рекомендацию и на каждое еще не готовое описание (keys - только эти
+    #ключи: "recommendation" и номера мест). Приоритет в очереди к API - порядок места в маршруте
+    timeout = max(0.0, deadline - time.monotonic())
+    if not recommendation.done.is_set() and (keys is None or "recommendation" in keys):
+        gpt_tasks.append(asyncio.create_task(recommendation.consume(
+            yandex_gpt.stream_personal_recommendation(route, interest, available_time, deadline), timeout
+        )))
+    for position, landmark in enumerate(route):
+        streamed = descriptions.get(landmark)
+        if streamed is None or streamed.done.is_set() or (keys is not None and str(position + 1) not in keys):
+            continue
+        gpt_tasks.append(asyncio.create_task(streamed.consume(
+            yandex_gpt.stream_landmark_description(landmark, LANDMARKS[landmark], interest,
+                                                   priority=position, deadline=deadline),
+            timeout
+        )))
+
+
+async def fill_route_texts(yandex_gpt, LANDMARKS, route, interest: str, available_time: str, deadline: float,
+                           recommendation: StreamedText, descriptions: dict, gpt_tasks: list):
+    #Рекомендация и все недостающие описания одним пакетным запросом (вместо 1 + N); пропущенные
+    #и негодные тексты пакетного ответа запрашиваются отдельно
+    stops = [position for position, landmark in enumerate(route)
+             if landmark in descriptions and not descriptions[landmark].done.is_set()]
+    if not stops:
+        start_separate_requests(yandex_gpt, LANDMARKS, route, interest, available_time, deadline,
+                                recommendation, descriptions, gpt_tasks)
+        return
+    targets = {"recommendation": recommendation, **{str(position + 1): descriptions[route[position]] for position in stops}}
+    started = time.monotonic()
+    values = {}
+
+    async def read():
+        nonlocal values
+        async for values in yandex_gpt.stream_route_texts(route, stops, interest, available_time, deadline):
+            for key, (text, _) in values.items():
+                if key in targets:
+                    targets[key].update(text, started)
+
+    try:
+        await asyncio.wait_for(read(), max(0.0, deadline - time.monotonic()))
+    except asyncio.TimeoutError:
+        # Время вышло - показываем то, что успело прийти, без повторных запросов
+        logger.warning("⏱️ YandexGPT не ответил за %s с, показываем то, что успело прийти", GPT_REQUEST_TIMEOUT)
+        for streamed in targets.values():
+            streamed.finish(streamed.text.rstrip() + "…" if streamed.text else None)
+        return
+    except Exception as e:
+        logger.error("❌ Ошибка пакетной генерации текстов маршрута: %s", e)
+        values = {}
+
+    # Последний снимок - проверенный полный ответ: в нем только годные тексты
+    missing = set()
+    for key, streamed in targets.items():
+        if key in values:
+            streamed.finish(values[key][0])
+        else:
+            streamed.reset()
+            missing.add(key)
+    if missing:
+        logger.warning("⚠️ В пакетном ответе YandexGPT нет годных текстов для %s, запрашиваем отдельно", sorted(missing))
+        start_separate_requests(yandex_gpt, LANDMARKS, route, interest, available_time, deadline,
+                                recommendation, descriptions, gpt_tasks, keys=missing)
+
+
+@traced("route")
 async def generate_and_send_route(message: types.Message):
     user_id = message.from_user.id
-    user_session = user_data.get(user_id, {})
+    with span("route.session"):
+        user_session = await app.sessions.get(user_id) or Session()
+    gpt_tasks = []
+    # Весь маршрут строится по одному и тому же каталогу, даже если он перезагрузится во время запроса
+    LANDMARKS = app.landmarks
+    route_optimizer = app.route_optimizer
+    yandex_gpt = app.yandex_gpt
     
     try:
-        interest = user_session.get("interest", "")
-        location = user_session.get("location", (56.326887, 44.005986))
-        available_time = user_session.get("time", "2 часа")
-        
-        # Рассчитываем количество мест на основе времени
-        places_count = route_optimizer.calculate_places_by_time(available_time)
+        interest = user_session.interest or ""
+        location = user_session.location or (56.326887, 44.005986)
+        available_time = user_session.time or "2 часа"
         
-        # Получаем достопримечательности по интересу
-        landmarks = route_optimizer.get_landmarks_by_interest(interest, max_landmarks=15)
+        # Подбор мест по интересу и маршрут под бюджет времени считаются в пуле процессов,
+        # чтобы тяжелый расчет не задерживал сообщения других пользователей
+        landmarks, route = await app.routing.plan_route(route_optimizer, interest, location, available_time, MAX_ROUTE_PLACES)
+        current_span().set(interest=interest, stops=len(route))
         
         if not landmarks:
             await message.answer(
@@ -131,9 +223,6 @@ async def generate_and_send_route(message: types.Message):
             )
             return
         
-        # Создаем маршрут с ограничением по количеству мест
-        route = route_optimizer.find_optimal_route(landmarks, location, max_places=places_count)
-        
         if not route:
             await message.answer(
                 f"❌ **Не удалось построить маршрут**\n\n"
@@ -143,94 +232,88 @@ async def generate_and_send_route(message: types.Message):
             return
         
         # Сохраняем маршрут в сессии
-        user_data[user_id]["current_route"] = route
-        
-        # Обновляем рейтинги для мест в маршруте
-        rating_update_msg = await message.answer(
-            f"🔍 **Обновляю актуальные рейтинги...**\n"
-            f"⏳ *Запрашиваю свежие оценки из Яндекс Карт*"
-        )
+        user_session.current_route = tuple(route)
+        await app.sessions.save(user_id, user_session)
         
+        # Сразу запускаем запросы к YandexGPT (потоком), пока идут остальные этапы;
+        # пользователь видит текст с первых слов, а не после полного ответа
+        deadline = time.monotonic() + GPT_REQUEST_TIMEOUT
+        recommendation = StreamedText(YandexGPT.DEFAULT_RECOMMENDATION)
+        # Готовые описания (из pregenerate.py или кэша) берем сразу, к API идем только за остальными
+        descriptions = {}
         for landmark in route:
-            if landmark in LANDMARKS:
-                try:
-                    if yandex_data and yandex_data.get('rating'):
-                        LANDMARKS[landmark]['yandex_rating'] = yandex_data['rating']
-                        LANDMARKS[landmark]['yandex_data'] = yandex_data
-                    await asyncio.sleep(0.3)
-                except Exception as e:
-                    continue
-        
-        await rating_update_msg.delete()
-        
-        ai_intro_message = await message.answer(
-            f"🎨 Создаю уникальные описания...\n"
-            f"🤖 Искусственный интеллект готовит специально для вас"
-        )
-        
-        personal_recommendation = await yandex_gpt.generate_personal_recommendation(
-            route, interest, available_time
-        )
-        
-        await ai_intro_message.edit_text("✨ Описания готовы!")
+            if landmark not in LANDMARKS:
+                continue
+            fallback = LANDMARKS[landmark].get('original_description') or YandexGPT.DEFAULT_DESCRIPTION
+            ready = await yandex_gpt.get_cached_description(landmark, LANDMARKS[landmark], interest)
+            descriptions[landmark] = StreamedText(fallback, ready)
+        if app.setting('GPT_BATCH_ROUTE_TEXTS', True):
+            gpt_tasks.append(asyncio.create_task(fill_route_texts(
+                yandex_gpt, LANDMARKS, route, interest, available_time, deadline, recommendation, descriptions, gpt_tasks
+            )))
+        else:
+            start_separate_requests(yandex_gpt, LANDMARKS, route, interest, available_time, deadline,
+                                    recommendation, descriptions, gpt_tasks)
         
         route_map_keyboard = YandexMaps.generate_full_route_map_button(route, location,LANDMARKS)
         
-        await message.answer(
-            f"🎯 **ВАШ ПЕРСОНАЛЬНЫЙ МАРШРУТ ГОТОВ!**\n\n"
-            f"━━━━━━━━━━━━━━━━━━━━━\n"
-            f"📋 **ОСНОВНАЯ ИНФОРМАЦИЯ**\n"
-            f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-            f"🎯 **Интерес:** {interest}\n"
-            f"⏱️ **Время:** {available_time}\n"
-            f"📍 **Количество мест:** {len(route)}\n"
-            f"━━━━━━━━━━━━━━━━━━━━━\n"
-            f"💫 **ПЕРСОНАЛЬНАЯ РЕКОМЕНДАЦИЯ**\n"
-            f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-            f"_{personal_recommendation}_\n\n"
-            f"👇 **Нажмите кнопку ниже для просмотра маршрута на карте**",
-            parse_mode="Markdown",
-            reply_markup=route_map_keyboard
-        )
+        def render_header(personal_recommendation: str) -> str:
+            return (
+                f"🎯 **ВАШ ПЕРСОНАЛЬНЫЙ МАРШРУТ ГОТОВ!**\n\n"
+                f"━━━━━━━━━━━━━━━━━━━━━\n"
+                f"📋 **ОСНОВНАЯ ИНФОРМАЦИЯ**\n"
+                f"━━━━━━━━━━━━━━━━━━━━━\n\n"
+                f"🎯 **Интерес:** {interest}\n"
+                f"⏱️ **Время:** {available_time}\n"
+                f"📍 **Количество мест:** {len(route)}\n"
+                f"━━━━━━━━━━━━━━━━━━━━━\n"
+                f"💫 **ПЕРСОНАЛЬНАЯ РЕКОМЕНДАЦИЯ**\n"
+                f"━━━━━━━━━━━━━━━━━━━━━\n\n"
+                f"_{personal_recommendation}_\n\n"
+                f"👇 **Нажмите кнопку ниже для просмотра маршрута на карте**"
+            )
         
-        # Отправляем каждое место отдельным сообщением
+        # Рекомендация дописывается в сообщение по мере генерации (правки не чаще раза в секунду)
+        with span("route.header") as stage:
+            await edit_progressively(message, render_header, recommendation,
+                                     parse_mode="Markdown", reply_markup=route_map_keyboard)
+            stage.set(first_chunk_s=recommendation.first_chunk_s)
+        
+        # Карточки мест в порядке маршрута дописываются в как можно меньше сообщений (до 4096 символов),
+        # кнопка карты каждого места остается под сообщением
+        cards = []
         for i, landmark in enumerate(route, 1):
             if landmark in LANDMARKS:
                 landmark_data = LANDMARKS[landmark]
                 
-                # Генерируем улучшенное описание
-                enhanced_description = await yandex_gpt.enhance_landmark_description(
-                    landmark, landmark_data, interest
-                )
-                
                 # Используем рейтинг из Яндекс Карт если есть
                # current_rating = landmark_data.get('yandex_rating') or landmark_data['rating']
                # rating_source = "⭐ Яндекс Карты" if landmark_data.get('yandex_rating') else "⭐ База данных"
                 
-                landmark_message = (
-                    f"📍 **{i}. {landmark}**\n"
-                    f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-                    f"📖 **Описание:**\n"
-                    f"_{enhanced_description}_\n\n"
-                )
-                
-                # Добавляем информацию из Яндекс Карт если есть
-                yandex_data = landmark_data.get('yandex_data', {})
-                if yandex_data.get('address'):
-                    landmark_message += f"🏠 **Адрес:** {yandex_data['address']}\n"
-                
-                if yandex_data.get('reviews'):
-                    landmark_message += f"💬 **Отзывов:** {yandex_data['reviews']}\n"
-                
-                if landmark_data.get('features'):
-                    features = " | ".join([f"✨ {f}" for f in landmark_data['features'][:3]])
-                
+                def render_card(enhanced_description: str, i=i, landmark=landmark, landmark_data=landmark_data) -> str:
+                    landmark_message = (
+                        f"📍 **{i}. {landmark}**\n"
+                        f"━━━━━━━━━━━━━━━━━━━━━\n\n"
+                        f"📖 **Описание:**\n"
+                        f"_{enhanced_description}_\n\n"
+                    )
+                    
+                    # Добавляем информацию из Яндекс Карт если есть
+                    yandex_data = landmark_data.get('yandex_data', {})
+                    if yandex_data.get('address'):
+                        landmark_message += f"🏠 **Адрес:** {yandex_data['address']}\n"
+                    
+                    if yandex_data.get('reviews'):
+                        landmark_message += f"💬 **Отзывов:** {yandex_data['reviews']}\n"
+                    return landmark_message
                 
                 # Получаем кнопку для карты
-                map_keyboard = YandexMaps.generate_individual_map_button(landmark,LANDMARKS)
-                
-                await message.answer(landmark_message, parse_mode="Markdown", reply_markup=map_keyboard)
-                await asyncio.sleep(0.5)
+                map_url = YandexMaps.generate_yandex_map_link(landmark_data['coordinates'], landmark)
+                map_button = InlineKeyboardButton(text=f"{YandexMaps.EMOJI['map']} {i}. {landmark}", url=map_url)
+                cards.append((render_card, descriptions[landmark], [[map_button]]))
+        
+        with span("route.cards", cards=len(cards)) as stage:
+            stage.set(messages=await send_streamed_cards(message, cards))
         
         # Считаем средний рейтинг маршрута
         total_rating = 0
@@ -271,7 +354,11 @@ async def generate_and_send_route(message: types.Message):
         )
         
     except Exception as e:
-        print(f"❌ Ошибка: {e}")
+        logger.exception("❌ Ошибка построения маршрута: %s", e)
+        # Не оставляем висящие запросы к GPT
+        for task in gpt_tasks:
+            if not task.done():
+                task.cancel()
         await message.answer(
             f"😔 **К сожалению, произошла ошибка**\n\n"
             f"━━━━━━━━━━━━━━━━━━━━━\n"
@@ -284,23 +371,20 @@ async def generate_and_send_route(message: types.Message):
             reply_markup=Keybord.get_action_keyboard()
         )
 
-@dp.message(lambda message: message.text in INTERESTS_LIST)
+@handlers.message(lambda message: message.text in app.interests)
 async def handle_interest_selection(message: types.Message):
     user_id = message.from_user.id
     
-    if user_id not in user_data or user_data[user_id].get("step") != "waiting_interest":
-        user_data[user_id] = {"step": "waiting_interest"}
+    if await session_step(user_id) != "waiting_interest":
+        await app.sessions.reset(user_id)
         await message.answer(
             f"🔄 **Начнем сначала!**\n\n"
             f"👇 Выберите интерес из меню ниже:",
-            reply_markup=Keybord.get_interests_keyboard(INTERESTS_LIST)
+            reply_markup=Keybord.get_interests_keyboard(app.interests)
         )
         return
     
-    user_data[user_id] = {
-        "step": "waiting_time",
-        "interest": message.text
-    }
+    await app.sessions.reset(user_id, step="waiting_time", interest=message.text)
     
     response_text = (
         f"✅ **Отличный выбор!** {message.text}\n\n"
@@ -317,31 +401,33 @@ async def handle_interest_selection(message: types.Message):
     
     await message.answer(response_text, parse_mode="Markdown", reply_markup=Keybord.get_time_keyboard())
 
-@dp.message(lambda message: message.text in ["1 час", "2 часа", "3 часа", "4 часа"])
+@handlers.message(lambda message: message.text in ["1 час", "2 часа", "3 часа", "4 часа"])
 async def handle_time_selection(message: types.Message):
     user_id = message.from_user.id
+    session = await app.sessions.get(user_id)
     
-    if user_id not in user_data or user_data[user_id].get("step") != "waiting_time":
-        user_data[user_id] = {"step": "waiting_interest"}
+    if session is None or session.step != "waiting_time":
+        await app.sessions.reset(user_id)
         await message.answer(
             f"🔄 **Начнем сначала!**\n\n"
             f"👇 Выберите интерес из меню ниже:",
-            reply_markup=Keybord.get_interests_keyboard(INTERESTS_LIST)
+            reply_markup=Keybord.get_interests_keyboard(app.interests)
         )
         return
     
-    user_data[user_id]["step"] = "waiting_location"
-    user_data[user_id]["time"] = message.text
+    session.step = "waiting_location"
+    session.time = message.text
+    await app.sessions.save(user_id, session)
     
-    # Рассчитываем количество мест
-    places_count = route_optimizer.calculate_places_by_time(message.text)
+    # Сколько мест будет в маршруте (зависит от решателя)
+    places_hint = app.route_optimizer.places_hint(message.text)
     
     response_text = (
         f"✅ **Запомнил!** {message.text}\n\n"
         f"━━━━━━━━━━━━━━━━━━━━━\n"
         f"📍 **УКАЖИТЕ ВАШЕ МЕСТОПОЛОЖЕНИЕ**\n"
         f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-        f"📊 **Будет подобрано:** {places_count} мест\n\n"
+        f"📊 **Будет подобрано:** {places_hint}\n\n"
         f"✨ **Доступные способы:**\n\n"
         f"• 📍 Отправить геолокацию (рекомендуется)\n"
         f"• 📝 Ввести адрес вручную\n\n"
@@ -350,22 +436,24 @@ async def handle_time_selection(message: types.Message):
     
     await message.answer(response_text, parse_mode="Markdown", reply_markup=Keybord.get_location_keyboard())
 
-@dp.message(lambda message: message.location is not None)
+@handlers.message(lambda message: message.location is not None)
 async def handle_location(message: types.Message):
     user_id = message.from_user.id
+    session = await app.sessions.get(user_id)
     
-    if user_id not in user_data or user_data[user_id].get("step") != "waiting_location":
-        user_data[user_id] = {"step": "waiting_interest"}
+    if session is None or session.step != "waiting_location":
+        await app.sessions.reset(user_id)
         await message.answer(
             f"🔄 **Начнем сначала!**\n\n"
             f"👇 Выберите интерес из меню ниже:",
-            reply_markup=Keybord.get_interests_keyboard(INTERESTS_LIST)
+            reply_markup=Keybord.get_interests_keyboard(app.interests)
         )
         return
     
     location = message.location
-    user_data[user_id]["location"] = (location.latitude, location.longitude)
-    user_data[user_id]["step"] = "processing"
+    session.location = (location.latitude, location.longitude)
+    session.step = "processing"
+    await app.sessions.save(user_id, session)
     
     await message.answer(
         f"🎨 **СОЗДАЮ ВАШ ПЕРСОНАЛЬНЫЙ МАРШРУТ...**\n\n"
@@ -381,10 +469,10 @@ async def handle_location(message: types.Message):
     )
     await generate_and_send_route(message)
 
-@dp.callback_query(lambda c: c.data == "restart")
+@handlers.callback_query(lambda c: c.data == "restart")
 async def handle_restart(callback: types.CallbackQuery):
     user_id = callback.from_user.id
-    user_data[user_id] = {"step": "waiting_interest"}
+    await app.sessions.reset(user_id)
     
     await callback.answer("✨ Начинаем новый маршрут!")
     await callback.message.answer(
@@ -395,21 +483,22 @@ async def handle_restart(callback: types.CallbackQuery):
         f"✨ Куда отправимся на этот раз?\n\n"
         f"👇 **Выберите категорию из меню:**",
         parse_mode="Markdown",
-        reply_markup=Keybord.get_interests_keyboard(INTERESTS_LIST)
+        reply_markup=Keybord.get_interests_keyboard(app.interests)
     )
 
-@dp.message()
+@handlers.message()
 async def handle_other_messages(message: types.Message):
     user_id = message.from_user.id
+    session = await app.sessions.get(user_id)
     
-    if user_id not in user_data:
+    if session is None:
         await message.answer(f"{YandexMaps.EMOJI['welcome']} Напишите /start чтобы начать!")
         return
     
-    current_step = user_data[user_id].get("step", "")
+    current_step = session.step or ""
     
     if current_step == "waiting_interest":
-        await message.answer("Пожалуйста, выберите интерес из меню ниже:", reply_markup=Keybord.get_interests_keyboard(INTERESTS_LIST))
+        await message.answer("Пожалуйста, выберите интерес из меню ниже:", reply_markup=Keybord.get_interests_keyboard(app.interests))
     elif current_step == "waiting_time":
         await message.answer("Пожалуйста, выберите время из меню ниже:", reply_markup=Keybord.get_time_keyboard())
     elif current_step == "waiting_location":
@@ -419,27 +508,81 @@ async def handle_other_messages(message: types.Message):
     else:
         await message.answer(f"{YandexMaps.EMOJI['error']} Не понимаю команду. Напишите /start чтобы начать заново.")
 
-async def main():
-    print(f"🚀 Бот запущен! Готов к работе...")
-    print(f"📍 Загружено достопримечательностей: {len(LANDMARKS)}")
+def create_dispatcher():
+    #Dispatcher с зарегистрированными обработчиками (aiogram импортируется только здесь)
+    from aiogram import Dispatcher
+    dp = Dispatcher()
+    handlers.register(dp)
+    return dp
+
+async def start_services():
+    #Общий запуск для polling и webhook: каталог, индексы, клиенты и наблюдение за таблицей каталога
+    # Каталог, индексы и клиенты создаем до приема сообщений, а не на первом запросе
+    app.warm_up()
+    
+    logger.info("🚀 Бот запущен! Готов к работе...")
+    logger.info("📍 Загружено достопримечательностей: %d", len(app.landmarks))
     
     # Проверяем доступность YandexGPT
-    if hasattr(config, 'YANDEX_GPT_API_KEY') and config.YANDEX_GPT_API_KEY:
-        print(f"🤖 YandexGPT: ВКЛЮЧЕН")
+    if app.setting('YANDEX_GPT_API_KEY'):
+        logger.info("🤖 YandexGPT: ВКЛЮЧЕН")
     else:
-        print(f"⚠️ YandexGPT: ОТКЛЮЧЕН (добавьте ключи в config.py)")
+        logger.warning("⚠️ YandexGPT: ОТКЛЮЧЕН (добавьте ключи в config.py)")
     
     # Выводим статистику по категориям
-    categories_count = {}
-    for name, data in LANDMARKS.items():
-        category = data['category']
-        categories_count[category] = categories_count.get(category, 0) + 1
+    logger.info("📊 Статистика по категориям", extra={"categories": app.catalogue.category_stats})
+    
+    # Новая таблица каталога подхватывается без перезапуска (0 - отключить проверку)
+    from catalogue_watcher import CatalogueWatcher
+    watcher = CatalogueWatcher(app, interval=app.setting('CATALOGUE_RELOAD_INTERVAL', 30.0))
     
-    print("📊 Статистика по категориям:")
-    for category, count in categories_count.items():
-        print(f"  - {category}: {count} объектов")
+    # Трассировка: p50/p95/p99 этапов на /metrics (METRICS_PORT, 0 - без сервера), выборка трасс в JSON
+    tracer.configure(app.setting('TRACE_SAMPLE_RATE', 0.0), app.setting('TRACE_PATH', 'traces.jsonl'))
+    tracer.collectors[:] = [
+        lambda: numeric_stats("gpt_scheduler", app.yandex_gpt.get_scheduler_stats()),
+        lambda: numeric_stats("routing", app.routing.get_stats()),
+        lambda: numeric_stats("sessions", app.sessions.get_stats()),
+        lambda: numeric_stats("telegram", app.telegram_limits.get_stats()),
+        lambda: numeric_stats("logs", logs.get_stats()),
+    ]
+    tracer.refreshers[:] = [app.sessions.refresh_stats]
+    metrics_runner = None
+    if app.setting('METRICS_PORT', 0):
+        metrics_runner = await start_metrics_server(app.setting('METRICS_HOST', '127.0.0.1'), app.setting('METRICS_PORT'))
     
-    await dp.start_polling(bot)
+    # Открываем пул соединений к YandexGPT на все время работы бота
+    await app.yandex_gpt.start()
+    app.routing.start()
+    watcher.start()
+    return watcher, metrics_runner
+
+async def stop_services(services):
+    watcher, metrics_runner = services
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+    logger.info("📈 Этапы", extra={"stats": tracer.get_stats()['stages']})
+    await watcher.stop()
+    logger.info("🧭 Маршруты", extra={"stats": app.routing.get_stats()})
+    app.routing.close()
+    logger.info("🔌 Пул YandexGPT", extra={"stats": app.yandex_gpt.get_pool_stats()})
+    logger.info("💾 Кэш YandexGPT", extra={"stats": app.yandex_gpt.get_cache_stats()})
+    logger.info("🚥 Очередь YandexGPT", extra={"stats": app.yandex_gpt.get_scheduler_stats()})
+    await app.yandex_gpt.close()
+    logger.info("📍 Геокодер", extra={"stats": app.geocoder.get_stats()})
+    app.geocoder.close()
+    logger.info("👥 Сессии", extra={"stats": app.sessions.get_stats()})
+    logger.info("📨 Доставка в Telegram", extra={"stats": app.telegram_limits.get_stats()})
+    await app.sessions.close()
+
+async def main():
+    # Режим long polling (один процесс); несколько процессов за webhook - см. webhook.py
+    logs.setup_from_settings(app)
+    dp = create_dispatcher()
+    services = await start_services()
+    try:
+        await dp.start_polling(app.bot)
+    finally:
+        await stop_services(services)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -1,5 +1,14 @@
-from typing import List, Tuple, Dict
-from geopy.distance import geodesic
+import logging
+from typing import List, Tuple, Dict, Optional, Union
+from spatial_index import SpatialIndex
+from keyword_index import KeywordIndex
+import numpy as np
+from distance_matrix import DistanceEngine, LandmarkMatrix, nearest_neighbour_order, walking_minutes
+from route_solvers import orienteering_route, with_end_node, RouteImprover
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
 # Обратный маппинг для поиска по категориям 
 DISPLAY_TO_CATEGORY_MAPPING = {
     "🏛️ История": ["история", "музей", "памятник", "кремль"],
@@ -21,17 +30,75 @@ DISPLAY_TO_CATEGORY_MAPPING = {
 }
 
 class RouteOptimizer:
+    # "rating" - топ-N по рейтингу + ближайший сосед; "orienteering" - максимум рейтинга в рамках бюджета времени
+    SOLVERS = ("rating", "orienteering")
     
-    def __init__(self, landmarks: Dict):
+    def __init__(self, landmarks: Dict, distance_mode: str = "haversine", matrix_cache_dir: Optional[str] = "matrix_cache",
+                 solver: str = "rating", solver_deadline_ms: float = 50.0, post_optimizers: Optional[List] = None,
+                 keyword_ids: Optional[Dict] = None):
+        if solver not in self.SOLVERS:
+            raise ValueError(f"Неизвестный режим маршрута: {solver}. Доступны: {', '.join(self.SOLVERS)}")
+        self.solver = solver
+        self.solver_deadline_ms = solver_deadline_ms
+        self.matrix_cache_dir = matrix_cache_dir
+        # Все расстояния считаются матрицами; "geodesic" - точный, но медленный режим
+        self.distance_engine = DistanceEngine(distance_mode)
+        self.rebuild_indexes(landmarks, keyword_ids)
+        # Этапы улучшения порядка точек после решателя: объекты с методом improve(order, matrix, end)
+        self.post_optimizers = [RouteImprover()] if post_optimizers is None else post_optimizers
+        self.last_route_report = []
+        self.improvement_stats = {"routes": 0, "total_ms": 0.0, "total_improvement_pct": 0.0}
+    
+    def rebuild_indexes(self, landmarks: Dict, keyword_ids: Optional[Dict] = None):
+        #Пересборка всех производных структур каталога (при старте и при обновлении таблицы).
+        #keyword_ids - готовый обратный индекс из снимка каталога
         self.landmarks = landmarks
+        # Расстояния между местами каталога считаются один раз и переиспользуются между перезапусками
+        self.landmark_matrix = None
+        if self.matrix_cache_dir:
+            self.landmark_matrix = LandmarkMatrix.load_or_build(landmarks, self.distance_engine, self.matrix_cache_dir)
+        # Пространственный индекс строится один раз на весь каталог
+        self.spatial_index = SpatialIndex(landmarks)
+        # Обратный индекс по ключевым словам интересов
+        self.keyword_index = KeywordIndex(landmarks, DISPLAY_TO_CATEGORY_MAPPING, keyword_ids)
+    
+    def prune_matrix_cache(self) -> int:
+        #Удаляет матрицы расстояний прежних версий каталога (вызывается после подмены каталога)
+        if self.landmark_matrix is None:
+            return 0
+        return LandmarkMatrix.prune_cache(self.matrix_cache_dir, self.distance_engine.mode,
+                                          self.landmark_matrix.fingerprint)
+    
+    def nearest_landmarks(self, point: Tuple[float, float], k: int = 5,
+                          landmarks: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        #k ближайших к точке мест (опционально только из списка landmarks): [(название, км), ...]
+        return self.spatial_index.nearest(point, k, names=landmarks)
+    
+    def landmarks_within(self, point: Tuple[float, float], radius_km: float,
+                         category: Optional[str] = None) -> List[Tuple[str, float]]:
+        #Места в радиусе radius_km (опционально с категорией), по возрастанию расстояния
+        return self.spatial_index.within(point, radius_km, category)
     
     def calculate_distance(self, coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
-        return geodesic(coord1, coord2).km
+        return self.distance_engine.distance(coord1, coord2)
+    
+    def build_route_matrix(self, landmarks: List[str], start_point: Tuple[float, float]):
+        #Матрица расстояний: индекс 0 - старт, 1..n - места из landmarks
+        coordinates = [self.landmarks[landmark]['coordinates'] for landmark in landmarks]
+        if self.landmark_matrix is None or not all(landmark in self.landmark_matrix for landmark in landmarks):
+            return self.distance_engine.route_matrix(start_point, coordinates)
+        
+        # Из предрасчитанной матрицы берем блок мест, на запрос считаем только строку старта
+        start_row = self.distance_engine.matrix([start_point], coordinates)[0]
+        size = len(landmarks) + 1
+        matrix = np.zeros((size, size), dtype=np.float64)
+        matrix[0, 1:] = start_row
+        matrix[1:, 0] = start_row
+        matrix[1:, 1:] = self.landmark_matrix.submatrix(landmarks)
+        return matrix
     
     
     def get_landmarks_by_interest(self, interest_display: str, max_landmarks: int = 10) -> List[str]:
-        relevant_landmarks = []
-        
         if interest_display == "🌟 Любые достопримечательности":
             return list(self.landmarks.keys())[:max_landmarks]
         
@@ -40,19 +107,10 @@ class RouteOptimizer:
         if not search_keywords:
             return list(self.landmarks.keys())[:max_landmarks]
         
-        print(f"🔍 Поиск по ключевым словам для '{interest_display}': {search_keywords}")
+        logger.debug("🔍 Поиск по ключевым словам для '%s': %s", interest_display, search_keywords)
         
-        for name, data in self.landmarks.items():
-            category_lower = data['category'].lower()
-            description_lower = data.get('description', '').lower()
-            features_lower = [f.lower() for f in data.get('features', [])]
-            
-            matches_category = any(keyword in category_lower for keyword in search_keywords)
-            matches_description = any(keyword in description_lower for keyword in search_keywords)
-            matches_features = any(any(keyword in feature for keyword in search_keywords) for feature in features_lower)
-            
-            if matches_category or matches_description or matches_features:
-                relevant_landmarks.append(name)
+        # Результат по интересу уже посчитан обратным индексом при загрузке каталога
+        relevant_landmarks = list(self.keyword_index.landmarks_for_interest(interest_display))
         
         if len(relevant_landmarks) < 2:
             all_landmarks = list(self.landmarks.keys())
@@ -60,7 +118,7 @@ class RouteOptimizer:
             additional = [lm for lm in all_landmarks if lm not in relevant_landmarks]
             relevant_landmarks.extend(additional[:max_landmarks - len(relevant_landmarks)])
         
-        print(f"🎯 Найдено {len(relevant_landmarks)} мест для интереса '{interest_display}'")
+        logger.debug("🎯 Найдено %d мест для интереса '%s'", len(relevant_landmarks), interest_display)
         return relevant_landmarks[:max_landmarks]
     
     def calculate_places_by_time(self, available_time: str) -> int:
@@ -72,10 +130,53 @@ class RouteOptimizer:
         }
         return time_mapping.get(available_time, 3)
     
-    def find_optimal_route(self, landmarks: List[str], start_point: Tuple[float, float], max_places: int = 5) -> List[str]:
+    def places_hint(self, available_time: str) -> str:
+        #Подсказка при выборе времени: сколько мест будет в маршруте у текущего решателя
+        if self.solver == "orienteering":
+            return f"сколько успеете за {self.time_budget_minutes(available_time):.0f} мин (дорога + осмотр)"
+        return f"{self.calculate_places_by_time(available_time)} мест"
+    
+    def time_budget_minutes(self, available_time: str) -> float:
+        #"2 часа" -> 120 минут
+        try:
+            return float(available_time.split()[0]) * 60
+        except (ValueError, IndexError, AttributeError):
+            return 120.0
+    
+    def end_row(self, matrix, route_end: Union[str, Tuple[float, float]], start_point: Tuple[float, float],
+                landmarks: List[str]):
+        #Расстояния до финиша: "open" - финиш в последней точке, "return" - возврат к старту, (lat, lon) - точка финиша
+        if route_end == "open":
+            return None
+        if route_end == "return":
+            return matrix[0]
+        coordinates = [start_point, *(self.landmarks[landmark]['coordinates'] for landmark in landmarks)]
+        return self.distance_engine.matrix([route_end], coordinates)[0]
+    
+    def apply_post_optimizers(self, order: List[int], matrix, end_row=None) -> List[int]:
+        #Прогоняет порядок точек через все этапы улучшения и сохраняет отчеты (улучшение, время)
+        extended = with_end_node(matrix, end_row)
+        end = len(matrix)
+        reports = []
+        for stage in self.post_optimizers:
+            order, report = stage.improve(order, extended, end)
+            reports.append(report)
+            self.improvement_stats["total_ms"] += report["elapsed_ms"]
+            self.improvement_stats["total_improvement_pct"] += report["improvement_pct"]
+        self.improvement_stats["routes"] += 1
+        self.last_route_report = reports
+        return order
+    
+    def find_optimal_route(self, landmarks: List[str], start_point: Tuple[float, float], max_places: int = 5,
+                           time_budget: Optional[float] = None, solver: Optional[str] = None,
+                           route_end: Union[str, Tuple[float, float]] = "open") -> List[str]:
         if not landmarks:
             return []
         
+        solver = solver or self.solver
+        if solver == "orienteering" and time_budget is not None:
+            return self.find_time_budget_route(landmarks, start_point, time_budget, max_places, route_end)
+        
         # Сортируем достопримечательности по рейтингу
         landmarks_with_rating = []
         for landmark in landmarks:
@@ -90,29 +191,90 @@ class RouteOptimizer:
         if not top_landmarks:
             return []
         
-        # Оптимизируем маршрут между выбранными местами
-        unvisited = top_landmarks.copy()
-        route = []
-        current_point = start_point
-        
-        while unvisited:
-            nearest = None
-            min_distance = float('inf')
-            
-            for landmark in unvisited:
-                if landmark in self.landmarks:
-                    landmark_coords = self.landmarks[landmark]['coordinates']
-                    distance = self.calculate_distance(current_point, landmark_coords)
-                    if distance < min_distance:
-                        min_distance = distance
-                        nearest = landmark
-            
-            if nearest:
-                route.append(nearest)
-                current_point = self.landmarks[nearest]['coordinates']
-                unvisited.remove(nearest)
-        
-        return route
-
-
-
+        # Оптимизируем маршрут между выбранными местами по матрице расстояний
+        matrix = self.build_route_matrix(top_landmarks, start_point)
+        order = nearest_neighbour_order(matrix)
+        order = self.apply_post_optimizers(order, matrix, self.end_row(matrix, route_end, start_point, top_landmarks))
+        
+        return [top_landmarks[i - 1] for i in order]
+    
+    def find_time_budget_route(self, landmarks: List[str], start_point: Tuple[float, float], time_budget: float,
+                               max_places: Optional[int] = None,
+                               route_end: Union[str, Tuple[float, float]] = "open") -> List[str]:
+        #Маршрут с максимальным суммарным рейтингом, укладывающийся в time_budget минут (дорога + осмотр)
+        candidates = [landmark for landmark in dict.fromkeys(landmarks) if landmark in self.landmarks]
+        if not candidates:
+            return []
+        
+        walk = walking_minutes(self.build_route_matrix(candidates, start_point))
+        end_row = self.end_row(walk, route_end, start_point, candidates)
+        if end_row is not None and route_end != "return":
+            end_row = walking_minutes(end_row)
+        visit = [self.landmarks[landmark].get('visit_time', 1.0) * 60 for landmark in candidates]
+        scores = [self.landmarks[landmark]['rating'] for landmark in candidates]
+        order = orienteering_route(walk, visit, scores, time_budget, max_places, self.solver_deadline_ms, end_row)
+        # Маршрут "rating", обрезанный по бюджету, бывает лучше жадной вставки - берем лучший из двух
+        by_rating = self.rating_order_within_budget(walk, visit, scores, time_budget, max_places, end_row)
+        if sum(scores[i - 1] for i in by_rating) > sum(scores[i - 1] for i in order) + 1e-9:
+            order = by_rating
+        order = self.apply_post_optimizers(order, walk, end_row)
+        
+        return [candidates[i - 1] for i in order]
+    
+    @staticmethod
+    def rating_order_within_budget(walk, visit: List[float], scores: List[float], time_budget: float,
+                                   max_places: Optional[int] = None, end_row=None) -> List[int]:
+        #Маршруты "rating" из k лучших мест (ближайший сосед), обрезанные по бюджету; лучший по рейтингу из всех k
+        ranked = sorted(range(1, len(walk)), key=lambda i: -scores[i - 1])[:max_places or len(walk) - 1]
+        best, best_score = [], 0.0
+        for k in range(1, len(ranked) + 1):
+            nodes = [0, *ranked[:k]]
+            order, used, previous = [], 0.0, 0
+            for i in nearest_neighbour_order(walk[np.ix_(nodes, nodes)]):
+                node = nodes[i]
+                cost = used + walk[previous, node] + visit[node - 1]
+                if cost + (end_row[node] if end_row is not None else 0.0) > time_budget:
+                    break
+                order.append(node)
+                used, previous = cost, node
+            score = sum(scores[node - 1] for node in order)
+            if score > best_score + 1e-9:
+                best, best_score = order, score
+        return best
+    
+    def plan_route(self, interest_display: str, start_point: Tuple[float, float], available_time: str,
+                   max_places: int = 8, max_landmarks: int = 40, solver: Optional[str] = None):
+        #Полный расчет маршрута для пользователя: (кандидаты по интересу, маршрут).
+        #Кандидатов берем с запасом - решатель сам выберет лучшие под бюджет времени.
+        #"rating": мест столько, сколько обещает calculate_places_by_time; "orienteering": сколько уложится
+        #в бюджет времени с учетом дороги и visit_time (max_places - только верхняя граница)
+        with span("optimizer.candidates", interest=interest_display) as stage:
+            # Из всех мест по интересу берем ближайшие к старту (пространственный индекс), а не первые по списку
+            matching = self.get_landmarks_by_interest(interest_display, max_landmarks=len(self.landmarks))
+            landmarks = [name for name, _ in self.nearest_landmarks(start_point, max_landmarks, matching)]
+            stage.set(candidates=len(landmarks))
+        if not landmarks:
+            return [], []
+        solver = solver or self.solver
+        if solver == "rating":
+            max_places = min(max_places, self.calculate_places_by_time(available_time))
+        time_budget = self.time_budget_minutes(available_time)
+        with span("optimizer.solve", solver=solver) as stage:
+            route = self.find_optimal_route(landmarks, start_point, max_places=max_places,
+                                            time_budget=time_budget, solver=solver)
+            if not route and solver == "orienteering":
+                # Даже одно место не укладывается в бюджет (долгий осмотр) - предлагаем ближайшее к старту
+                logger.debug("⏱️ Ни одно место не укладывается в %s, берем ближайшее", available_time)
+                route = [name for name, _ in self.nearest_landmarks(start_point, 1, landmarks)]
+                stage.set(fallback="nearest")
+            stage.set(stops=len(route))
+        return landmarks, route
+    
+    def route_duration_minutes(self, route: List[str], start_point: Tuple[float, float]) -> float:
+        #Время маршрута: дорога пешком от старта по всем точкам + осмотр
+        if not route:
+            return 0.0
+        walk = walking_minutes(self.build_route_matrix(route, start_point))
+        walking = sum(walk[i, i + 1] for i in range(len(route)))
+        visiting = sum(self.landmarks[landmark].get('visit_time', 1.0) * 60 for landmark in route)
+        return float(walking + visiting)
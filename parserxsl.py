@@ -1,138 +1,162 @@
+import logging
 import re
 import os
-from typing import  Tuple, Optional
-import pandas as pd
+from typing import  Tuple, Optional, TYPE_CHECKING
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Координаты в формате POINT (долгота широта); скобки и слово POINT необязательны
+POINT_RE = re.compile(r'(?:POINT\s*)?\(?\s*([\d.]+)\s+([\d.]+)', re.IGNORECASE)
+# Границы Нижнего Новгорода
+NN_LON_RANGE = (43.0, 45.0)
+NN_LAT_RANGE = (56.0, 57.0)
 
 class Parser:
 
     #Загрузка данных из Excel 
 
+    @staticmethod
+    def detect_columns(columns) -> dict:
+        #Определение колонок по ключевым словам в заголовках
+        detected = {
+            'name': None, 'coords': None, 'category': None, 'rating': None,
+            'time': None, 'description': None, 'features': None,
+        }
+        for i, col_name in enumerate(columns):
+            col_lower = str(col_name).lower()
+            if any(keyword in col_lower for keyword in ['название', 'name', 'объект', 'title']):
+                detected['name'] = i
+            elif any(keyword in col_lower for keyword in ['координат', 'coord', 'гео', 'point']):
+                detected['coords'] = i
+            elif any(keyword in col_lower for keyword in ['категория', 'category', 'тип', 'type']):
+                detected['category'] = i
+            elif any(keyword in col_lower for keyword in ['рейтинг', 'rating', 'оценка']):
+                detected['rating'] = i
+            elif any(keyword in col_lower for keyword in ['время', 'time', 'продолжительность']):
+                detected['time'] = i
+            elif any(keyword in col_lower for keyword in ['описание', 'description', 'информация']):
+                detected['description'] = i
+            elif any(keyword in col_lower for keyword in ['особенности', 'features', 'теги', 'tags']):
+                detected['features'] = i
+        return detected
+
+    @staticmethod
+    def read_excel(file_path: str) -> "pd.DataFrame":
+        #calamine (если установлен) читает xlsx в разы быстрее openpyxl
+        import pandas as pd
+        try:
+            import python_calamine  # noqa: F401
+            return pd.read_excel(file_path, engine="calamine")
+        except ImportError:
+            return pd.read_excel(file_path)
+
     @staticmethod
     def load_landmarks_from_excel(file_path: str = "cultural_objects_mnn.xlsx"):
         try:
             if not os.path.exists(file_path):
-                print(f"❌ Файл {file_path} не найден!")
+                logger.error("❌ Файл %s не найден!", file_path)
                 return Parser.get_default_landmarks()
             
-            df = pd.read_excel(file_path)
-            landmarks = {}
-            
-            print("📊 Колонки в файле:", df.columns.tolist())
-            
-            name_col = None
-            coords_col = None
-            category_col = None
-            rating_col = None
-            time_col = None
-            description_col = None
-            features_col = None
-            
-            for i, col_name in enumerate(df.columns):
-                col_lower = str(col_name).lower()
-                if any(keyword in col_lower for keyword in ['название', 'name', 'объект', 'title']):
-                    name_col = i
-                elif any(keyword in col_lower for keyword in ['координат', 'coord', 'гео', 'point']):
-                    coords_col = i
-                elif any(keyword in col_lower for keyword in ['категория', 'category', 'тип', 'type']):
-                    category_col = i
-                elif any(keyword in col_lower for keyword in ['рейтинг', 'rating', 'оценка']):
-                    rating_col = i
-                elif any(keyword in col_lower for keyword in ['время', 'time', 'продолжительность']):
-                    time_col = i
-                elif any(keyword in col_lower for keyword in ['описание', 'description', 'информация']):
-                    description_col = i
-                elif any(keyword in col_lower for keyword in ['особенности', 'features', 'теги', 'tags']):
-                    features_col = i
-            
-            print(f"🔍 Определены колонки: название={name_col}, координаты={coords_col}, категория={category_col}")
-            
-            for index, row in df.iterrows():
-                try:
-                    if name_col is None or pd.isna(row.iloc[name_col]):
-                        continue
-                    
-                    name = str(row.iloc[name_col]).strip()
-                    if not name or name == 'nan':
-                        continue
-                    
-                    # Обработка координат
-                    coords = None
-                    if coords_col is not None and len(row) > coords_col:
-                        coords_str = str(row.iloc[coords_col])
-                        coords = Parser.parse_point_coordinates(coords_str)
-                    
-                    if not coords:
-                        print(f"❌ Не удалось распарсить координаты для {name}")
-                        continue
-                    
-                    # Обработка категории
-                    category = "other"
-                    if category_col is not None and len(row) > category_col:
-                        category_val = row.iloc[category_col]
-                        if not pd.isna(category_val):
-                            category = str(category_val).strip().lower()
-                    
-                    # Обработка рейтинга
-                    rating = 4.0
-                    if rating_col is not None and len(row) > rating_col:
-                        try:
-                            rating_val = row.iloc[rating_col]
-                            if not pd.isna(rating_val):
-                                rating = float(rating_val)
-                        except:
-                            pass
-                    
-                    # Обработка времени посещения
-                    visit_time = 1.0
-                    if time_col is not None and len(row) > time_col:
-                        try:
-                            time_val = row.iloc[time_col]
-                            if not pd.isna(time_val):
-                                visit_time = float(time_val)/10
-                        except:
-                            pass
-                    
-                    # Обработка описания
-                    description = ""
-                    if description_col is not None and len(row) > description_col:
-                        desc_val = row.iloc[description_col]
-                        if not pd.isna(desc_val):
-                            description = str(desc_val).strip()
-                    
-                    # Обработка особенностей
-                    features = []
-                    if features_col is not None and len(row) > features_col:
-                        features_val = row.iloc[features_col]
-                        if not pd.isna(features_val):
-                            features = [f.strip() for f in str(features_val).split(',') if f.strip()]
-                    
-                    landmarks[name] = {
-                        'coordinates': coords,
-                        'category': category,
-                        'rating': rating,
-                        'visit_time': visit_time,
-                        'description': description,
-                        'features': features,
-                        'original_description': description 
-                    }
-                    
-                    print(f"✅ Загружено: {name} - {coords} - категория: {category}")
-                    
-                except Exception as e:
-                    print(f"❌ Ошибка в строке {index}: {e}")
-                    continue
-            
-            print(f"🎯 Итог: загружено {len(landmarks)} достопримечательностей")
-            return landmarks
+            df = Parser.read_excel(file_path)
+            logger.debug("📊 Колонки в файле: %s", df.columns.tolist())
+            return Parser.landmarks_from_dataframe(df)
             
         except Exception as e:
-            print(f"❌ Критическая ошибка загрузки Excel: {e}")
+            logger.exception("❌ Критическая ошибка загрузки Excel: %s", e)
             return Parser.get_default_landmarks()
+
+    @staticmethod
+    def landmarks_from_dataframe(df: "pd.DataFrame") -> dict:
+        #Разбор таблицы целыми колонками (без iterrows); проблемные строки попадают в общую сводку
+        import pandas as pd
+        columns = Parser.detect_columns(df.columns)
+        logger.debug("🔍 Определены колонки: название=%s, координаты=%s, категория=%s",
+                     columns['name'], columns['coords'], columns['category'])
+        
+        landmarks = {}
+        if columns['name'] is None or df.empty:
+            logger.info("🎯 Итог: загружено 0 достопримечательностей")
+            return landmarks
+        
+        def column(key):
+            return df.iloc[:, columns[key]] if columns[key] is not None else None
+        
+        # Название: пропуски и пустые строки отбрасываем
+        names_raw = column('name')
+        names = names_raw.astype(str).str.strip()
+        valid = names_raw.notna() & (names != "") & (names != "nan")
+        skipped_names = int((~valid).sum())
+        
+        # Координаты POINT(lon lat) - одним регулярным выражением по всей колонке
+        coords_raw = column('coords')
+        if coords_raw is not None:
+            extracted = coords_raw.where(coords_raw.notna(), "").astype(str).str.extract(POINT_RE)
+            lon = pd.to_numeric(extracted[0], errors="coerce")
+            lat = pd.to_numeric(extracted[1], errors="coerce")
+        else:
+            lon = lat = pd.Series(float("nan"), index=df.index)
+        in_city = lon.between(*NN_LON_RANGE) & lat.between(*NN_LAT_RANGE)
+        bad_coords = valid & ~in_city
+        valid &= in_city
+        
+        category_raw = column('category')
+        if category_raw is not None:
+            categories = category_raw.astype(str).str.strip().str.lower().where(category_raw.notna(), "other")
+        else:
+            categories = pd.Series("other", index=df.index)
+        
+        rating_raw = column('rating')
+        ratings = (pd.to_numeric(rating_raw, errors="coerce").fillna(4.0)
+                   if rating_raw is not None else pd.Series(4.0, index=df.index))
+        
+        time_raw = column('time')
+        visit_times = ((pd.to_numeric(time_raw, errors="coerce") / 10).fillna(1.0)
+                       if time_raw is not None else pd.Series(1.0, index=df.index))
+        
+        description_raw = column('description')
+        descriptions = (description_raw.astype(str).str.strip().where(description_raw.notna(), "")
+                        if description_raw is not None else pd.Series("", index=df.index))
+        
+        features_raw = column('features')
+        if features_raw is not None:
+            features_list = [
+                [f.strip() for f in str(value).split(',') if f.strip()] if notna else []
+                for value, notna in zip(features_raw.tolist(), features_raw.notna().tolist())
+            ]
+        else:
+            features_list = [[] for _ in range(len(df))]
+        
+        for is_valid, name, row_lat, row_lon, category, rating, visit_time, description, features in zip(
+                valid.tolist(), names.tolist(), lat.tolist(), lon.tolist(), categories.tolist(),
+                ratings.tolist(), visit_times.tolist(), descriptions.tolist(), features_list):
+            if not is_valid:
+                continue
+            landmarks[name] = {
+                'coordinates': (row_lat, row_lon),
+                'category': category,
+                'rating': float(rating),
+                'visit_time': float(visit_time),
+                'description': description,
+                'features': features,
+                'original_description': description
+            }
+        
+        if bad_coords.any():
+            examples = ", ".join(names[bad_coords].head(5).tolist())
+            logger.warning("❌ Не удалось распарсить координаты (или они вне НН) для %d строк: %s",
+                           int(bad_coords.sum()), examples)
+        if skipped_names:
+            logger.warning("⚠️ Пропущено строк без названия: %d", skipped_names)
+        logger.info("🎯 Итог: загружено %d достопримечательностей", len(landmarks))
+        return landmarks
    
     @staticmethod
     def parse_point_coordinates(coord_str: str) -> Optional[Tuple[float, float]]:
         #Парсинг координат в формате POINT где долгота первая, широта вторая
+        import pandas as pd
         if pd.isna(coord_str) or not coord_str:
             return None
         
@@ -154,13 +178,13 @@ class Parser:
                     lat = float(match.group(2))  # широта
                     
                     # Проверяем, что координаты в пределах НН
-                    if 43.0 <= lon <= 45.0 and 56.0 <= lat <= 57.0:
+                    if NN_LON_RANGE[0] <= lon <= NN_LON_RANGE[1] and NN_LAT_RANGE[0] <= lat <= NN_LAT_RANGE[1]:
                         return (lat, lon)  
                     else:
-                        print(f"❌ Координаты вне пределов НН: lon={lon}, lat={lat}")
+                        logger.debug("❌ Координаты вне пределов НН: lon=%s, lat=%s", lon, lat)
                         
                 except ValueError as e:
-                    print(f"❌ Ошибка преобразования чисел: {e}")
+                    logger.debug("❌ Ошибка преобразования чисел: %s", e)
                     continue
         
         return None
@@ -242,17 +266,17 @@ class Parser:
             }
         }
         
-        print(f"✅ Создано {len(landmarks)} тестовых достопримечательностей")
+        logger.info("✅ Создано %d тестовых достопримечательностей", len(landmarks))
         return landmarks
     
     
     @staticmethod
     def output_lendmarks():
         "Загрузка достопремечательностей"
-        LANDMARKS = Parser.load_landmarks_from_excel("cultural_objects_mnn.xlsx")
-        if len(LANDMARKS) == 0:
-            LANDMARKS = Parser.get_default_landmarks()
-        print(f"✅ Загружено {len(LANDMARKS)} достопримечательностей")
+        # Из бинарного снимка, если таблица не менялась (без импорта pandas)
+        from catalogue_snapshot import load_catalogue
+        LANDMARKS = load_catalogue("cultural_objects_mnn.xlsx").landmarks
+        logger.info("✅ Загружено %d достопримечательностей", len(LANDMARKS))
         return LANDMARKS
     
 
@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from parserxsl import Parser
+from keybords import Keybord
+from yandex_gpt import GPTScheduler, YandexGPT
+from description_store import DescriptionStore
+from logs import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+# Офлайн-генерация описаний для всех пар (достопримечательность × интерес).
+# Результат - pregenerated_descriptions.json.gz, который бот загружает при старте.
+#
+#   python pregenerate.py --concurrency 4 --rps 2
+#   python pregenerate.py --stub            # прогон против локальной заглушки API
+
+
+def load_checkpoint(path: str) -> dict:
+    #Уже готовые описания из прошлого (возможно прерванного) запуска
+    items = {}
+    if not os.path.exists(path):
+        return items
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                items[record["key"]] = record["text"]
+            except (ValueError, KeyError):
+                continue  # обрывок строки после аварийной остановки
+    return items
+
+
+async def pregenerate(yandex_gpt: YandexGPT, landmarks: dict, interests: list, output: str, checkpoint: str,
+                      limit: int = 0) -> DescriptionStore:
+    #Темп и число одновременных запросов задает очередь yandex_gpt.scheduler; задачи идут с фоновым приоритетом
+    done = load_checkpoint(checkpoint)
+
+    jobs = []
+    for name, data in landmarks.items():
+        for interest in interests:
+            key = DescriptionStore.make_key(name, data, interest)
+            if key not in done:
+                jobs.append((key, name, data, interest))
+    if limit:
+        jobs = jobs[:limit]
+
+    total = len(landmarks) * len(interests)
+    logger.info("📋 Всего пар: %d, уже готово: %d, к генерации: %d", total, len(done), len(jobs))
+
+    stats = {"ok": 0, "failed": 0}
+    started = time.monotonic()
+
+    with open(checkpoint, "a", encoding="utf-8") as checkpoint_file:
+        async def run_job(key, name, data, interest):
+            text = await yandex_gpt.enhance_landmark_description(name, data, interest, use_fallback=False,
+                                                                 priority=GPTScheduler.PRIORITY_BATCH)
+            if not text:
+                stats["failed"] += 1
+                return
+            done[key] = text
+            checkpoint_file.write(json.dumps({"key": key, "text": text}, ensure_ascii=False) + "\n")
+            checkpoint_file.flush()
+            stats["ok"] += 1
+            processed = stats["ok"] + stats["failed"]
+            if processed % 50 == 0:
+                logger.info("⏳ %d/%d (%.1f с)", processed, len(jobs), time.monotonic() - started)
+
+        await asyncio.gather(*(run_job(*job) for job in jobs))
+
+    # Оставляем только пары актуального каталога
+    actual_keys = {DescriptionStore.make_key(name, data, interest)
+                   for name, data in landmarks.items() for interest in interests}
+    store = DescriptionStore(
+        {key: text for key, text in done.items() if key in actual_keys},
+        {"created_at": int(time.time()), "landmarks": len(landmarks), "interests": len(interests)}
+    )
+    store.save(output)
+
+    logger.info("✅ Сгенерировано: %d, ошибок: %d, в файле: %d/%d (%.1f с) -> %s",
+                stats['ok'], stats['failed'], len(store), total, time.monotonic() - started, output)
+    return store
+
+
+async def main():
+    arg_parser = argparse.ArgumentParser(description="Предгенерация описаний достопримечательностей")
+    arg_parser.add_argument("--excel", default="cultural_objects_mnn.xlsx")
+    arg_parser.add_argument("--output", default=None)
+    arg_parser.add_argument("--checkpoint", default=None)
+    arg_parser.add_argument("--concurrency", type=int, default=4)
+    arg_parser.add_argument("--rps", type=float, default=2.0, help="запросов в секунду (0 - без ограничения)")
+    arg_parser.add_argument("--limit", type=int, default=0, help="сгенерировать не больше N пар за запуск")
+    arg_parser.add_argument("--api-url", default=None, help="адрес completion-эндпоинта (например, локальной заглушки)")
+    arg_parser.add_argument("--stub", action="store_true", help="поднять локальную заглушку YandexGPT")
+    arg_parser.add_argument("--log-level", default="INFO")
+    args = arg_parser.parse_args()
+    # Отчет о ходе генерации для человека у терминала - обычным текстом
+    setup_logging(args.log_level, fmt="text")
+
+    # Результаты прогона против заглушки не должны попасть в боевой файл
+    suffix = ".stub" if args.stub else ""
+    output = args.output or f"pregenerated_descriptions{suffix}.json.gz"
+    checkpoint = args.checkpoint or f"pregenerated_descriptions{suffix}.checkpoint.jsonl"
+
+    landmarks = Parser.load_landmarks_from_excel(args.excel)
+    interests = Keybord.create_interests_keyboard(landmarks)
+
+    stub_runner = None
+    api_key, folder_id = "stub", "stub"
+    if not args.stub:
+        import config
+        api_key = getattr(config, 'YANDEX_GPT_API_KEY', '')
+        folder_id = getattr(config, 'YANDEX_FOLDER_ID', '')
+
+    yandex_gpt = YandexGPT(api_key=api_key, folder_id=folder_id, LANDMARKS=landmarks, limit_per_host=args.concurrency,
+                           scheduler=GPTScheduler(requests_per_second=args.rps, max_concurrency=args.concurrency))
+    if args.stub:
+        from local_stubs import start_gpt_stub
+        stub_runner, yandex_gpt.url = await start_gpt_stub()
+    elif args.api_url:
+        yandex_gpt.url = args.api_url
+
+    await yandex_gpt.start()
+    try:
+        await pregenerate(yandex_gpt, landmarks, interests, output, checkpoint, limit=args.limit)
+    finally:
+        await yandex_gpt.close()
+        if stub_runner is not None:
+            await stub_runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    #Не больше rate запусков в секунду (равномерно)
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class TokenBucket:
+    #В среднем rate запусков в секунду, но с всплесками до capacity подряд (как лимиты Telegram).
+    #rate <= 0 - без ограничения (как в RateLimiter); паузы pause() соблюдаются и тогда
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float):
+        #Сервер попросил подождать (например, 429 retry_after): до этого момента токены не выдаются
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self._updated = self._paused_until
+
+    def refund(self, amount: float = 1.0):
+        #Возврат неиспользованных токенов (взяли с запасом)
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        #Ждет amount токенов (очередь по порядку); возвращает время ожидания в секундах
+        amount = min(amount, self.capacity)
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                if self.rate <= 0:
+                    return time.monotonic() - started
+                self._refill(now)
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return time.monotonic() - started
+                await asyncio.sleep((amount - self.tokens) / self.rate)
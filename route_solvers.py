@@ -0,0 +1,193 @@
+import time
+from typing import List, Optional, Sequence
+import numpy as np
+
+
+# Эвристики построения маршрута по готовой матрице (индекс 0 - старт).
+# Путь всегда задается как [0, *order, end]: end - виртуальная конечная точка,
+# расстояние до которой определяет вариант маршрута (открытый, возврат к старту и т.д.)
+
+
+def with_end_node(matrix: np.ndarray, end_row: Optional[Sequence[float]] = None) -> np.ndarray:
+    #Добавляет виртуальный конец (индекс len(matrix)): end_row - расстояния от всех точек до финиша.
+    #None - открытый маршрут (финиш где угодно), matrix[0] - возврат к старту
+    size = len(matrix)
+    extended = np.zeros((size + 1, size + 1), dtype=np.float64)
+    extended[:size, :size] = matrix
+    if end_row is not None:
+        extended[size, :size] = end_row
+        extended[:size, size] = end_row
+    return extended
+
+
+def path_cost(order: Sequence[int], matrix: np.ndarray, end: int) -> float:
+    path = [0, *order, end]
+    return float(sum(matrix[path[i], path[i + 1]] for i in range(len(path) - 1)))
+
+
+def two_opt(order: List[int], matrix: np.ndarray, end: int, deadline: float, max_passes: int = 50) -> List[int]:
+    #Разворот отрезков маршрута, пока это сокращает путь (концы 0 и end фиксированы)
+    path = [0, *order, end]
+    improved = True
+    passes = 0
+    while improved and passes < max_passes and time.perf_counter() < deadline:
+        improved = False
+        passes += 1
+        for i in range(1, len(path) - 2):
+            a, b = path[i - 1], path[i]
+            for j in range(i + 1, len(path) - 1):
+                c, d = path[j], path[j + 1]
+                delta = matrix[a, c] + matrix[b, d] - matrix[a, b] - matrix[c, d]
+                if delta < -1e-9:
+                    path[i:j + 1] = reversed(path[i:j + 1])
+                    b = path[i]
+                    improved = True
+            if time.perf_counter() >= deadline:
+                break
+    return path[1:-1]
+
+
+def or_opt(order: List[int], matrix: np.ndarray, end: int, deadline: float,
+           max_segment: int = 3, max_passes: int = 50) -> List[int]:
+    #Перенос отрезков из 1..max_segment точек (в том числе развернутых) в другое место маршрута
+    path = [0, *order, end]
+    improved = True
+    passes = 0
+    while improved and passes < max_passes and time.perf_counter() < deadline:
+        improved = False
+        passes += 1
+        for length in range(1, max_segment + 1):
+            i = 1
+            while i + length < len(path):
+                seg_start, seg_end = i, i + length - 1
+                prev, nxt = path[seg_start - 1], path[seg_end + 1]
+                first, last = path[seg_start], path[seg_end]
+                removal_gain = matrix[prev, first] + matrix[last, nxt] - matrix[prev, nxt]
+
+                best_delta, best_move = -1e-9, None
+                for k in range(len(path) - 1):
+                    if seg_start - 1 <= k <= seg_end:
+                        continue
+                    p, q = path[k], path[k + 1]
+                    forward = matrix[p, first] + matrix[last, q] - matrix[p, q] - removal_gain
+                    backward = matrix[p, last] + matrix[first, q] - matrix[p, q] - removal_gain
+                    if forward < best_delta:
+                        best_delta, best_move = forward, (k, False)
+                    if backward < best_delta:
+                        best_delta, best_move = backward, (k, True)
+
+                if best_move is not None:
+                    k, reverse = best_move
+                    segment = path[seg_start:seg_end + 1]
+                    if reverse:
+                        segment.reverse()
+                    rest = path[:seg_start] + path[seg_end + 1:]
+                    insert_at = k + 1 if k < seg_start else k + 1 - length
+                    path = rest[:insert_at] + segment + rest[insert_at:]
+                    improved = True
+                i += 1
+                if time.perf_counter() >= deadline:
+                    return path[1:-1]
+    return path[1:-1]
+
+
+def orienteering_route(walk_minutes: np.ndarray, visit_minutes: Sequence[float], scores: Sequence[float],
+                       time_budget: float, max_places: Optional[int] = None, deadline_ms: float = 50.0,
+                       end_row: Optional[Sequence[float]] = None) -> List[int]:
+    #Максимизация суммарного рейтинга при ограничении по времени (дорога + осмотр).
+    #walk_minutes - квадратная матрица со стартом в индексе 0; возвращает индексы мест в порядке обхода
+    deadline = time.perf_counter() + deadline_ms / 1000
+    size = len(walk_minutes)
+    matrix = with_end_node(walk_minutes, end_row)
+    end = size
+    visit = np.concatenate([[0.0], np.asarray(visit_minutes, dtype=np.float64), [0.0]])
+    score = np.concatenate([[0.0], np.asarray(scores, dtype=np.float64), [0.0]])
+    max_places = max_places or size - 1
+
+    # Места, до которых нельзя даже дойти и осмотреть в рамках бюджета, сразу отбрасываем
+    candidates = {i for i in range(1, size) if matrix[0, i] + visit[i] + matrix[i, end] <= time_budget}
+
+    # Вставка по "рейтинг на минуту" проигрывает, когда выгоднее пара далеких, но лучших мест,
+    # поэтому пробуем и вставку по рейтингу - берем маршрут с большим суммарным рейтингом
+    best_order: List[int] = []
+    for by_ratio in (True, False):
+        order = _insertion_route(matrix, end, visit, score, set(candidates), time_budget, max_places, deadline, by_ratio)
+        if score[order].sum() > score[best_order].sum() + 1e-9:
+            best_order = order
+        if time.perf_counter() >= deadline:
+            break
+    return best_order
+
+
+def _insertion_route(matrix: np.ndarray, end: int, visit: np.ndarray, score: np.ndarray, candidates: set,
+                     time_budget: float, max_places: int, deadline: float, by_ratio: bool) -> List[int]:
+    #Жадная вставка мест в дешевейшую позицию пути, пока укладываемся в бюджет; by_ratio - выбор по
+    #рейтингу на добавленную минуту, иначе по рейтингу (при равенстве - по добавленному времени)
+    order: List[int] = []
+    used = float(matrix[0, end])
+
+    while candidates and len(order) < max_places and time.perf_counter() < deadline:
+        path = [0, *order, end]
+        best = None
+        for candidate in candidates:
+            for pos in range(len(path) - 1):
+                a, b = path[pos], path[pos + 1]
+                added = matrix[a, candidate] + matrix[candidate, b] - matrix[a, b] + visit[candidate]
+                if used + added > time_budget:
+                    continue
+                key = (score[candidate] / max(added, 1e-6),) if by_ratio else (score[candidate], -added)
+                if best is None or key > best[0]:
+                    best = (key, candidate, pos, added)
+
+        if best is None:
+            # Ничего не помещается - пробуем сократить путь и освободить время
+            shorter = or_opt(two_opt(order, matrix, end, deadline), matrix, end, deadline)
+            shorter_used = path_cost(shorter, matrix, end) + float(visit[shorter].sum())
+            if shorter_used < used - 1e-6:
+                order, used = shorter, shorter_used
+                continue
+            break
+
+        _, candidate, pos, added = best
+        order.insert(pos, candidate)
+        candidates.discard(candidate)
+        used += added
+
+    if len(order) > 2:
+        order = or_opt(two_opt(order, matrix, end, deadline), matrix, end, deadline)
+    return order
+
+
+class RouteImprover:
+    #Этап пост-оптимизации порядка точек: чередует 2-opt и Or-opt до сходимости или лимитов
+
+    def __init__(self, max_iterations: int = 20, time_limit_ms: float = 30.0, max_segment: int = 3):
+        self.max_iterations = max_iterations
+        self.time_limit_ms = time_limit_ms
+        self.max_segment = max_segment
+
+    def improve(self, order: List[int], matrix: np.ndarray, end: int):
+        #matrix уже содержит виртуальный конец end (см. with_end_node); возвращает (порядок, отчет)
+        started = time.perf_counter()
+        deadline = started + self.time_limit_ms / 1000
+        before = path_cost(order, matrix, end)
+        best, best_cost = list(order), before
+        iterations = 0
+        while iterations < self.max_iterations and time.perf_counter() < deadline and len(best) > 1:
+            iterations += 1
+            candidate = two_opt(best, matrix, end, deadline, max_passes=1)
+            candidate = or_opt(candidate, matrix, end, deadline, self.max_segment, max_passes=1)
+            cost = path_cost(candidate, matrix, end)
+            if cost >= best_cost - 1e-9:
+                break
+            best, best_cost = candidate, cost
+
+        report = {
+            "stage": type(self).__name__,
+            "before": before,
+            "after": best_cost,
+            "improvement_pct": (before - best_cost) / before * 100 if before > 0 else 0.0,
+            "iterations": iterations,
+            "elapsed_ms": (time.perf_counter() - started) * 1000,
+        }
+        return best, report
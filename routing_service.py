@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+import tracing
+
+logger = logging.getLogger(__name__)
+
+# Расчет маршрутов в пуле процессов, чтобы тяжелый решатель не блокировал event loop.
+# Каждый процесс пула один раз загружает каталог из снимка и открывает матрицу расстояний (memmap).
+
+_worker_optimizer = None
+
+
+def _init_worker(excel_path: str, snapshot_path: str, optimizer_options: dict):
+    global _worker_optimizer
+    from catalogue_snapshot import load_catalogue
+    from optimazer import RouteOptimizer
+    catalogue = load_catalogue(excel_path, snapshot_path)
+    _worker_optimizer = RouteOptimizer(catalogue.landmarks, keyword_ids=catalogue.keyword_ids, **optimizer_options)
+
+
+def _plan_route(interest: str, start_point: Tuple[float, float], available_time: str, max_places: int):
+    #(кандидаты, маршрут, спаны этапов расчета - их записывает основной процесс)
+    with tracing.capture() as spans:
+        landmarks, route = _worker_optimizer.plan_route(interest, start_point, available_time, max_places)
+    return landmarks, route, spans
+
+
+def _ping():
+    return _worker_optimizer is not None
+
+
+class RoutingService:
+    #Очередь заданий на маршруты: лимит одновременно выполняемых заданий, таймаут на задание и быстрый
+    #жадный маршрут в event loop, если пул занят, не успел или упал
+
+    def __init__(self, excel_path: str, snapshot_path: str, workers: int = 2, max_queue: int = 16,
+                 timeout: float = 3.0, optimizer_options: Optional[dict] = None):
+        self.excel_path = excel_path
+        self.snapshot_path = snapshot_path
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.optimizer_options = optimizer_options or {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+        self.stats = {"jobs": 0, "pool": 0, "inline": 0, "saturated": 0, "timeouts": 0, "errors": 0,
+                      "pool_restarts": 0, "peak_in_flight": 0, "total_ms": 0.0}
+
+    def start(self):
+        if self.workers <= 0 or self._pool is not None:
+            return
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.excel_path, self.snapshot_path, self.optimizer_options),
+        )
+        # Процессы поднимаются и загружают каталог сразу, а не на первом маршруте
+        for _ in range(self.workers):
+            self._pool.submit(_ping)
+
+    def restart(self):
+        #Новый пул (например, после перезагрузки каталога): текущие задания дорабатывают в старом
+        old_pool, self._pool = self._pool, None
+        if old_pool is not None:
+            old_pool.shutdown(wait=False, cancel_futures=True)
+            self.stats["pool_restarts"] += 1
+        self.start()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _release(self, loop: asyncio.AbstractEventLoop):
+        # Слот освобождается, когда процесс действительно закончил (а не когда истек таймаут ожидания)
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(self._decrement)
+            except RuntimeError:
+                # event loop уже закрыт (остановка бота)
+                pass
+        return release
+
+    def _decrement(self):
+        self.in_flight -= 1
+
+    @staticmethod
+    def fallback_route(route_optimizer, interest: str, start_point: Tuple[float, float], available_time: str,
+                       max_places: int) -> Tuple[List[str], List[str]]:
+        #Жадный маршрут (топ по рейтингу + ближайший сосед): число мест - по времени прогулки
+        return route_optimizer.plan_route(interest, start_point, available_time, max_places, solver="rating")
+
+    async def plan_route(self, route_optimizer, interest: str, start_point: Tuple[float, float],
+                         available_time: str, max_places: int) -> Tuple[List[str], List[str]]:
+        #(кандидаты, маршрут); route_optimizer - каталог запроса, по нему считается запасной маршрут
+        started = time.perf_counter()
+        self.stats["jobs"] += 1
+        with tracing.span("routing.plan") as stage:
+            try:
+                if self._pool is None:
+                    # Пул выключен (workers=0) или еще не запущен - прежний расчет в event loop
+                    self.stats["inline"] += 1
+                    stage.set(mode="inline")
+                    return route_optimizer.plan_route(interest, start_point, available_time, max_places)
+
+                if self.in_flight >= self.max_queue:
+                    self.stats["saturated"] += 1
+                    stage.set(mode="saturated")
+                    return self.fallback_route(route_optimizer, interest, start_point, available_time, max_places)
+
+                try:
+                    future = self._pool.submit(_plan_route, interest, start_point, available_time, max_places)
+                except (BrokenProcessPool, RuntimeError) as e:
+                    self.stats["errors"] += 1
+                    stage.set(mode="error")
+                    logger.warning("⚠️ Пул маршрутов недоступен, перезапускаем: %s", e)
+                    self.restart()
+                    return self.fallback_route(route_optimizer, interest, start_point, available_time, max_places)
+
+                self.in_flight += 1
+                self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.in_flight)
+                future.add_done_callback(self._release(asyncio.get_running_loop()))
+                try:
+                    landmarks, route, spans = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+                except asyncio.TimeoutError:
+                    self.stats["timeouts"] += 1
+                    stage.set(mode="timeout")
+                    logger.warning("⏱️ Маршрут не рассчитан за %s с, строим упрощенный", self.timeout)
+                    return self.fallback_route(route_optimizer, interest, start_point, available_time, max_places)
+                except BrokenProcessPool as e:
+                    self.stats["errors"] += 1
+                    stage.set(mode="error")
+                    logger.warning("⚠️ Процесс пула маршрутов упал, перезапускаем: %s", e)
+                    self.restart()
+                    return self.fallback_route(route_optimizer, interest, start_point, available_time, max_places)
+
+                self.stats["pool"] += 1
+                stage.set(mode="pool")
+                # Этапы расчета в процессе пула - в ту же трассу и гистограммы
+                tracing.tracer.replay(spans)
+                # Пул мог загрузить каталог другой версии - оставляем только места из каталога запроса
+                return ([name for name in landmarks if name in route_optimizer.landmarks],
+                        [name for name in route if name in route_optimizer.landmarks])
+            finally:
+                self.stats["total_ms"] += (time.perf_counter() - started) * 1000
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "in_flight": self.in_flight, "workers": self.workers, "max_queue": self.max_queue}
@@ -0,0 +1,234 @@
+import json
+import logging
+import sys
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Session:
+    #Состояние диалога одного пользователя (слоты вместо словаря - меньше памяти на сессию)
+    __slots__ = ("step", "interest", "time", "location", "current_route", "updated_at")
+
+    def __init__(self, step: str = "waiting_interest", interest: Optional[str] = None, time: Optional[str] = None,
+                 location: Optional[Tuple[float, float]] = None, current_route: Optional[List[str]] = None):
+        self.step = step
+        self.interest = interest
+        self.time = time
+        self.location = tuple(location) if location else None
+        self.current_route = tuple(current_route) if current_route else None
+        self.updated_at = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "step": self.step,
+            "interest": self.interest,
+            "time": self.time,
+            "location": list(self.location) if self.location else None,
+            "current_route": list(self.current_route) if self.current_route else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Session":
+        return cls(data.get("step", "waiting_interest"), data.get("interest"), data.get("time"),
+                   data.get("location"), data.get("current_route"))
+
+    def size_bytes(self) -> int:
+        #Примерный объем в памяти: сама запись и ее поля
+        size = sys.getsizeof(self)
+        for name in ("step", "interest", "time", "location"):
+            value = getattr(self, name)
+            if value is not None:
+                size += sys.getsizeof(value)
+        if self.current_route:
+            size += sys.getsizeof(self.current_route) + sum(sys.getsizeof(name) for name in self.current_route)
+        return size
+
+
+class SessionStore(ABC):
+    #Хранилище сессий: get/save/reset/delete; реализации - в памяти (LRU + TTL) и в Redis
+
+    @abstractmethod
+    async def get(self, user_id: int) -> Optional[Session]:
+        ...
+
+    @abstractmethod
+    async def save(self, user_id: int, session: Session):
+        ...
+
+    @abstractmethod
+    async def delete(self, user_id: int):
+        ...
+
+    async def reset(self, user_id: int, **fields) -> Session:
+        #Новая сессия вместо текущей (по умолчанию - шаг выбора интереса)
+        session = Session(**fields)
+        await self.save(user_id, session)
+        return session
+
+    @abstractmethod
+    def get_stats(self) -> dict:
+        ...
+
+    async def refresh_stats(self):
+        #Обновляет статистику, которую нельзя собрать синхронно в get_stats (память сервера Redis)
+        pass
+
+    async def close(self):
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    #Сессии в памяти процесса: не больше max_sessions (вытесняются самые давние) и не дольше ttl секунд
+    #с последнего обращения
+
+    def __init__(self, max_sessions: int = 10000, ttl: float = 24 * 3600):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[int, Session]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "saves": 0, "evicted": 0, "expired": 0}
+
+    def _expired(self, session: Session, now: float) -> bool:
+        return self.ttl is not None and now - session.updated_at > self.ttl
+
+    async def get(self, user_id: int) -> Optional[Session]:
+        session = self._sessions.get(user_id)
+        if session is None:
+            self.stats["misses"] += 1
+            return None
+        if self._expired(session, time.monotonic()):
+            del self._sessions[user_id]
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        # Чтение продлевает сессию: порядок очереди совпадает с порядком updated_at, на этом держится _evict
+        session.updated_at = time.monotonic()
+        self._sessions.move_to_end(user_id)
+        self.stats["hits"] += 1
+        return session
+
+    async def save(self, user_id: int, session: Session):
+        session.updated_at = time.monotonic()
+        self._sessions[user_id] = session
+        self._sessions.move_to_end(user_id)
+        self.stats["saves"] += 1
+        self._evict(session.updated_at)
+
+    def _evict(self, now: float):
+        # Просроченные сессии лежат в начале очереди - снимаем их, затем лишние по LRU
+        while self._sessions:
+            user_id, oldest = next(iter(self._sessions.items()))
+            if self._expired(oldest, now):
+                self._sessions.popitem(last=False)
+                self.stats["expired"] += 1
+            elif len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.stats["evicted"] += 1
+            else:
+                break
+
+    async def delete(self, user_id: int):
+        self._sessions.pop(user_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "approx_bytes": sys.getsizeof(self._sessions) + sum(
+                session.size_bytes() for session in self._sessions.values()
+            ),
+        }
+
+
+class RedisSessionStore(SessionStore):
+    #Сессии в Redis (или совместимом сервере): общие для нескольких процессов бота и переживают перезапуск.
+    #TTL продлевается при каждом сохранении; вытеснение по памяти - политикой maxmemory самого Redis
+
+    def __init__(self, url: str = "redis://localhost:6379/0", ttl: float = 24 * 3600,
+                 prefix: str = "tourbot:session:", client=None, memory_stats_interval: float = 30.0):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                raise RuntimeError("Для SESSION_BACKEND='redis' установите пакет redis (pip install redis)")
+            client = redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = {"hits": 0, "misses": 0, "saves": 0, "errors": 0}
+        # Последний снимок get_memory_stats: SCAN по всем ключам дорогой, обновляем не чаще интервала
+        self.memory_stats_interval = memory_stats_interval
+        self.memory_stats: dict = {}
+        self._memory_checked: Optional[float] = None
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}"
+
+    async def get(self, user_id: int) -> Optional[Session]:
+        raw = await self.client.get(self._key(user_id))
+        if raw is None:
+            self.stats["misses"] += 1
+            return None
+        try:
+            session = Session.from_dict(json.loads(raw))
+        except (TypeError, ValueError) as e:
+            self.stats["errors"] += 1
+            logger.warning("⚠️ Поврежденная сессия %s: %s", user_id, e)
+            return None
+        self.stats["hits"] += 1
+        return session
+
+    async def save(self, user_id: int, session: Session):
+        session.updated_at = time.monotonic()
+        payload = json.dumps(session.to_dict(), ensure_ascii=False, separators=(",", ":"))
+        await self.client.set(self._key(user_id), payload, ex=int(self.ttl) if self.ttl else None)
+        self.stats["saves"] += 1
+
+    async def delete(self, user_id: int):
+        await self.client.delete(self._key(user_id))
+
+    async def get_memory_stats(self) -> dict:
+        #Число сессий, память сервера и вытеснение по maxmemory (SCAN по префиксу - только для диагностики)
+        sessions = 0
+        async for _ in self.client.scan_iter(match=f"{self.prefix}*", count=1000):
+            sessions += 1
+        try:
+            info = {**await self.client.info("memory"), **await self.client.info("stats")}
+        except Exception:
+            # Совместимые серверы не всегда поддерживают INFO
+            info = {}
+        return {"sessions": sessions, "used_memory": info.get("used_memory"),
+                "maxmemory": info.get("maxmemory"), "maxmemory_policy": info.get("maxmemory_policy"),
+                "evicted_keys": info.get("evicted_keys")}
+
+    async def refresh_stats(self):
+        now = time.monotonic()
+        if self._memory_checked is not None and now - self._memory_checked < self.memory_stats_interval:
+            return
+        self._memory_checked = now
+        try:
+            self.memory_stats = await self.get_memory_stats()
+        except Exception as e:
+            logger.warning("⚠️ Не удалось получить статистику Redis: %s", e)
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "backend": "redis", "ttl": self.ttl, **self.memory_stats}
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_session_store(backend: str = "memory", **options) -> SessionStore:
+    if backend == "memory":
+        return MemorySessionStore(options.get("max_sessions", 10000), options.get("ttl", 24 * 3600))
+    if backend == "redis":
+        return RedisSessionStore(options.get("url", "redis://localhost:6379/0"), options.get("ttl", 24 * 3600))
+    raise ValueError(f"Неизвестное хранилище сессий: {backend}. Доступны: memory, redis")
@@ -0,0 +1,104 @@
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
+    lat1, lon1 = math.radians(coord1[0]), math.radians(coord1[1])
+    lat2, lon2 = math.radians(coord2[0]), math.radians(coord2[1])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex:
+    #Сетка по широте/долготе: поиск ближайших и мест в радиусе без перебора всего каталога
+
+    def __init__(self, landmarks: Dict, cell_km: float = 0.5):
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.cells = defaultdict(list)  # (i, j) -> [(name, (lat, lon)), ...]
+        self.categories = {}
+        self.size = 0
+        self.bounds = None
+        for name, data in landmarks.items():
+            self.add(name, data['coordinates'], data.get('category', ''))
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def add(self, name: str, coordinates: Tuple[float, float], category: str = ""):
+        lat, lon = coordinates
+        self.cells[self._cell(lat, lon)].append((name, (lat, lon)))
+        self.categories[name] = (category or "").lower()
+        self.size += 1
+        if self.bounds is None:
+            self.bounds = [lat, lon, lat, lon]
+        else:
+            self.bounds = [min(self.bounds[0], lat), min(self.bounds[1], lon),
+                           max(self.bounds[2], lat), max(self.bounds[3], lon)]
+
+    def _candidates(self, point: Tuple[float, float], radius_km: float) -> Iterable[Tuple[str, Tuple[float, float]]]:
+        #Все точки из ячеек, пересекающих квадрат вокруг окружности радиуса radius_km
+        if math.isinf(radius_km):
+            for cell_points in self.cells.values():
+                yield from cell_points
+            return
+        lat, lon = point
+        dlat = radius_km / KM_PER_DEGREE
+        # Долготный шаг берем по самой "узкой" широте в пределах круга
+        widest_lat = min(89.0, max(abs(lat) + dlat, 0.0))
+        dlon = min(180.0, dlat / max(math.cos(math.radians(widest_lat)), 1e-6))
+
+        i_min, j_min = self._cell(lat - dlat, lon - dlon)
+        i_max, j_max = self._cell(lat + dlat, lon + dlon)
+        if (i_max - i_min + 1) * (j_max - j_min + 1) > len(self.cells):
+            # Радиус больше всего каталога - проще пройти по заполненным ячейкам
+            for cell_points in self.cells.values():
+                yield from cell_points
+            return
+        for i in range(i_min, i_max + 1):
+            for j in range(j_min, j_max + 1):
+                cell_points = self.cells.get((i, j))
+                if cell_points:
+                    yield from cell_points
+
+    def within(self, point: Tuple[float, float], radius_km: float, category: Optional[str] = None,
+               names: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        #Места в радиусе (с фильтром по категории/списку), отсортированные по расстоянию
+        category = category.lower() if category else None
+        allowed = set(names) if names is not None else None
+        result = []
+        for name, coords in self._candidates(point, radius_km):
+            if allowed is not None and name not in allowed:
+                continue
+            if category and category not in self.categories[name]:
+                continue
+            distance = haversine_km(point, coords)
+            if distance <= radius_km:
+                result.append((name, distance))
+        result.sort(key=lambda item: item[1])
+        return result
+
+    def nearest(self, point: Tuple[float, float], k: int = 5, category: Optional[str] = None,
+                names: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        #k ближайших мест: расширяем радиус, пока в круге не окажется k точек
+        if not self.size or k <= 0:
+            return []
+        allowed = set(names) if names is not None else None
+        radius_km = self.cell_deg * KM_PER_DEGREE
+        max_radius_km = self._max_reach_km(point)
+        while radius_km < max_radius_km:
+            found = self.within(point, radius_km, category, allowed)
+            if len(found) >= k:
+                return found[:k]
+            radius_km *= 2
+        # Радиус уже охватывает весь каталог - точный проход по всем точкам
+        return self.within(point, math.inf, category, allowed)[:k]
+
+    def _max_reach_km(self, point: Tuple[float, float]) -> float:
+        #Примерное расстояние до самой дальней точки каталога (по углам описывающего прямоугольника)
+        lat_min, lon_min, lat_max, lon_max = self.bounds
+        corners = [(lat_min, lon_min), (lat_min, lon_max), (lat_max, lon_min), (lat_max, lon_max)]
+        return max(haversine_km(point, corner) for corner in corners)
@@ -0,0 +1,112 @@
+import os
+import shutil
+import pytest
+import catalogue_snapshot
+from catalogue_snapshot import Catalogue, load_catalogue, read_snapshot, source_fingerprint, write_snapshot
+from parserxsl import Parser
+
+EXCEL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cultural_objects_mnn.xlsx")
+
+
+@pytest.fixture(scope="module")
+def parsed():
+    return Catalogue.from_landmarks(Parser.load_landmarks_from_excel(EXCEL_PATH), source_fingerprint(EXCEL_PATH))
+
+
+@pytest.fixture
+def excel(tmp_path):
+    path = str(tmp_path / "catalogue.xlsx")
+    shutil.copy(EXCEL_PATH, path)
+    return path
+
+
+@pytest.fixture
+def no_parse(monkeypatch):
+    #Разбор xlsx запрещен: каталог должен прийти из снимка
+    def fail(path):
+        raise AssertionError("xlsx разобран повторно")
+    monkeypatch.setattr(Parser, "load_landmarks_from_excel", staticmethod(fail))
+
+
+def assert_same(catalogue, expected):
+    assert catalogue.landmarks == expected.landmarks
+    assert list(catalogue.landmarks) == list(expected.landmarks)
+    assert catalogue.interests == expected.interests
+    assert catalogue.category_stats == expected.category_stats
+    assert catalogue.keyword_ids == expected.keyword_ids
+    assert catalogue.source == expected.source
+
+
+def marker_catalogue(source):
+    #Заведомо другой каталог: видно, взят ли он из снимка
+    landmarks = {"Маркер": {'coordinates': (56.0, 44.0), 'category': 'Музей', 'rating': 4.0, 'visit_time': 1.0,
+                            'description': '', 'features': [], 'original_description': ''}}
+    return Catalogue.from_landmarks(landmarks, source)
+
+
+def test_round_trip_equals_xlsx_parse(parsed, tmp_path):
+    path = str(tmp_path / "catalogue.snapshot")
+    write_snapshot(parsed, path)
+    assert_same(read_snapshot(path), parsed)
+    assert [p.name for p in tmp_path.iterdir()] == ["catalogue.snapshot"]
+
+
+def test_load_writes_then_reads_snapshot(parsed, excel, tmp_path, monkeypatch):
+    snapshot = str(tmp_path / "catalogue.snapshot")
+    first = load_catalogue(excel, snapshot)
+    assert first.landmarks == parsed.landmarks
+    assert os.path.exists(snapshot)
+    monkeypatch.setattr(Parser, "load_landmarks_from_excel", staticmethod(lambda path: pytest.fail("разбор xlsx")))
+    assert_same(load_catalogue(excel, snapshot), first)
+
+
+def test_changed_mtime_same_content_keeps_snapshot(excel, tmp_path, no_parse):
+    snapshot = str(tmp_path / "catalogue.snapshot")
+    source = source_fingerprint(excel)
+    write_snapshot(marker_catalogue(dict(source, mtime_ns=source["mtime_ns"] - 10 ** 9)), snapshot)
+    # mtime другой, но sha1 совпадает - снимок годен
+    assert list(load_catalogue(excel, snapshot).landmarks) == ["Маркер"]
+
+
+def test_changed_content_rebuilds_snapshot(parsed, excel, tmp_path):
+    snapshot = str(tmp_path / "catalogue.snapshot")
+    source = source_fingerprint(excel)
+    write_snapshot(marker_catalogue(dict(source, mtime_ns=0, sha1="0" * 40)), snapshot)
+    catalogue = load_catalogue(excel, snapshot)
+    assert catalogue.landmarks == parsed.landmarks
+    assert read_snapshot(snapshot).source == source
+
+    # Другой размер - пересборка без сверки sha1
+    write_snapshot(marker_catalogue(dict(source, size=source["size"] + 1)), snapshot)
+    assert load_catalogue(excel, snapshot).landmarks == parsed.landmarks
+
+
+@pytest.mark.parametrize("damage", ["garbage", "truncated", "trailing", "version"])
+def test_corrupt_snapshot_falls_back_to_xlsx(parsed, excel, tmp_path, damage):
+    snapshot = str(tmp_path / "catalogue.snapshot")
+    write_snapshot(Catalogue.from_landmarks(parsed.landmarks, source_fingerprint(excel)), snapshot)
+    with open(snapshot, "rb") as f:
+        data = f.read()
+    if damage == "garbage":
+        data = b"not a snapshot"
+    elif damage == "truncated":
+        data = data[:len(data) - 100]
+    elif damage == "trailing":
+        data += b"\0"
+    else:
+        data = catalogue_snapshot.MAGIC + b"\xff\xff" + data[len(catalogue_snapshot.MAGIC) + 2:]
+    with open(snapshot, "wb") as f:
+        f.write(data)
+
+    with pytest.raises(ValueError):
+        read_snapshot(snapshot)
+    catalogue = load_catalogue(excel, snapshot)
+    assert catalogue.landmarks == parsed.landmarks
+    # Поврежденный снимок заменен новым
+    assert read_snapshot(snapshot).landmarks == parsed.landmarks
+
+
+def test_snapshot_without_xlsx(parsed, tmp_path, no_parse):
+    snapshot = str(tmp_path / "catalogue.snapshot")
+    write_snapshot(parsed, snapshot)
+    assert load_catalogue(str(tmp_path / "missing.xlsx"), snapshot).landmarks == parsed.landmarks
@@ -0,0 +1,139 @@
+import asyncio
+import os
+import shutil
+import sys
+import types
+from concurrent.futures import Future
+import pytest
+from app_container import AppContainer
+from catalogue_snapshot import Catalogue
+from catalogue_watcher import CatalogueWatcher
+
+EXCEL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cultural_objects_mnn.xlsx")
+START = (56.3269, 44.0059)
+INTEREST = "🌟 Любые достопримечательности"
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Пустой config.py; таблица, снимок и матрицы расстояний - во временном каталоге
+    monkeypatch.setitem(sys.modules, "config", types.ModuleType("config"))
+    monkeypatch.chdir(tmp_path)
+    excel = str(tmp_path / "catalogue.xlsx")
+    shutil.copy(EXCEL_PATH, excel)
+    app = AppContainer({'CATALOGUE_PATH': excel, 'CATALOGUE_SNAPSHOT_PATH': str(tmp_path / "catalogue.snapshot"),
+                        'ROUTING_WORKERS': 0})
+    app.route_optimizer
+    return app
+
+
+def touch(app):
+    #Таблица "изменилась": другой mtime
+    path = app.setting('CATALOGUE_PATH')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def smaller_catalogue(app, count=20):
+    landmarks = dict(list(app.landmarks.items())[:count])
+    return Catalogue.from_landmarks(landmarks)
+
+
+def test_reload_waits_for_two_unchanged_checks(app, monkeypatch):
+    new_catalogue = smaller_catalogue(app)
+    monkeypatch.setattr(app, "load_catalogue", lambda: new_catalogue)
+    watcher = CatalogueWatcher(app)
+    old_catalogue = app.catalogue
+
+    async def scenario():
+        assert not await watcher.check()
+        touch(app)
+        # Первая проверка только запоминает новый размер/mtime: файл может еще дописываться
+        assert not await watcher.check()
+        touch(app)
+        assert not await watcher.check()
+        assert app.catalogue is old_catalogue
+        assert await watcher.check()
+        assert not await watcher.check()
+
+    asyncio.run(scenario())
+    assert app.catalogue is new_catalogue
+    assert list(app.route_optimizer.landmarks) == list(new_catalogue.landmarks)
+    assert app.catalogue_version == 2
+    assert watcher.get_stats()["reloads"] == 1
+
+
+def test_failed_reload_keeps_old_catalogue(app, monkeypatch):
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise ValueError("битая таблица")
+
+    monkeypatch.setattr(app, "load_catalogue", broken)
+    watcher = CatalogueWatcher(app)
+    old_catalogue, old_optimizer = app.catalogue, app.route_optimizer
+
+    async def scenario():
+        touch(app)
+        assert not await watcher.check()
+        assert not await watcher.check()
+        # Та же версия таблицы повторно не разбирается - ждем следующего изменения
+        assert not await watcher.check()
+
+    asyncio.run(scenario())
+    assert calls == [1]
+    assert app.catalogue is old_catalogue and app.route_optimizer is old_optimizer
+    assert app.catalogue_version == 1
+    assert watcher.get_stats()["errors"] == 1
+
+
+class BlockedPool:
+    #Пул маршрутов, чьи задания завершает сам тест
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def test_in_flight_request_keeps_its_catalogue(app, monkeypatch):
+    new_catalogue = smaller_catalogue(app)
+    monkeypatch.setattr(app, "load_catalogue", lambda: new_catalogue)
+    watcher = CatalogueWatcher(app)
+    pool = app.routing._pool = BlockedPool()
+
+    async def request():
+        # Как generate_and_send_route: каталог и оптимизатор берутся один раз в начале запроса
+        landmarks, route_optimizer = app.landmarks, app.route_optimizer
+        planned = await app.routing.plan_route(route_optimizer, INTEREST, START, "2 часа", 5)
+        return landmarks, route_optimizer, planned
+
+    async def scenario():
+        task = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        assert len(pool.futures) == 1
+        touch(app)
+        await watcher.check()
+        assert await watcher.check()
+        # Пул уже на новом каталоге: в ответе есть места, которых нет в каталоге запроса
+        old_names = [name for name in task_landmarks if name not in new_catalogue.landmarks][:3]
+        pool.futures[0].set_result((old_names + ["Новое место"], old_names[:2] + ["Новое место"], []))
+        return await task
+
+    task_landmarks = list(app.landmarks)
+    old_catalogue, old_optimizer = app.catalogue, app.route_optimizer
+    landmarks, route_optimizer, (candidates, route) = asyncio.run(scenario())
+
+    assert landmarks is old_catalogue.landmarks and route_optimizer is old_optimizer
+    assert len(route_optimizer.landmarks) == len(task_landmarks)
+    assert "Новое место" not in candidates and "Новое место" not in route
+    assert len(route) == 2 and set(route) <= set(old_catalogue.landmarks)
+    # Новые запросы идут уже по новому каталогу
+    assert app.landmarks is new_catalogue.landmarks
+    assert app.route_optimizer is not old_optimizer
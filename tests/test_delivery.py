@@ -0,0 +1,108 @@
+import asyncio
+from aiogram.exceptions import TelegramBadRequest
+from delivery import (TELEGRAM_TEXT_LIMIT, StreamedText, edit_progressively, merge_cards, send_streamed_cards,
+                      telegram_length)
+
+
+class FakeSent:
+    #Отправленное сообщение: хранит все правки
+    def __init__(self, chat, text, kwargs):
+        self.chat = chat
+        self.history = [(text, kwargs)]
+
+    @property
+    def text(self):
+        return self.history[-1][0]
+
+    @property
+    def buttons(self):
+        markup = self.history[-1][1].get("reply_markup")
+        return [button.text for row in markup.inline_keyboard for button in row] if markup else []
+
+    async def edit_text(self, text, **kwargs):
+        self.chat.check(text, kwargs)
+        self.history.append((text, kwargs))
+
+
+class FakeMessage:
+    #Входящее сообщение: answer() отправляет новое; текст с bad_markdown и parse_mode Telegram отклоняет
+    def __init__(self, bad_markdown: str = None):
+        self.bad_markdown = bad_markdown
+        self.sent = []
+        self.rejected = []
+
+    def check(self, text, kwargs):
+        assert telegram_length(text) <= TELEGRAM_TEXT_LIMIT
+        if self.bad_markdown and self.bad_markdown in text and kwargs.get("parse_mode"):
+            self.rejected.append(text)
+            raise TelegramBadRequest(None, "Bad Request: can't parse entities")
+
+    async def answer(self, text, **kwargs):
+        self.check(text, kwargs)
+        sent = FakeSent(self, text, kwargs)
+        self.sent.append(sent)
+        return sent
+
+
+def button(text):
+    from aiogram.types import InlineKeyboardButton
+    return [InlineKeyboardButton(text=text, callback_data=text)]
+
+
+def test_merge_cards_splits_by_utf16_length():
+    # Эмодзи - 2 единицы UTF-16: в символах карточки влезли бы вместе, в единицах Telegram - нет
+    cards = [("😀" * 1500, [button("a")]), ("😀" * 500, [button("b")]), ("😀" * 1200, [button("c")])]
+    messages = merge_cards(cards)
+    assert [telegram_length(text) for text, _ in messages] == [3000 + 1 + 1000, 2400]
+    assert [[row[0].text for row in buttons] for _, buttons in messages] == [["a", "b"], ["c"]]
+    assert sum(len(text) for text, _ in messages) < TELEGRAM_TEXT_LIMIT
+
+    # Карточка длиннее лимита укорачивается, а не теряется
+    (text, _), = merge_cards([("😀" * 3000, [])])
+    assert telegram_length(text) <= TELEGRAM_TEXT_LIMIT and text.endswith("…")
+
+
+def test_streamed_cards_move_to_new_message_with_buttons():
+    message = FakeMessage()
+
+    async def scenario():
+        first = StreamedText(text="🏛️" * 1000)
+        second = StreamedText("нет описания")
+        cards = [(lambda text: text, first, [button("первое")]),
+                 (lambda text: text, second, [button("второе")])]
+        task = asyncio.create_task(send_streamed_cards(message, cards, interval=0.01, parse_mode=None))
+        second.update("начало")
+        await asyncio.sleep(0.05)
+        # Пока карточка влезает, она дописывается в то же сообщение вместе со своими кнопками
+        assert len(message.sent) == 1
+        assert message.sent[0].buttons == ["первое", "второе"]
+        second.finish("😀" * 1100)
+        return await task
+
+    assert asyncio.run(scenario()) == 2
+    first, last = message.sent
+    assert first.text == "🏛️" * 1000 and first.buttons == ["первое"]
+    assert last.text == "😀" * 1100 and last.buttons == ["второе"]
+
+
+def test_final_edit_retried_without_markdown():
+    message = FakeMessage(bad_markdown="*незакрыт")
+    streamed = StreamedText("запасной текст")
+
+    async def scenario():
+        task = asyncio.create_task(edit_progressively(message, lambda text: f"Рекомендация: {text}", streamed,
+                                                      interval=0.01, parse_mode="Markdown"))
+        streamed.update("начало")
+        await asyncio.sleep(0.03)
+        # Незаконченная разметка в части ответа: правка пропускается, а не повторяется без разметки
+        streamed.update("начало *незакрыт")
+        await asyncio.sleep(0.03)
+        streamed.finish("начало *незакрыт конец")
+        return await task
+
+    sent = asyncio.run(scenario())
+    assert message.sent == [sent]
+    assert set(message.rejected) == {"Рекомендация: начало *незакрыт", "Рекомендация: начало *незакрыт конец"}
+    assert message.rejected[-1] == "Рекомендация: начало *незакрыт конец"
+    assert [kwargs.get("parse_mode") for _, kwargs in sent.history] == ["Markdown", None]
+    assert sent.text == "Рекомендация: начало *незакрыт конец"
@@ -0,0 +1,35 @@
+import numpy as np
+from distance_matrix import DistanceEngine, LandmarkMatrix
+from benchmarks.synthetic import generate_landmarks
+
+
+def test_matrix_is_cached_per_mode(tmp_path):
+    landmarks = generate_landmarks(30)
+    engine = DistanceEngine("haversine")
+    built = LandmarkMatrix.load_or_build(landmarks, engine, str(tmp_path))
+    loaded = LandmarkMatrix.load_or_build(landmarks, engine, str(tmp_path))
+    assert sorted(p.name for p in tmp_path.iterdir()) == [LandmarkMatrix.cache_name("haversine", built.fingerprint)]
+    np.testing.assert_array_equal(built.distances, loaded.distances)
+
+
+def test_prune_keeps_other_modes_and_unfinished_files(tmp_path):
+    landmarks = generate_landmarks(10)
+    matrix = LandmarkMatrix.load_or_build(landmarks, DistanceEngine("haversine"), str(tmp_path))
+    current = LandmarkMatrix.cache_name("haversine", matrix.fingerprint)
+    kept = [
+        current,
+        LandmarkMatrix.cache_name("geodesic", "1111111111111111"),
+        # Матрицу строит другой процесс - до os.replace файл трогать нельзя
+        LandmarkMatrix.cache_name("haversine", "2222222222222222") + ".4242.tmp.npy",
+    ]
+    stale = [
+        LandmarkMatrix.cache_name("haversine", "3333333333333333"),
+        "4444444444444444.distances.npy",
+        "4444444444444444.walk.npy",
+    ]
+    for name in kept + stale:
+        (tmp_path / name).touch(exist_ok=True)
+    assert LandmarkMatrix.prune_cache(str(tmp_path), "haversine", matrix.fingerprint) == len(stale)
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(kept)
+    # Открытая матрица продолжает работать
+    assert matrix.submatrix(list(landmarks)[:2]).shape == (2, 2)
@@ -0,0 +1,33 @@
+import asyncio
+import time
+from yandex_gpt import GPTScheduler
+
+
+def test_stream_deadline_uses_first_chunk_estimate():
+    async def scenario():
+        scheduler = GPTScheduler(requests_per_second=0)
+        # Полный ответ - 5 с, первый фрагмент потока - 0.2 с
+        scheduler.latency_estimate = 5.0
+        scheduler.first_chunk_estimate = 0.2
+        deadline = time.monotonic() + 1.0
+        assert await scheduler.acquire(deadline=deadline, stream=True)
+        scheduler.release(first_chunk=0.2)
+        assert not await scheduler.acquire(deadline=deadline)
+        assert scheduler.get_stats()["dropped"] == 1
+        await scheduler.close()
+    asyncio.run(scenario())
+
+
+def test_stream_release_keeps_full_latency_estimate():
+    async def scenario():
+        scheduler = GPTScheduler(requests_per_second=0)
+        assert await scheduler.acquire()
+        scheduler.release(2.0)
+        assert await scheduler.acquire(stream=True)
+        scheduler.release(first_chunk=0.3)
+        assert scheduler.latency_estimate == 2.0
+        assert scheduler.first_chunk_estimate == 0.3
+        # До первого потока оценка для потоков берется по обычным запросам
+        assert GPTScheduler().expected_latency(stream=True) == 0.0
+        await scheduler.close()
+    asyncio.run(scenario())
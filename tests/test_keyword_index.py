@@ -0,0 +1,54 @@
+import os
+import pytest
+from keyword_index import KeywordIndex, normalize_text
+from optimazer import RouteOptimizer, DISPLAY_TO_CATEGORY_MAPPING
+from parserxsl import Parser
+
+EXCEL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cultural_objects_mnn.xlsx")
+MAX_COUNTS = [1, 2, 3, 5, 10, 50, 1000]
+
+
+@pytest.fixture(scope="module")
+def real_landmarks():
+    return Parser.load_landmarks_from_excel(EXCEL_PATH)
+
+
+def substring_scan(landmarks, interest_display, max_landmarks, normalize=str.lower):
+    #Прежний get_landmarks_by_interest: полный проход по каталогу с поиском подстрок
+    if interest_display == "🌟 Любые достопримечательности":
+        return list(landmarks.keys())[:max_landmarks]
+    search_keywords = [normalize(keyword) for keyword in DISPLAY_TO_CATEGORY_MAPPING.get(interest_display, [])]
+    if not search_keywords:
+        return list(landmarks.keys())[:max_landmarks]
+    relevant_landmarks = []
+    for name, data in landmarks.items():
+        texts = [normalize(data['category']), normalize(data.get('description', ''))]
+        texts += [normalize(feature) for feature in data.get('features', [])]
+        if any(keyword in text for keyword in search_keywords for text in texts):
+            relevant_landmarks.append(name)
+    if len(relevant_landmarks) < 2:
+        additional = [lm for lm in landmarks if lm not in relevant_landmarks]
+        relevant_landmarks.extend(additional[:max_landmarks - len(relevant_landmarks)])
+    return relevant_landmarks[:max_landmarks]
+
+
+@pytest.mark.parametrize("interest", list(DISPLAY_TO_CATEGORY_MAPPING))
+def test_index_matches_substring_scan(real_landmarks, interest):
+    optimizer = RouteOptimizer(real_landmarks, matrix_cache_dir=None)
+    for max_landmarks in MAX_COUNTS:
+        expected = substring_scan(real_landmarks, interest, max_landmarks)
+        assert optimizer.get_landmarks_by_interest(interest, max_landmarks) == expected, max_landmarks
+        # Индекс сравнивает тексты с заменой ё -> е; на этом каталоге результат не меняется
+        assert expected == substring_scan(real_landmarks, interest, max_landmarks, normalize_text)
+
+
+def test_yo_is_folded_to_ye():
+    landmarks = {
+        "Ёлочный базар": {'category': 'Ярмарка', 'description': 'Продают ёлки', 'features': []},
+        "Сквер": {'category': 'Парк', 'description': 'Зелёные елки', 'features': ['Тихий отдых']},
+        "Музей": {'category': 'Музей', 'description': '', 'features': []},
+    }
+    index = KeywordIndex(landmarks, {"ёлки": ["ёлк"], "елки": ["елк"]})
+    assert index.landmarks_for_interest("ёлки") == ["Ёлочный базар", "Сквер"]
+    assert index.landmarks_for_interest("елки") == ["Ёлочный базар", "Сквер"]
+    assert index.match_all(["зеленые", "елки"]) == {1}
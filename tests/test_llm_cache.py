@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from llm_cache import LLMCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), max_memory_items=2)
+    yield cache
+    cache.close()
+
+
+def test_ttl_expiry(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("llm_cache.time.time", lambda: now[0])
+    cache.set("a", "текст", ttl=10)
+    cache.flush()
+    assert cache.get("a") == "текст"
+    now[0] += 11
+    # Просрочено и в памяти, и на диске: запись удаляется из обоих уровней
+    assert cache.get("a") is None
+    cache.flush()
+    assert cache.get("a") is None
+    assert cache.get_stats()["expired"] == 2
+
+
+def test_lru_eviction_keeps_recently_used(cache):
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    stats = cache.get_stats()
+    assert stats["memory_items"] == 2 and stats["evictions"] == 1
+    # "b" вытеснен из памяти, но остался в SQLite
+    cache.flush()
+    assert cache.get("b") == "2"
+    assert cache.get_stats()["disk_hits"] == 1
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = LLMCache(path)
+    first.set("key", "ответ", namespace="route")
+    first.close()
+    second = LLMCache(path)
+    try:
+        assert second.get_stats()["disk_items"] == 1
+        assert asyncio.run(second.aget("key")) == "ответ"
+        assert asyncio.run(second.aget("missing")) is None
+        stats = second.get_stats()
+        assert stats["disk_hits"] == 1 and stats["misses"] == 1
+    finally:
+        second.close()
+
+
+def test_disk_trim_drops_oldest(tmp_path, monkeypatch):
+    monkeypatch.setattr(LLMCache, "TRIM_EVERY", 1)
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), max_memory_items=1, max_disk_items=3)
+    try:
+        for i in range(5):
+            cache.set(f"k{i}", str(i))
+            cache.flush()
+        assert cache.get_stats()["disk_items"] == 3
+        assert cache.get("k0") is None and cache.get("k1") is None
+        assert cache.get("k2") == "2"
+    finally:
+        cache.close()
+
+
+def test_invalidate_waits_for_commit(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = LLMCache(path)
+    try:
+        for i in range(50):
+            cache.set(f"route{i}", "маршрут", namespace="route")
+        cache.set("geo", "56.3,44.0", namespace="geocode")
+        # Без flush: сброс встает в очередь после записей и возвращается только после их commit
+        assert asyncio.run(cache.ainvalidate("route")) == 50
+        assert cache.get("route0") is None
+        assert cache.get("geo") == "56.3,44.0"
+        # Другое соединение тоже уже не видит удаленные записи
+        other = LLMCache(path)
+        try:
+            assert other.get("route49") is None
+            assert other.get("geo") == "56.3,44.0"
+            assert other.invalidate() == 1
+        finally:
+            other.close()
+    finally:
+        cache.close()
+
+
+def test_memory_only_cache():
+    cache = LLMCache(None)
+    cache.set("a", "1")
+    assert asyncio.run(cache.aget("a")) == "1"
+    assert cache.get("b") is None
+    assert cache.invalidate() == 1
+    cache.close()
@@ -0,0 +1,61 @@
+import asyncio
+import json
+from description_store import DescriptionStore
+from local_stubs import create_gpt_stub_app, start_stub
+from pregenerate import load_checkpoint, pregenerate
+from yandex_gpt import GPTScheduler, YandexGPT
+from benchmarks.synthetic import generate_landmarks
+
+INTERESTS = ["🏛️ История", "🌳 Парки"]
+
+
+async def run_pregenerate(landmarks, tmp_path, limit=0, fail_every=0):
+    stub = create_gpt_stub_app(delay=0.0, fail_every=fail_every)
+    runner, base_url = await start_stub(stub)
+    yandex_gpt = YandexGPT("stub", "stub", landmarks,
+                           scheduler=GPTScheduler(requests_per_second=0, max_retries=0))
+    yandex_gpt.url = f"{base_url}/foundationModels/v1/completion"
+    await yandex_gpt.start()
+    try:
+        store = await pregenerate(yandex_gpt, landmarks, INTERESTS, str(tmp_path / "out.json.gz"),
+                                  str(tmp_path / "checkpoint.jsonl"), limit=limit)
+    finally:
+        await yandex_gpt.close()
+        await runner.cleanup()
+    return store, stub["state"]["requests"]
+
+
+def test_resume_skips_pairs_from_checkpoint(tmp_path):
+    landmarks = generate_landmarks(5)
+    total = len(landmarks) * len(INTERESTS)
+
+    store, requests = asyncio.run(run_pregenerate(landmarks, tmp_path, limit=4))
+    assert requests == 4
+    assert len(store) == 4
+    assert len(load_checkpoint(str(tmp_path / "checkpoint.jsonl"))) == 4
+
+    # Второй запуск запрашивает только оставшиеся пары
+    store, requests = asyncio.run(run_pregenerate(landmarks, tmp_path))
+    assert requests == total - 4
+    assert len(store) == total
+    assert len(DescriptionStore.load(str(tmp_path / "out.json.gz"))) == total
+
+
+def test_failed_pairs_are_retried_on_next_run(tmp_path):
+    landmarks = generate_landmarks(3)
+    total = len(landmarks) * len(INTERESTS)
+
+    store, requests = asyncio.run(run_pregenerate(landmarks, tmp_path, fail_every=2))
+    assert requests == total
+    assert len(store) == total - total // 2
+
+    store, requests = asyncio.run(run_pregenerate(landmarks, tmp_path))
+    assert requests == total // 2
+    assert len(store) == total
+
+
+def test_checkpoint_ignores_truncated_line(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    path.write_text(json.dumps({"key": "a", "text": "Описание"}, ensure_ascii=False) + "\n" + '{"key": "b", "te',
+                    encoding="utf-8")
+    assert load_checkpoint(str(path)) == {"a": "Описание"}
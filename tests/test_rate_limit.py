@@ -0,0 +1,19 @@
+import asyncio
+from rate_limit import TokenBucket
+
+
+def test_zero_rate_is_unlimited():
+    async def scenario():
+        bucket = TokenBucket(0, 1)
+        waits = [await bucket.acquire() for _ in range(100)]
+        assert max(waits) < 0.05
+    asyncio.run(scenario())
+
+
+def test_bucket_allows_burst_then_waits():
+    async def scenario():
+        bucket = TokenBucket(50, 3)
+        burst = [await bucket.acquire() for _ in range(3)]
+        assert max(burst) < 0.01
+        assert await bucket.acquire() > 0.01
+    asyncio.run(scenario())
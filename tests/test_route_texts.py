@@ -0,0 +1,45 @@
+import json
+from yandex_gpt import YandexGPT
+
+RESPONSE = json.dumps({
+    "recommendation": "Начните прогулку с Кремля, пока мало туристов.",
+    "1": "Дмитриевская башня — главный въезд в Кремль.\nВнутри музей.",
+    "2": "Чкаловская лестница: \"восьмерка\" из 560 ступеней.",
+}, ensure_ascii=False)
+
+
+def test_complete_response():
+    values = YandexGPT.parse_route_texts(RESPONSE)
+    assert values == {key: (text, True) for key, text in json.loads(RESPONSE).items()}
+
+
+def test_every_prefix_parses_without_errors():
+    final = json.loads(RESPONSE)
+    for length in range(len(RESPONSE) + 1):
+        values = YandexGPT.parse_route_texts(RESPONSE[:length])
+        for key, (text, complete) in values.items():
+            # Недописанный текст - начало итогового, дописанный - совпадает с ним
+            assert final[key].startswith(text) if not complete else text == final[key]
+
+
+def test_partial_value_is_marked_incomplete():
+    values = YandexGPT.parse_route_texts('{"recommendation": "Готово", "1": "Дмитриевская ба')
+    assert values == {"recommendation": ("Готово", True), "1": ("Дмитриевская ба", False)}
+
+
+def test_cut_escape_sequences_are_dropped():
+    assert YandexGPT.parse_route_texts('{"1": "Кремль\\')["1"] == ("Кремль", False)
+    assert YandexGPT.parse_route_texts('{"1": "Кремль \\u04')["1"] == ("Кремль ", False)
+
+
+def test_text_around_json_and_unknown_keys_are_ignored():
+    values = YandexGPT.parse_route_texts('Вот ответ:\n```json\n{"title": "x", "3": "Парк"}\n```')
+    assert values == {"3": ("Парк", True)}
+
+
+def test_valid_route_text_bounds():
+    assert not YandexGPT.valid_route_text("")
+    assert not YandexGPT.valid_route_text(None)
+    assert not YandexGPT.valid_route_text("коротко")
+    assert YandexGPT.valid_route_text("Достаточно длинное описание места.")
+    assert not YandexGPT.valid_route_text("х" * 5000)
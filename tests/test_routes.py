@@ -0,0 +1,79 @@
+import os
+import random
+import sys
+import pytest
+from optimazer import RouteOptimizer, DISPLAY_TO_CATEGORY_MAPPING
+from parserxsl import Parser
+from benchmarks.synthetic import generate_landmarks, random_point
+
+EXCEL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cultural_objects_mnn.xlsx")
+START = (56.3269, 44.0059)
+TIME_BUTTONS = ["1 час", "2 часа", "3 часа", "4 часа"]
+
+
+@pytest.fixture(scope="module")
+def real_landmarks():
+    return Parser.load_landmarks_from_excel(EXCEL_PATH)
+
+
+def total_rating(optimizer, route):
+    return sum(optimizer.landmarks[landmark]['rating'] for landmark in route)
+
+
+def rating_within_budget(optimizer, route, start, budget):
+    #Маршрут "rating", обрезанный до части, которая укладывается в бюджет
+    for size in range(len(route), 0, -1):
+        if optimizer.route_duration_minutes(route[:size], start) <= budget:
+            return route[:size]
+    return []
+
+
+@pytest.mark.parametrize("available_time", TIME_BUTTONS)
+def test_rating_route_matches_promised_places(real_landmarks, available_time):
+    optimizer = RouteOptimizer(real_landmarks, matrix_cache_dir=None, solver="rating")
+    promised = optimizer.calculate_places_by_time(available_time)
+    for interest in DISPLAY_TO_CATEGORY_MAPPING:
+        landmarks, route = optimizer.plan_route(interest, START, available_time, max_places=8)
+        assert len(route) == min(promised, len(landmarks)), interest
+        assert len(set(route)) == len(route)
+        assert set(route) <= set(landmarks)
+
+
+@pytest.mark.parametrize("catalogue", ["real", "synthetic"])
+def test_orienteering_fits_budget_and_beats_rating(real_landmarks, catalogue):
+    landmarks = real_landmarks if catalogue == "real" else generate_landmarks(300)
+    optimizer = RouteOptimizer(landmarks, matrix_cache_dir=None, solver="orienteering")
+    rnd = random.Random(3)
+    starts = [START] if catalogue == "real" else [random_point(rnd) for _ in range(5)]
+    for start in starts:
+        for available_time in TIME_BUTTONS:
+            budget = optimizer.time_budget_minutes(available_time)
+            for interest in DISPLAY_TO_CATEGORY_MAPPING:
+                _, route = optimizer.plan_route(interest, start, available_time, max_places=8)
+                _, rating_route = optimizer.plan_route(interest, start, available_time, max_places=8, solver="rating")
+                assert route, interest
+                assert len(set(route)) == len(route)
+                feasible = rating_within_budget(optimizer, rating_route, start, budget)
+                if len(route) > 1 or feasible:
+                    assert optimizer.route_duration_minutes(route, start) <= budget + 1e-6, interest
+                assert total_rating(optimizer, route) >= total_rating(optimizer, feasible) - 1e-9, interest
+
+
+def test_orienteering_falls_back_to_nearest_when_nothing_fits(real_landmarks):
+    # В каталоге осмотр каждого места - час: за час с дорогой не успеть ни одно
+    optimizer = RouteOptimizer(real_landmarks, matrix_cache_dir=None, solver="orienteering")
+    landmarks, route = optimizer.plan_route("🌟 Любые достопримечательности", START, "1 час")
+    assert route == [optimizer.nearest_landmarks(START, 1, landmarks)[0][0]]
+
+
+def test_solver_setting_reaches_optimizer(tmp_path, monkeypatch):
+    import types
+    from app_container import AppContainer
+    # Пустой config.py: все остальные настройки - по умолчанию; матрица расстояний - во временном каталоге
+    monkeypatch.setitem(sys.modules, "config", types.ModuleType("config"))
+    monkeypatch.chdir(tmp_path)
+    app = AppContainer({'ROUTE_SOLVER': 'orienteering', 'ROUTE_SOLVER_DEADLINE_MS': 20.0,
+                        'CATALOGUE_PATH': EXCEL_PATH, 'CATALOGUE_SNAPSHOT_PATH': str(tmp_path / "catalogue.snapshot")})
+    assert app.route_optimizer.solver == "orienteering"
+    assert app.route_optimizer.solver_deadline_ms == 20.0
+    assert app.routing.optimizer_options == {'solver': 'orienteering', 'solver_deadline_ms': 20.0}
@@ -0,0 +1,157 @@
+import asyncio
+import pytest
+import session_store
+from session_store import MemorySessionStore, RedisSessionStore, Session, SessionStore, create_session_store
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeRedis:
+    #Минимальный асинхронный клиент: только команды, которые использует RedisSessionStore
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.closed = False
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value.encode("utf-8")
+        self.expires[key] = ex
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def scan_iter(self, match=None, count=None):
+        prefix = match.rstrip("*")
+        for key in list(self.data):
+            if key.startswith(prefix):
+                yield key
+
+    async def info(self, section):
+        if section == "memory":
+            return {"used_memory": 2048, "maxmemory": 0, "maxmemory_policy": "allkeys-lru"}
+        return {"evicted_keys": 3}
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(session_store.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_memory_ttl(clock):
+    async def scenario():
+        store = MemorySessionStore(ttl=60)
+        await store.save(1, Session(interest="🌳 Парки"))
+        clock.now += 59
+        assert (await store.get(1)).interest == "🌳 Парки"
+        clock.now += 61
+        assert await store.get(1) is None
+        assert store.stats["expired"] == 1
+    asyncio.run(scenario())
+
+
+def test_memory_lru_eviction(clock):
+    async def scenario():
+        store = MemorySessionStore(max_sessions=2, ttl=None)
+        await store.save(1, Session())
+        await store.save(2, Session())
+        # Чтение делает сессию 1 самой свежей - вытесняется 2
+        await store.get(1)
+        await store.save(3, Session())
+        assert await store.get(2) is None
+        assert await store.get(1) is not None and await store.get(3) is not None
+        assert len(store) == 2
+        assert store.get_stats()["evicted"] == 1
+    asyncio.run(scenario())
+
+
+def test_memory_expiry_after_read(clock):
+    async def scenario():
+        store = MemorySessionStore(ttl=60)
+        await store.save(1, Session())
+        clock.now += 30
+        await store.save(2, Session())
+        clock.now += 20
+        # Прочитанная сессия уходит в конец очереди вместе со свежим updated_at
+        await store.get(1)
+        clock.now += 45
+        await store.save(3, Session())
+        # Просрочена только сессия 2 (65 с без обращений) - она снимается с начала очереди
+        assert list(store._sessions) == [1, 3]
+        assert store.stats["expired"] == 1
+        times = [session.updated_at for session in store._sessions.values()]
+        assert times == sorted(times)
+    asyncio.run(scenario())
+
+
+def test_redis_roundtrip_and_ttl():
+    async def scenario():
+        client = FakeRedis()
+        store = RedisSessionStore(ttl=3600, client=client)
+        session = Session("waiting_location", "🏛️ История", "2 часа", (56.32, 44.0), ["Кремль"])
+        await store.save(7, session)
+        assert client.expires["tourbot:session:7"] == 3600
+        loaded = await store.get(7)
+        assert loaded.to_dict() == session.to_dict()
+        await store.delete(7)
+        assert await store.get(7) is None
+        assert store.get_stats()["hits"] == 1 and store.get_stats()["misses"] == 1
+        await store.close()
+        assert client.closed
+    asyncio.run(scenario())
+
+
+def test_redis_corrupted_session_is_a_miss():
+    async def scenario():
+        client = FakeRedis()
+        client.data["tourbot:session:1"] = b"{not json"
+        store = RedisSessionStore(client=client)
+        assert await store.get(1) is None
+        assert store.stats["errors"] == 1
+    asyncio.run(scenario())
+
+
+def test_redis_memory_stats_in_get_stats(clock):
+    async def scenario():
+        client = FakeRedis()
+        store = RedisSessionStore(client=client, memory_stats_interval=30)
+        await store.save(1, Session())
+        await store.save(2, Session())
+        await store.refresh_stats()
+        stats = store.get_stats()
+        assert stats["sessions"] == 2
+        assert stats["used_memory"] == 2048
+        assert stats["maxmemory_policy"] == "allkeys-lru"
+        assert stats["evicted_keys"] == 3
+        # Повторный SCAN - не раньше интервала
+        await store.save(3, Session())
+        await store.refresh_stats()
+        assert store.get_stats()["sessions"] == 2
+        clock.now += 30
+        await store.refresh_stats()
+        assert store.get_stats()["sessions"] == 3
+    asyncio.run(scenario())
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_session_store("memcached")
@@ -0,0 +1,57 @@
+import math
+import random
+import pytest
+from spatial_index import SpatialIndex, haversine_km
+from benchmarks.synthetic import generate_landmarks, random_point
+
+
+def linear_within(landmarks, point, radius_km, category=None, names=None):
+    result = []
+    for name, data in landmarks.items():
+        if names is not None and name not in names:
+            continue
+        if category and category not in data['category']:
+            continue
+        distance = haversine_km(point, data['coordinates'])
+        if distance <= radius_km:
+            result.append((name, distance))
+    return sorted(result, key=lambda item: item[1])
+
+
+def points(count):
+    rnd = random.Random(1)
+    # Точки и внутри города, и далеко за пределами каталога
+    return [random_point(rnd) for _ in range(count)] + [(55.75, 37.62), (56.30, 45.50)]
+
+
+@pytest.mark.parametrize("size", [1, 8, 500, 3000])
+def test_nearest_matches_linear_scan(size):
+    landmarks = generate_landmarks(size)
+    index = SpatialIndex(landmarks)
+    subset = set(list(landmarks)[::3])
+    for point in points(20):
+        for k in (1, 5, 40):
+            assert index.nearest(point, k) == linear_within(landmarks, point, math.inf)[:k]
+            assert index.nearest(point, k, names=subset) == linear_within(landmarks, point, math.inf, names=subset)[:k]
+        assert index.nearest(point, 5, category="парк") == linear_within(landmarks, point, math.inf, "парк")[:5]
+
+
+@pytest.mark.parametrize("size", [8, 500, 3000])
+def test_within_matches_linear_scan(size):
+    landmarks = generate_landmarks(size)
+    index = SpatialIndex(landmarks)
+    for point in points(20):
+        for radius_km in (0.2, 1.0, 5.0, 50.0):
+            assert index.within(point, radius_km) == linear_within(landmarks, point, radius_km)
+            assert index.within(point, radius_km, "музей") == linear_within(landmarks, point, radius_km, "музей")
+
+
+def test_route_candidates_are_nearest_to_start():
+    from optimazer import RouteOptimizer
+    landmarks = generate_landmarks(500)
+    optimizer = RouteOptimizer(landmarks, matrix_cache_dir=None)
+    start = (56.30, 43.95)
+    matching = set(optimizer.get_landmarks_by_interest("🌳 Парки", max_landmarks=len(landmarks)))
+    candidates, route = optimizer.plan_route("🌳 Парки", start, "2 часа", max_landmarks=10)
+    assert candidates == [name for name, _ in linear_within(landmarks, start, math.inf, names=matching)[:10]]
+    assert set(route) <= set(candidates)
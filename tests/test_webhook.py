@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from webhook import ChatSerializer, update_chat_id
+
+
+@pytest.mark.parametrize("update, chat_id", [
+    ({"update_id": 1, "message": {"chat": {"id": 10}}}, 10),
+    ({"update_id": 1, "edited_message": {"chat": {"id": 11}}}, 11),
+    ({"update_id": 1, "callback_query": {"from": {"id": 5}, "message": {"chat": {"id": 12}}}}, 12),
+    ({"update_id": 1, "callback_query": {"from": {"id": 5}}}, 5),
+    ({"update_id": 1, "inline_query": {"from": {"id": 7}}}, 7),
+    ({"update_id": 1, "my_chat_member": {"chat": {"id": -100}}}, -100),
+    ({"update_id": 1}, None),
+])
+def test_update_chat_id(update, chat_id):
+    assert update_chat_id(update) == chat_id
+
+
+def test_same_chat_runs_in_order_other_chats_in_parallel():
+    async def scenario():
+        serializer = ChatSerializer()
+        events = []
+
+        def call(chat_id, index, delay):
+            async def make_call():
+                events.append(("start", chat_id, index))
+                await asyncio.sleep(delay)
+                events.append(("end", chat_id, index))
+            return make_call
+
+        # Первое обновление чата 1 - самое долгое: второе и третье все равно ждут его
+        tasks = [serializer.submit(1, call(1, 0, 0.05)), serializer.submit(1, call(1, 1, 0.0)),
+                 serializer.submit(2, call(2, 0, 0.01)), serializer.submit(1, call(1, 2, 0.0))]
+        await asyncio.gather(*tasks)
+        return serializer, events
+
+    serializer, events = asyncio.run(scenario())
+    chat_1 = [event for event in events if event[1] == 1]
+    assert chat_1 == [("start", 1, 0), ("end", 1, 0), ("start", 1, 1), ("end", 1, 1), ("start", 1, 2), ("end", 1, 2)]
+    # Чат 2 не ждал долгого обновления чата 1
+    assert events.index(("end", 2, 0)) < events.index(("end", 1, 0))
+    assert serializer.get_stats()["completed"] == 4
+    assert serializer.get_stats()["chats"] == 0
+
+
+def test_failed_update_does_not_block_the_chat():
+    async def scenario():
+        serializer = ChatSerializer()
+        done = []
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        async def ok():
+            done.append(True)
+
+        await asyncio.gather(serializer.submit(1, fail), serializer.submit(1, ok))
+        return serializer, done
+
+    serializer, done = asyncio.run(scenario())
+    assert done == [True]
+    assert serializer.get_stats()["errors"] == 1
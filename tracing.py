@@ -0,0 +1,286 @@
+import bisect
+import contextlib
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Легкая трассировка конвейера маршрута: спаны этапов (контекст передается через contextvars в корутины
+# и задачи asyncio), гистограммы длительностей по этапам для /metrics в формате Prometheus и выборочный
+# JSON-дамп трасс (одна трасса - строка) для разбора офлайн.
+
+# Границы корзин гистограмм, с
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+_captured: contextvars.ContextVar = contextvars.ContextVar("captured_spans", default=None)
+_span_ids = itertools.count(1)
+
+
+class Histogram:
+    #Корзины для Prometheus и последние значения для точных p50/p95/p99
+
+    def __init__(self, buckets=BUCKETS, reservoir: int = 2048):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._recent = deque(maxlen=reservoir)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+        self._recent.append(value)
+
+    def quantiles(self, quantiles=QUANTILES) -> Dict[float, float]:
+        values = sorted(self._recent)
+        if not values:
+            return {q: 0.0 for q in quantiles}
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in quantiles}
+
+
+class Span:
+    #Этап трассы; длительность попадает в гистограмму этапа при finish()
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end", "attrs", "tracer", "_wall_start")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else tracer.new_trace()
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self._wall_start = time.time()
+        self.end: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def finish(self, **attrs):
+        if self.end is not None:
+            return
+        self.attrs.update(attrs)
+        self.end = time.perf_counter()
+        self.tracer.record(self)
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "span_id": self.span_id, "parent_id": self.parent_id,
+                "start": round(self._wall_start, 6), "duration_ms": round(self.duration * 1000, 3), **self.attrs}
+
+
+class Tracer:
+    #Гистограммы по этапам, выборка трасс в JSON и дополнительные метрики от collectors
+
+    def __init__(self, sample_rate: float = 0.0, trace_path: Optional[str] = None, namespace: str = "tourbot"):
+        self.sample_rate = sample_rate
+        self.trace_path = trace_path
+        self.namespace = namespace
+        self.histograms: Dict[str, Histogram] = {}
+        self.collectors: List[Callable[[], Dict[str, float]]] = []
+        # Корутины, обновляющие данные collectors перед выдачей /metrics (например, статистика Redis)
+        self.refreshers: List[Callable[[], Awaitable]] = []
+        # Спаны выбранных для дампа трасс до завершения корневого спана
+        self._sampled: Dict[int, List[Span]] = {}
+        self._trace_ids = itertools.count(1)
+        self.stats = {"spans": 0, "traces_sampled": 0, "traces_written": 0}
+
+    def configure(self, sample_rate: float = 0.0, trace_path: Optional[str] = None):
+        self.sample_rate = sample_rate
+        self.trace_path = trace_path
+
+    def new_trace(self) -> int:
+        trace_id = (os.getpid() << 32) + next(self._trace_ids)
+        if (self.trace_path and self.sample_rate > 0 and _captured.get() is None
+                and random.random() < self.sample_rate):
+            self._sampled[trace_id] = []
+            self.stats["traces_sampled"] += 1
+        return trace_id
+
+    def start_span(self, name: str, **attrs) -> Span:
+        #Спан без переключения текущего контекста (для асинхронных генераторов и колбэков)
+        return Span(self, name, _current_span.get(), attrs)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attrs):
+        #Спан этапа; вложенные спаны и созданные внутри задачи asyncio становятся его потомками
+        current = self.start_span(name, **attrs)
+        token = _current_span.set(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.set(error=type(e).__name__)
+            raise
+        finally:
+            _current_span.reset(token)
+            current.finish()
+
+    def record(self, span: Span):
+        captured = _captured.get()
+        if captured is not None:
+            captured.append({"name": span.name, "duration": span.duration, "attrs": span.attrs})
+            return
+        self.stats["spans"] += 1
+        histogram = self.histograms.get(span.name)
+        if histogram is None:
+            histogram = self.histograms[span.name] = Histogram()
+        histogram.observe(span.duration)
+        spans = self._sampled.get(span.trace_id)
+        if spans is not None:
+            spans.append(span)
+            if span.parent_id is None:
+                self._dump(self._sampled.pop(span.trace_id))
+
+    def _dump(self, spans: List[Span]):
+        root = spans[-1]
+        line = json.dumps({"trace_id": f"{root.trace_id:x}", "root": root.name,
+                           "duration_ms": round(root.duration * 1000, 3),
+                           "spans": [span.to_dict() for span in spans]}, ensure_ascii=False, default=str)
+        try:
+            with open(self.trace_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.stats["traces_written"] += 1
+        except OSError as e:
+            logger.warning("⚠️ Не удалось записать трассу в %s: %s", self.trace_path, e)
+
+    def replay(self, spans: List[dict]):
+        #Спаны, измеренные в другом процессе (пул маршрутов): в гистограммы и в текущую трассу
+        parent = _current_span.get()
+        for item in spans:
+            span = Span(self, item["name"], parent, dict(item.get("attrs", {})))
+            span.start = span.start - item["duration"]
+            span.end = span.start + item["duration"]
+            self.record(span)
+
+    def add_collector(self, collector: Callable[[], Dict[str, float]]):
+        #Функция, возвращающая {имя метрики: значение} - выводится в /metrics как gauge
+        self.collectors.append(collector)
+
+    async def refresh(self):
+        for refresher in self.refreshers:
+            try:
+                await refresher()
+            except Exception as e:
+                logger.warning("⚠️ Ошибка обновления метрик: %s", e)
+
+    def get_stats(self) -> dict:
+        stages = {}
+        for name, histogram in self.histograms.items():
+            quantiles = histogram.quantiles()
+            stages[name] = {"count": histogram.count, **{f"p{int(q * 100)}_ms": round(value * 1000, 2)
+                                                         for q, value in quantiles.items()}}
+        return {**self.stats, "stages": stages}
+
+    def render_prometheus(self) -> str:
+        #Текстовый формат Prometheus: гистограммы этапов, их квантили и метрики collectors
+        metric = f"{self.namespace}_stage_duration_seconds"
+        lines = [f"# HELP {metric} Длительность этапов обработки", f"# TYPE {metric} histogram"]
+        for name, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {histogram.total:.6f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {histogram.count}')
+        quantile_metric = f"{self.namespace}_stage_duration_quantile_seconds"
+        lines.append(f"# TYPE {quantile_metric} gauge")
+        for name, histogram in sorted(self.histograms.items()):
+            for q, value in histogram.quantiles().items():
+                lines.append(f'{quantile_metric}{{stage="{name}",quantile="{q}"}} {value:.6f}')
+        for collector in self.collectors:
+            try:
+                values = collector()
+            except Exception as e:
+                logger.warning("⚠️ Ошибка сбора метрик: %s", e)
+                continue
+            for name, value in sorted(values.items()):
+                lines.append(f"# TYPE {self.namespace}_{name} gauge")
+                lines.append(f"{self.namespace}_{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+tracer = Tracer()
+span = tracer.span
+start_span = tracer.start_span
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def traced(name: str):
+    #Декоратор корутины: весь вызов - один спан (корневой, если вызван вне других спанов)
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def capture():
+    #Спаны этого контекста собираются в список (а не в гистограммы) - для передачи из процесса пула
+    spans: List[dict] = []
+    capture_token = _captured.set(spans)
+    span_token = _current_span.set(None)
+    try:
+        yield spans
+    finally:
+        _current_span.reset(span_token)
+        _captured.reset(capture_token)
+
+
+def numeric_stats(prefix: str, stats: dict) -> Dict[str, float]:
+    #Числовые поля словаря статистики (get_stats) как метрики с префиксом
+    return {f"{prefix}_{key}": value for key, value in stats.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)}
+
+
+async def metrics_handler(request):
+    #GET /metrics в формате Prometheus (подключается и к приложению рабочего процесса webhook)
+    from aiohttp import web
+    await tracer.refresh()
+    return web.Response(text=tracer.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+
+async def trace_stats_handler(request):
+    #GET /traces/stats: p50/p95/p99 этапов в JSON
+    from aiohttp import web
+    return web.json_response(tracer.get_stats())
+
+
+def create_metrics_app():
+    from aiohttp import web
+    web_app = web.Application()
+    web_app.router.add_get("/metrics", metrics_handler)
+    web_app.router.add_get("/traces/stats", trace_stats_handler)
+    # Уровни журнала на лету: GET - текущие, POST ?logger=...&level=... - смена
+    from logs import log_level_handler
+    web_app.router.add_route("*", "/log-level", log_level_handler)
+    return web_app
+
+
+async def start_metrics_server(host: str = "127.0.0.1", port: int = 9090):
+    #Локальный HTTP-сервер метрик; возвращает runner (остановка - runner.cleanup())
+    from aiohttp import web
+    runner = web.AppRunner(create_metrics_app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("📈 Метрики: http://%s:%s/metrics", host, port)
+    return runner
@@ -0,0 +1,290 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import secrets
+from typing import Awaitable, Callable, List, Optional
+import aiohttp
+from aiohttp import web
+import logs
+
+logger = logging.getLogger(__name__)
+
+# Webhook-режим: маршрутизатор принимает обновления Telegram и раскладывает их по N рабочим процессам
+# по номеру чата. Один чат всегда попадает в один процесс, а внутри процесса обновления чата
+# обрабатываются строго по очереди - порядок сообщений пользователя сохраняется.
+#   python webhook.py --workers 4 --port 8080 --url https://example.com/webhook
+# Сессии общие для процессов при SESSION_BACKEND='redis'; кэши YandexGPT и геокодера - общие SQLite-файлы.
+
+WEBHOOK_PATH = "/webhook"
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def update_chat_id(update: dict) -> Optional[int]:
+    #Чат (или пользователь) обновления по сырому JSON, без разбора в объекты aiogram
+    for kind in ("message", "edited_message", "channel_post", "edited_channel_post", "my_chat_member",
+                 "chat_member", "chat_join_request"):
+        if update.get(kind):
+            return update[kind].get("chat", {}).get("id")
+    callback = update.get("callback_query")
+    if callback:
+        return (callback.get("message") or {}).get("chat", {}).get("id") or callback.get("from", {}).get("id")
+    for kind in ("inline_query", "chosen_inline_result", "shipping_query", "pre_checkout_query"):
+        if update.get(kind):
+            return update[kind].get("from", {}).get("id")
+    return None
+
+
+class ChatSerializer:
+    #Очередь на чат: задачи одного чата выполняются по порядку поступления, разных чатов - параллельно
+
+    def __init__(self):
+        self._tails = {}
+        self._tasks = set()
+        self.pending = 0
+        self.stats = {"submitted": 0, "completed": 0, "errors": 0, "peak_pending": 0}
+
+    async def run(self, chat_id: Optional[int], make_call: Callable[[], Awaitable]):
+        if chat_id is None:
+            return await make_call()
+        previous = self._tails.get(chat_id)
+        done = asyncio.get_running_loop().create_future()
+        self._tails[chat_id] = done
+        self.pending += 1
+        self.stats["peak_pending"] = max(self.stats["peak_pending"], self.pending)
+        try:
+            if previous is not None:
+                await asyncio.shield(previous)
+            return await make_call()
+        finally:
+            self.pending -= 1
+            if previous is not None and not previous.done():
+                # Отменили до нашей очереди - следующий все равно ждет предыдущего
+                previous.add_done_callback(lambda _: done.done() or done.set_result(None))
+            else:
+                done.set_result(None)
+            if self._tails.get(chat_id) is done:
+                del self._tails[chat_id]
+
+    def submit(self, chat_id: Optional[int], make_call: Callable[[], Awaitable]) -> asyncio.Task:
+        #Фоновое выполнение с тем же порядком (ответ Telegram не ждет обработки)
+        self.stats["submitted"] += 1
+
+        async def logged():
+            try:
+                await self.run(chat_id, make_call)
+                self.stats["completed"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.exception("❌ Ошибка обработки обновления чата %s: %s", chat_id, e)
+
+        task = asyncio.create_task(logged())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "pending": self.pending, "chats": len(self._tails)}
+
+    async def drain(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def create_worker_app(secret: str = "", max_pending: int = 1000) -> web.Application:
+    #Рабочий процесс: принимает обновление, ставит его в очередь чата и сразу отвечает 200
+    import main
+    import tracing
+    from aiogram.types import Update
+
+    dp = main.create_dispatcher()
+    bot = main.app.bot
+    serializer = ChatSerializer()
+
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret and request.headers.get(SECRET_HEADER) != secret:
+            return web.Response(status=401)
+        if serializer.pending >= max_pending:
+            # Перегрузка: Telegram повторит доставку позже
+            return web.Response(status=503)
+        data = await request.json()
+        update = Update.model_validate(data, context={"bot": bot})
+        serializer.submit(update_chat_id(data), lambda: dp.feed_update(bot, update))
+        return web.Response()
+
+    async def stats(request: web.Request) -> web.Response:
+        await main.app.sessions.refresh_stats()
+        return web.json_response({
+            "updates": serializer.get_stats(),
+            "sessions": main.app.sessions.get_stats(),
+            "routing": main.app.routing.get_stats(),
+            "delivery": main.app.telegram_limits.get_stats(),
+            "gpt_scheduler": main.app.yandex_gpt.get_scheduler_stats() if main.app.is_initialized('yandex_gpt') else {},
+            "catalogue_version": main.app.catalogue_version,
+        })
+
+    async def on_startup(web_app: web.Application):
+        web_app["services"] = await main.start_services()
+
+    async def on_cleanup(web_app: web.Application):
+        await serializer.drain()
+        await main.stop_services(web_app["services"])
+        await bot.session.close()
+
+    web_app = web.Application()
+    web_app.router.add_post(WEBHOOK_PATH, handle_update)
+    web_app.router.add_get("/stats", stats)
+    # Метрики этапов этого процесса (порт рабочего процесса)
+    web_app.router.add_get("/metrics", tracing.metrics_handler)
+    web_app.router.add_route("*", "/log-level", logs.log_level_handler)
+    web_app.on_startup.append(on_startup)
+    web_app.on_cleanup.append(on_cleanup)
+    return web_app
+
+
+def run_worker(index: int, host: str, port: int, secret: str, overrides: dict, max_pending: int):
+    #Точка входа рабочего процесса
+    import main
+    main.app.overrides.update(overrides)
+    logs.setup_from_settings(main.app)
+    logger.info("👷 Рабочий процесс %d: http://%s:%s%s", index, host, port, WEBHOOK_PATH)
+    # shutdown_timeout: aiohttp ждет все задачи loop (включая фоновые циклы бота) до on_cleanup - не дольше 5 с
+    web.run_app(create_worker_app(secret, max_pending), host=host, port=port, print=None, shutdown_timeout=5.0)
+
+
+def create_router_app(worker_urls: List[str], secret: str = "", worker_secret: str = "") -> web.Application:
+    #Маршрутизатор: чат -> рабочий процесс (chat_id % N); пересылка одного чата тоже по очереди
+    serializer = ChatSerializer()
+    stats = {"forwarded": 0, "rejected": 0, "worker_errors": 0, "per_worker": [0] * len(worker_urls)}
+
+    async def forward(index: int, body: bytes) -> int:
+        async with router["session"].post(worker_urls[index], data=body, headers={
+            SECRET_HEADER: worker_secret, "Content-Type": "application/json"
+        }) as response:
+            return response.status
+
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret and request.headers.get(SECRET_HEADER) != secret:
+            stats["rejected"] += 1
+            return web.Response(status=401)
+        body = await request.read()
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return web.Response(status=400)
+        chat_id = update_chat_id(data)
+        index = (chat_id if chat_id is not None else data.get("update_id", 0)) % len(worker_urls)
+        try:
+            status = await serializer.run(chat_id, lambda: forward(index, body))
+        except aiohttp.ClientError as e:
+            # Рабочий процесс недоступен - Telegram повторит доставку
+            stats["worker_errors"] += 1
+            logger.warning("⚠️ Рабочий процесс %d недоступен: %s", index, e)
+            return web.Response(status=502)
+        stats["forwarded"] += 1
+        stats["per_worker"][index] += 1
+        return web.Response(status=status)
+
+    async def collect_stats(request: web.Request) -> web.Response:
+        workers = []
+        for url in worker_urls:
+            try:
+                async with router["session"].get(url.replace(WEBHOOK_PATH, "/stats")) as response:
+                    workers.append(await response.json())
+            except aiohttp.ClientError:
+                workers.append(None)
+        return web.json_response({"router": {**stats, **serializer.get_stats()}, "workers": workers})
+
+    async def on_startup(web_app: web.Application):
+        web_app["session"] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=10),
+        )
+
+    async def on_cleanup(web_app: web.Application):
+        await web_app["session"].close()
+
+    router = web.Application()
+    router.router.add_post(WEBHOOK_PATH, handle_update)
+    router.router.add_get("/stats", collect_stats)
+    router.on_startup.append(on_startup)
+    router.on_cleanup.append(on_cleanup)
+    return router
+
+
+async def set_webhook(app, url: str, secret: str):
+    bot = app.bot
+    try:
+        await bot.set_webhook(url, secret_token=secret or None)
+        logger.info("🔗 Webhook зарегистрирован: %s", url)
+    finally:
+        await bot.session.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Бот в webhook-режиме с несколькими рабочими процессами")
+    arg_parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    arg_parser.add_argument("--host", default="0.0.0.0")
+    arg_parser.add_argument("--port", type=int, default=8080)
+    arg_parser.add_argument("--worker-base-port", type=int, default=8100, help="порты рабочих: base, base+1, ...")
+    arg_parser.add_argument("--url", default=None, help="публичный адрес webhook для регистрации в Telegram")
+    arg_parser.add_argument("--secret", default=None, help="секрет X-Telegram-Bot-Api-Secret-Token")
+    arg_parser.add_argument("--telegram-api-url", default=None, help="локальный Bot API сервер или заглушка")
+    arg_parser.add_argument("--gpt-url", default=None, help="completion-эндпоинт YandexGPT (например, заглушка)")
+    arg_parser.add_argument("--max-pending", type=int, default=1000, help="лимит необработанных обновлений на процесс")
+    args = arg_parser.parse_args()
+
+    from app_container import AppContainer
+    overrides = {}
+    if args.telegram_api_url:
+        overrides['TELEGRAM_API_URL'] = args.telegram_api_url
+    if args.gpt_url:
+        overrides['YANDEX_GPT_URL'] = args.gpt_url
+    app = AppContainer(overrides)
+    logs.setup_from_settings(app)
+    secret = args.secret or app.setting('WEBHOOK_SECRET', '')
+    # Лимиты Nominatim, Telegram (на бота) и квоты YandexGPT общие на все процессы
+    overrides['GEOCODER_RATE'] = app.setting('GEOCODER_RATE', 1.0) / args.workers
+    overrides['TELEGRAM_GLOBAL_RATE'] = app.setting('TELEGRAM_GLOBAL_RATE', 30.0) / args.workers
+    overrides['YANDEX_GPT_RPS'] = app.setting('YANDEX_GPT_RPS', 10.0) / args.workers
+    overrides['YANDEX_GPT_TOKENS_PER_MINUTE'] = app.setting('YANDEX_GPT_TOKENS_PER_MINUTE', 0) / args.workers
+    # Рабочие процессы отдают /metrics на своих портах, отдельный сервер метрик им не нужен
+    overrides['METRICS_PORT'] = 0
+
+    # Снимок каталога и матрицу расстояний готовим один раз, до запуска рабочих процессов
+    logger.info("📍 Каталог готов: %d мест", len(app.route_optimizer.landmarks))
+    if args.url:
+        asyncio.run(set_webhook(app, args.url, secret))
+
+    worker_secret = secrets.token_hex(16)
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    worker_urls = []
+    for index in range(args.workers):
+        port = args.worker_base_port + index
+        # Не daemon: рабочему процессу нужен свой пул процессов маршрутов (RoutingService), а daemon-процессам
+        # запрещено создавать дочерние. Остановка - явно в finally ниже
+        process = context.Process(target=run_worker, args=(index, "127.0.0.1", port, worker_secret, overrides,
+                                                           args.max_pending))
+        process.start()
+        workers.append(process)
+        worker_urls.append(f"http://127.0.0.1:{port}{WEBHOOK_PATH}")
+
+    logger.info("🚦 Маршрутизатор webhook: http://%s:%s%s -> %d процессов", args.host, args.port, WEBHOOK_PATH, args.workers)
+    try:
+        web.run_app(create_router_app(worker_urls, secret, worker_secret), host=args.host, port=args.port, print=None)
+    finally:
+        # SIGTERM: aiohttp в рабочем процессе штатно останавливается (дописывает очередь, закрывает пул маршрутов)
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join(timeout=20)
+            if process.is_alive():
+                logger.warning("⚠️ Рабочий процесс %s не остановился, завершаем принудительно", process.pid)
+                process.kill()
+                process.join()
+
+
+if __name__ == "__main__":
+    main()
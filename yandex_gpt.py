@@ -1,63 +1,519 @@
-from typing import List, Tuple
+from typing import List, Tuple, Optional
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import random
+import re
+import time
 import urllib.parse
+from collections import deque
 import aiohttp
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from llm_cache import LLMCache
+from description_store import DescriptionStore
+from rate_limit import TokenBucket
+from tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+
+# Пакетный запрос текстов маршрута: ключ JSON-строки, границы годного текста и бюджет ответа
+ROUTE_TEXT_KEY = re.compile(r'"(recommendation|\d+)"\s*:\s*"')
+ROUTE_TEXT_MIN_LENGTH = 20
+ROUTE_TEXT_MAX_LENGTH = 1500
+ROUTE_TEXT_TOKENS = 200
+ROUTE_TEXTS_MAX_TOKENS = 2000
+# Тело ответа с ошибкой API в журнале обрезается до этой длины
+ERROR_TEXT_LOG_LIMIT = 500
+
+
+class GPTScheduler:
+    #Общая очередь запросов к YandexGPT: лимиты запросов в секунду и токенов в минуту, приоритеты,
+    #отбрасывание запросов, которые уже не успеют к дедлайну, и повторы с джиттером при 429/5xx
+    # Меньше - раньше: вступление и первое место маршрута, затем остальные места по порядку, затем фоновые задачи
+    PRIORITY_FIRST = 0
+    PRIORITY_BATCH = 100
+
+    def __init__(self, requests_per_second: float = 10.0, tokens_per_minute: float = 0.0, max_concurrency: int = 5,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0):
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Запросы - равномерно, без всплесков: квота считается в скользящем окне
+        self.request_bucket = TokenBucket(requests_per_second, 1) if requests_per_second > 0 else None
+        self.token_bucket = TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute > 0 else None
+        # Оценка времени ответа API (скользящее среднее) - по ней видно, что запрос к дедлайну уже не успеет
+        self.latency_estimate = 0.0
+        # Для потоков к дедлайну важен первый фрагмент, а не весь ответ: отдельная оценка
+        self.first_chunk_estimate = 0.0
+        self.active = 0
+        self.queued = 0
+        self._queue = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._waits = deque(maxlen=1000)
+        self.stats = {"submitted": 0, "started": 0, "dropped": 0, "cancelled": 0, "retries": 0, "throttled": 0,
+                      "server_errors": 0, "peak_queue": 0, "tokens_reserved": 0, "tokens_used": 0,
+                      "lanes": {"interactive": 0, "batch": 0}}
+
+    @staticmethod
+    def estimate_tokens(data: dict) -> int:
+        #Токены запроса с запасом: ~3 символа русского текста на токен плюс максимум ответа
+        prompt_chars = sum(len(message["text"]) for message in data["messages"])
+        return prompt_chars // 3 + int(data["completionOptions"].get("maxTokens", 0))
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def acquire(self, priority: int = PRIORITY_FIRST, deadline: Optional[float] = None, tokens: int = 0,
+                      stream: bool = False) -> bool:
+        #Ждет своей очереди; False - запрос отброшен (к дедлайну уже не успеть).
+        #stream - потоковый запрос: к дедлайну должен успеть первый фрагмент ответа
+        self._ensure_dispatcher()
+        turn = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), deadline, tokens, time.monotonic(), turn, stream))
+        self.queued += 1
+        self.stats["submitted"] += 1
+        self.stats["lanes"]["batch" if priority >= self.PRIORITY_BATCH else "interactive"] += 1
+        self.stats["peak_queue"] = max(self.stats["peak_queue"], self.queued)
+        self._wakeup.set()
+        try:
+            return await turn
+        except asyncio.CancelledError:
+            if turn.done() and not turn.cancelled():
+                # Очередь подошла одновременно с отменой - слот освобождаем сразу
+                if turn.result():
+                    self.release()
+            else:
+                turn.cancel()
+                self.stats["cancelled"] += 1
+            raise
+        finally:
+            self.queued -= 1
+
+    @staticmethod
+    def _moving_average(estimate: float, value: float) -> float:
+        return value if not estimate else 0.8 * estimate + 0.2 * value
+
+    def release(self, latency: Optional[float] = None, first_chunk: Optional[float] = None):
+        #Запрос к API завершен: слот свободен, оценка времени ответа обновлена.
+        #Потоки передают только first_chunk: их полное время включает чтение ответа вызывающим кодом
+        self.active -= 1
+        if latency is not None:
+            self.latency_estimate = self._moving_average(self.latency_estimate, latency)
+        if first_chunk is not None:
+            self.first_chunk_estimate = self._moving_average(self.first_chunk_estimate, first_chunk)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def expected_latency(self, stream: bool = False) -> float:
+        #Сколько ждать ответа (для потока - первого фрагмента); до первого потока - по обычным запросам
+        if stream and self.first_chunk_estimate:
+            return self.first_chunk_estimate
+        return self.latency_estimate
+
+    def _pop(self):
+        #Следующий живой запрос с наивысшим приоритетом; просроченные отбрасываются
+        while self._queue:
+            entry = heapq.heappop(self._queue)
+            deadline, turn, stream = entry[2], entry[5], entry[6]
+            if turn.done():
+                continue
+            if deadline is not None and time.monotonic() + self.expected_latency(stream) > deadline:
+                self.stats["dropped"] += 1
+                turn.set_result(False)
+                continue
+            return entry
+        return None
+
+    async def _dispatch(self):
+        while True:
+            while not self._queue or self.active >= self.max_concurrency:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            # Сначала ждем лимит, потом выбираем запрос - пока ждали, мог прийти более срочный
+            if self.request_bucket is not None:
+                await self.request_bucket.acquire()
+            entry = self._pop()
+            if entry is None:
+                if self.request_bucket is not None:
+                    self.request_bucket.refund()
+                continue
+            tokens, queued_at, turn = entry[3], entry[4], entry[5]
+            if self.token_bucket is not None and tokens:
+                await self.token_bucket.acquire(tokens)
+                if turn.done():
+                    self.token_bucket.refund(tokens)
+                    continue
+            self.stats["tokens_reserved"] += tokens
+            self.stats["started"] += 1
+            self.active += 1
+            self._waits.append(time.monotonic() - queued_at)
+            turn.set_result(True)
+
+    def record_usage(self, reserved: int, used: Optional[int]):
+        #Фактический расход токенов из ответа API; излишек резерва возвращается в лимит
+        if used is None:
+            return
+        self.stats["tokens_used"] += used
+        if self.token_bucket is not None and reserved > used:
+            self.token_bucket.refund(reserved - used)
+
+    def retry_delay(self, attempt: int, status: Optional[int], retry_after: Optional[float] = None,
+                    deadline: Optional[float] = None, stream: bool = False) -> Optional[float]:
+        #Пауза перед повтором (экспоненциальная, со случайным джиттером) или None, если повторять не стоит
+        if status == 429:
+            self.stats["throttled"] += 1
+        elif status is not None:
+            self.stats["server_errors"] += 1
+        if attempt >= self.max_retries:
+            return None
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after:
+            delay = max(delay, retry_after)
+        if status == 429 and self.request_bucket is not None:
+            # Квота исчерпана - притормаживаем все запросы, а не только этот
+            self.request_bucket.pause(delay)
+        if deadline is not None and time.monotonic() + delay + self.expected_latency(stream) > deadline:
+            return None
+        self.stats["retries"] += 1
+        return delay
+
+    def get_stats(self) -> dict:
+        waits = sorted(self._waits)
+        return {
+            **self.stats,
+            "lanes": dict(self.stats["lanes"]),
+            "queue_depth": self.queued,
+            "active": self.active,
+            "wait_p50_ms": waits[len(waits) // 2] * 1000 if waits else 0.0,
+            "wait_p95_ms": waits[int(len(waits) * 0.95) - 1] * 1000 if len(waits) > 1 else (waits[-1] * 1000 if waits else 0.0),
+            "wait_max_ms": waits[-1] * 1000 if waits else 0.0,
+            "latency_estimate_ms": self.latency_estimate * 1000,
+            "first_chunk_estimate_ms": self.first_chunk_estimate * 1000,
+        }
+
+    async def close(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        # Ожидающие запросы отменяем - их вызывающие получат None от generate_text
+        for entry in self._queue:
+            if not entry[5].done():
+                entry[5].set_result(False)
+        self._queue.clear()
+
 
 class YandexGPT:
-    def __init__(self, api_key: str, folder_id: str, LANDMARKS):
+    DEFAULT_DESCRIPTION = "Интересное место для посещения."
+    DEFAULT_RECOMMENDATION = "Отличный маршрут для вас! Наслаждайтесь прогулкой по Нижнему Новгороду! 🌆"
+
+    def __init__(self, api_key: str, folder_id: str, LANDMARKS,
+                 max_connections: int = 20, limit_per_host: int = 10, keepalive_timeout: float = 60.0,
+                 cache: Optional[LLMCache] = None, pregenerated: Optional[DescriptionStore] = None,
+                 scheduler: Optional[GPTScheduler] = None):
         self.api_key = api_key
         self.folder_id = folder_id
         self.url = "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
         self.LANDMARKS = LANDMARKS
+        # Кэш ответов (описания мест повторяются между пользователями)
+        self.cache = cache
+        # Заранее сгенерированные описания (см. pregenerate.py) - отдаются без запроса к API
+        self.pregenerated = pregenerated
+        # Все запросы к API идут через общую очередь с лимитами и приоритетами
+        self.scheduler = scheduler or GPTScheduler()
+
+        # Пул соединений живет вместе с экземпляром (открывается в start(), закрывается в close())
+        self.max_connections = max_connections
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+        self.pool_stats = {
+            "requests": 0,
+            "active": 0,
+            "peak_active": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "queued": 0,
+        }
+
+    def _create_trace_config(self) -> aiohttp.TraceConfig:
+        #Счетчики новых/переиспользованных соединений и ожиданий свободного слота в пуле
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_connection_create_end(session, ctx, params):
+            self.pool_stats["connections_created"] += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            self.pool_stats["connections_reused"] += 1
+
+        async def on_connection_queued_start(session, ctx, params):
+            self.pool_stats["queued"] += 1
+
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        return trace_config
+
+    async def start(self):
+        #Открытие долгоживущей сессии с keep-alive и ограничением соединений
+        async with self._session_lock:
+            if self._session is not None and not self._session.closed:
+                return
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=30),
+                trace_configs=[self._create_trace_config()],
+            )
+
+    async def close(self):
+        #Закрытие пула соединений
+        async with self._session_lock:
+            if self._session is not None and not self._session.closed:
+                await self._session.close()
+            self._session = None
+        await self.scheduler.close()
+        if self.cache is not None:
+            # Ответы, еще не записанные потоком кэша, не должны потеряться при остановке
+            await asyncio.to_thread(self.cache.flush)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    def get_pool_stats(self) -> dict:
+        #Статистика использования пула соединений
+        stats = dict(self.pool_stats)
+        stats["max_connections"] = self.max_connections
+        stats["limit_per_host"] = self.limit_per_host
+        stats["open"] = self._session is not None and not self._session.closed
+        return stats
     
-    async def generate_text(self, prompt: str, temperature: float = 0.3) -> str:
-        #Генерация текста через YandexGPT
+    def get_scheduler_stats(self) -> dict:
+        #Глубина очереди, ожидание, отброшенные и повторные запросы
+        return self.scheduler.get_stats()
+
+    def get_cache_stats(self) -> dict:
+        return self.cache.get_stats() if self.cache else {}
+
+    async def invalidate_cache(self, namespace: Optional[str] = None) -> int:
+        #Сброс кэша при изменении таблицы с достопримечательностями
+        return await self.cache.ainvalidate(namespace) if self.cache else 0
+
+    def _build_request(self, prompt: str, temperature: float, max_tokens: int = 1000) -> Tuple[dict, dict]:
+        #Заголовки и тело запроса к completion-эндпоинту
+        headers = {
+            "Authorization": f"Api-Key {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        data = {
+            "modelUri": f"gpt://{self.folder_id}/yandexgpt-lite",
+            "completionOptions": {
+                "stream": False,
+                "temperature": temperature,
+                "maxTokens": max_tokens
+            },
+            "messages": [
+                {
+                    "role": "system",
+                    "text": """Ты - профессиональный гид по Нижнему Новгороду. 
+                    Твоя задача - создавать интересные, информативные и увлекательные описания 
+                    достопримечательностей. Будь краток, но информативен. 
+                    Используй интересные факты и исторические детали."""
+                },
+                {
+                    "role": "user",
+                    "text": prompt
+                }
+            ]
+        }
+        return headers, data
+
+    def _start_request(self):
+        self.pool_stats["requests"] += 1
+        self.pool_stats["active"] += 1
+        self.pool_stats["peak_active"] = max(self.pool_stats["peak_active"], self.pool_stats["active"])
+
+    def _retry_delay(self, attempt: int, status: Optional[int], error_text: str, retry_after: Optional[float],
+                     deadline: Optional[float], stream: bool = False) -> Optional[float]:
+        #Пауза перед повтором; None - не повторяем (ошибка запроса, попытки или время кончились)
+        logger.warning("❌ YandexGPT API error: %s - %s", status, error_text[:ERROR_TEXT_LOG_LIMIT],
+                       extra={"status": status, "attempt": attempt})
+        # Повторяем только перегрузку (429), ошибки сервера и сбои сети
+        if status is not None and status != 429 and status < 500:
+            return None
+        return self.scheduler.retry_delay(attempt, status, retry_after, deadline, stream)
+
+    @staticmethod
+    def _retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+        value = response.headers.get("Retry-After", "")
+        return float(value) if value.isdigit() else None
+
+    async def generate_text(self, prompt: str, temperature: float = 0.3, cache_namespace: Optional[str] = None,
+                            priority: int = GPTScheduler.PRIORITY_FIRST, deadline: Optional[float] = None) -> str:
+        #Генерация текста через YandexGPT (с кэшем, если указан cache_namespace);
+        #deadline - момент time.monotonic(), после которого ответ уже не нужен
         try:
-            headers = {
-                "Authorization": f"Api-Key {self.api_key}",
-                "Content-Type": "application/json"
-            }
+            headers, data = self._build_request(prompt, temperature)
             
-            data = {
-                "modelUri": f"gpt://{self.folder_id}/yandexgpt-lite",
-                "completionOptions": {
-                    "stream": False,
-                    "temperature": temperature,
-                    "maxTokens": 1000
-                },
-                "messages": [
-                    {
-                        "role": "system",
-                        "text": """Ты - профессиональный гид по Нижнему Новгороду. 
-                        Твоя задача - создавать интересные, информативные и увлекательные описания 
-                        достопримечательностей. Будь краток, но информативен. 
-                        Используй интересные факты и исторические детали."""
-                    },
-                    {
-                        "role": "user",
-                        "text": prompt
-                    }
-                ]
-            }
+            cache_key = None
+            if self.cache is not None and cache_namespace:
+                cache_key = LLMCache.make_key(data)
+                cached = await self.cache.aget(cache_key)
+                if cached is not None:
+                    return cached
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.url, headers=headers, json=data, timeout=30) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result['result']['alternatives'][0]['message']['text']
-                    else:
-                        error_text = await response.text()
-                        print(f"❌ YandexGPT API error: {response.status} - {error_text}")
-                        return None
+            reserved_tokens = self.scheduler.estimate_tokens(data)
+            for attempt in range(self.scheduler.max_retries + 1):
+                queue_span = start_span("gpt.queue", priority=priority)
+                admitted = await self.scheduler.acquire(priority, deadline, reserved_tokens)
+                queue_span.finish(dropped=not admitted)
+                if not admitted:
+                    logger.warning("⏱️ Запрос к YandexGPT отброшен: не успеет к дедлайну", extra={"priority": priority})
+                    return None
+                
+                status, retry_after = None, None
+                started = time.monotonic()
+                request_span = start_span("gpt.request", attempt=attempt, stream=False)
+                try:
+                    session = await self._get_session()
+                    self._start_request()
+                    try:
+                        async with session.post(self.url, headers=headers, json=data) as response:
+                            status = response.status
+                            if response.status == 200:
+                                result = await response.json()
+                                text = result['result']['alternatives'][0]['message']['text']
+                                used_tokens = result['result'].get('usage', {}).get('totalTokens')
+                                self.scheduler.record_usage(reserved_tokens, int(used_tokens) if used_tokens else None)
+                                if cache_key is not None:
+                                    self.cache.set(cache_key, text, namespace=cache_namespace)
+                                return text
+                            error_text = await response.text()
+                            retry_after = self._retry_after(response)
+                    finally:
+                        self.pool_stats["active"] -= 1
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error_text = str(e) or type(e).__name__
+                finally:
+                    self.scheduler.release(time.monotonic() - started)
+                    request_span.finish(status=status)
+                
+                delay = self._retry_delay(attempt, status, error_text, retry_after, deadline)
+                if delay is None:
+                    return None
+                await asyncio.sleep(delay)
+            return None
                         
         except Exception as e:
-            print(f"❌ YandexGPT error: {e}")
+            logger.error("❌ YandexGPT error: %s", e)
             return None
-    
-    async def enhance_landmark_description(self, landmark_name: str, original_data: dict, user_interest: str = "") -> str:
-        #Улучшение описания достопримечательности с помощью YandexGPT
+
+    async def stream_text(self, prompt: str, temperature: float = 0.3, cache_namespace: Optional[str] = None,
+                          priority: int = GPTScheduler.PRIORITY_FIRST, deadline: Optional[float] = None,
+                          max_tokens: int = 1000):
+        #Потоковая генерация (stream=True): асинхронный генератор накопленного текста по мере прихода частей.
+        #До первой части ошибки повторяются как в generate_text; если ничего не пришло - генератор пустой
+        headers, data = self._build_request(prompt, temperature, max_tokens)
+        cache_key = None
+        if self.cache is not None and cache_namespace:
+            # Ключ кэша - как у обычного запроса: потоковый и обычный ответы взаимозаменяемы
+            cache_key = LLMCache.make_key(data)
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                yield cached
+                return
         
-        prompt = f"""
+        reserved_tokens = self.scheduler.estimate_tokens(data)
+        data["completionOptions"]["stream"] = True
+        for attempt in range(self.scheduler.max_retries + 1):
+            queue_span = start_span("gpt.queue", priority=priority)
+            admitted = await self.scheduler.acquire(priority, deadline, reserved_tokens, stream=True)
+            queue_span.finish(dropped=not admitted)
+            if not admitted:
+                logger.warning("⏱️ Запрос к YandexGPT отброшен: не успеет к дедлайну", extra={"priority": priority})
+                return
+            
+            status, retry_after, text, first_chunk = None, None, "", None
+            started = time.monotonic()
+            # Спан без переключения контекста: между yield управление у вызывающего
+            request_span = start_span("gpt.request", attempt=attempt, stream=True)
+            try:
+                session = await self._get_session()
+                self._start_request()
+                try:
+                    async with session.post(self.url, headers=headers, json=data) as response:
+                        status = response.status
+                        if response.status == 200:
+                            # Ответ - JSON-объекты по строке, в каждом весь текст, накопленный к этому моменту
+                            usage = {}
+                            async for line in response.content:
+                                if not line.strip():
+                                    continue
+                                result = json.loads(line).get('result', {})
+                                usage = result.get('usage') or usage
+                                alternatives = result.get('alternatives') or [{}]
+                                chunk = alternatives[0].get('message', {}).get('text', "")
+                                if chunk and chunk != text:
+                                    if not text:
+                                        first_chunk = time.monotonic() - started
+                                        request_span.set(first_chunk_ms=round(first_chunk * 1000, 1))
+                                    text = chunk
+                                    yield text
+                            used_tokens = usage.get('totalTokens')
+                            self.scheduler.record_usage(reserved_tokens, int(used_tokens) if used_tokens else None)
+                            if text and cache_key is not None:
+                                self.cache.set(cache_key, text, namespace=cache_namespace)
+                            return
+                        error_text = await response.text()
+                        retry_after = self._retry_after(response)
+                finally:
+                    self.pool_stats["active"] -= 1
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                if text:
+                    # Часть ответа пользователь уже видит - повтор начал бы текст заново
+                    logger.warning("❌ YandexGPT: поток оборвался: %s", e)
+                    return
+                error_text = str(e) or type(e).__name__
+            finally:
+                self.scheduler.release(first_chunk=first_chunk)
+                request_span.finish(status=status, chars=len(text))
+            
+            delay = self._retry_delay(attempt, status, error_text, retry_after, deadline, stream=True)
+            if delay is None:
+                return
+            await asyncio.sleep(delay)
+    
+    def get_ready_description(self, landmark_name: str, original_data: dict, user_interest: str = "") -> Optional[str]:
+        #Описание из заранее сгенерированного файла (без обращения к API)
+        if self.pregenerated is None:
+            return None
+        return self.pregenerated.get(landmark_name, original_data, user_interest)
+
+    @staticmethod
+    def _description_prompt(landmark_name: str, original_data: dict, user_interest: str = "") -> str:
+        return f"""
         Создай краткое и увлекательное описание достопримечательности для туриста.
         
         Название: {landmark_name}
@@ -76,13 +532,36 @@ class YandexGPT:
         
         Результат:
         """
+
+    async def enhance_landmark_description(self, landmark_name: str, original_data: dict, user_interest: str = "",
+                                           use_fallback: bool = True, priority: int = GPTScheduler.PRIORITY_FIRST,
+                                           deadline: Optional[float] = None) -> str:
+        #Улучшение описания достопримечательности с помощью YandexGPT
         
-        enhanced_description = await self.generate_text(prompt)
-        return enhanced_description or original_data.get('description', 'Интересное место для посещения.')
-    
-    async def generate_personal_recommendation(self, route: List[str], user_interest: str, available_time: str) -> str:
-        #Генерация персонализированной рекомендации для маршрута
+        ready_description = self.get_ready_description(landmark_name, original_data, user_interest)
+        if ready_description:
+            return ready_description
         
+        prompt = self._description_prompt(landmark_name, original_data, user_interest)
+        enhanced_description = await self.generate_text(prompt, cache_namespace="landmark_description",
+                                                        priority=priority, deadline=deadline)
+        if not use_fallback:
+            return enhanced_description
+        return enhanced_description or original_data.get('description', self.DEFAULT_DESCRIPTION)
+
+    async def stream_landmark_description(self, landmark_name: str, original_data: dict, user_interest: str = "",
+                                          priority: int = GPTScheduler.PRIORITY_FIRST, deadline: Optional[float] = None):
+        #Описание места по мере генерации (готовое описание отдается сразу)
+        ready_description = self.get_ready_description(landmark_name, original_data, user_interest)
+        if ready_description:
+            yield ready_description
+            return
+        prompt = self._description_prompt(landmark_name, original_data, user_interest)
+        async for text in self.stream_text(prompt, cache_namespace="landmark_description", priority=priority,
+                                           deadline=deadline):
+            yield text
+
+    def _recommendation_prompt(self, route: List[str], user_interest: str, available_time: str) -> str:
         landmarks_info = []
         LANDMARKS = self.LANDMARKS
         for landmark in route[:3]:  # Берем первые 3 для контекста
@@ -90,7 +569,7 @@ class YandexGPT:
                 data = LANDMARKS[landmark]
                 landmarks_info.append(f"{landmark} ({data.get('category', 'достопримечательность')})")
         
-        prompt = f"""
+        return f"""
         Создай краткое персонализированное введение для туристического маршрута.
         
         Интересы пользователя: {user_interest}
@@ -106,9 +585,126 @@ class YandexGPT:
         
         Результат:
         """
+    
+    async def generate_personal_recommendation(self, route: List[str], user_interest: str, available_time: str,
+                                               deadline: Optional[float] = None) -> str:
+        #Генерация персонализированной рекомендации для маршрута
+        prompt = self._recommendation_prompt(route, user_interest, available_time)
+        recommendation = await self.generate_text(prompt, temperature=0.7, deadline=deadline)
+        return recommendation or self.DEFAULT_RECOMMENDATION
+
+    def stream_personal_recommendation(self, route: List[str], user_interest: str, available_time: str,
+                                       deadline: Optional[float] = None):
+        #Рекомендация по мере генерации
+        prompt = self._recommendation_prompt(route, user_interest, available_time)
+        return self.stream_text(prompt, temperature=0.7, deadline=deadline)
+
+    def _description_cache_key(self, landmark_name: str, original_data: dict, user_interest: str) -> str:
+        # Тот же ключ, что у отдельного запроса описания, - пакетный и отдельный ответы взаимозаменяемы
+        _, data = self._build_request(self._description_prompt(landmark_name, original_data, user_interest), 0.3)
+        return LLMCache.make_key(data)
+
+    async def get_cached_description(self, landmark_name: str, original_data: dict, user_interest: str = "") -> Optional[str]:
+        #Готовое описание: предгенерированное или из кэша ответов
+        ready = self.get_ready_description(landmark_name, original_data, user_interest)
+        if ready or self.cache is None:
+            return ready
+        return await self.cache.aget(self._description_cache_key(landmark_name, original_data, user_interest))
+
+    def _route_texts_prompt(self, route: List[str], stops: List[int], user_interest: str, available_time: str) -> str:
+        lines = []
+        for position in stops:
+            landmark = route[position]
+            data = self.LANDMARKS.get(landmark, {})
+            lines.append(
+                f"{position + 1}. {landmark} ({data.get('category', 'достопримечательность')}). "
+                f"Особенности: {', '.join(data.get('features', [])) or 'нет'}. "
+                f"Описание: {data.get('description', 'нет описания')}"
+            )
+        keys = ", ".join(f'"{position + 1}"' for position in stops)
+        stops_text = "\n".join(lines)
+        return f"""
+        Подготовь тексты для туристического маршрута.
+        
+        Интересы пользователя: {user_interest}
+        Доступное время: {available_time}
+        Точки маршрута по порядку: {', '.join(route)}
+        
+        Места, для которых нужны описания:
+        {stops_text}
+        
+        Ответь только JSON-объектом без пояснений и разметки, с ключами "recommendation", {keys}.
+        "recommendation" - персонализированное введение к маршруту: 1-2 предложения приветствия,
+        2-3 предложения о том, что ждет пользователя, соответствие интересам, дружелюбный тон,
+        мотивационная фраза в конце.
+        Ключ с номером места - краткое увлекательное описание этого места для туриста: 2-3 предложения,
+        интересные факты или исторические детали, почему стоит посетить, без маркеров списка.
+        
+        Результат:
+        """
+
+    @staticmethod
+    def parse_route_texts(text: str) -> dict:
+        #Значения "ключ": "строка" из (возможно, еще недописанного) JSON-ответа: {ключ: (текст, дописан ли)}
+        values = {}
+        position = 0
+        while True:
+            match = ROUTE_TEXT_KEY.search(text, position)
+            if match is None:
+                return values
+            start = match.end()
+            end = start
+            while end < len(text) and text[end] != '"':
+                end += 2 if text[end] == "\\" else 1
+            complete = end < len(text)
+            raw = text[start:min(end, len(text))]
+            if not complete and raw.endswith("\\"):
+                raw = raw[:-1]
+            try:
+                value = json.loads(f'"{raw}"', strict=False)
+            except ValueError:
+                # Недописанная escape-последовательность (например, \u04) - показываем без нее
+                value = raw.replace("\\n", "\n").split("\\")[0]
+            values[match.group(1)] = (value, complete)
+            position = end + 1
+
+    @staticmethod
+    def valid_route_text(value) -> bool:
+        #Годится ли текст из пакетного ответа (иначе - отдельный запрос)
+        return isinstance(value, str) and ROUTE_TEXT_MIN_LENGTH <= len(value.strip()) <= ROUTE_TEXT_MAX_LENGTH
+
+    async def stream_route_texts(self, route: List[str], stops: List[int], user_interest: str, available_time: str,
+                                 deadline: Optional[float] = None):
+        #Рекомендация и описания мест stops (позиции в route) одним запросом вместо 1 + N:
+        #асинхронный генератор снимков {"recommendation" | "<номер места>": (текст, дописан ли)}.
+        #Годные описания сохраняются в кэш под ключами отдельных запросов
+        prompt = self._route_texts_prompt(route, stops, user_interest, available_time)
+        max_tokens = min(ROUTE_TEXTS_MAX_TOKENS, ROUTE_TEXT_TOKENS * (len(stops) + 1))
+        text = ""
+        batch_span = start_span("gpt.batch", stops=len(stops))
+        try:
+            async for text in self.stream_text(prompt, temperature=0.5, deadline=deadline, max_tokens=max_tokens):
+                yield self.parse_route_texts(text)
+        finally:
+            batch_span.finish(chars=len(text))
         
-        recommendation = await self.generate_text(prompt, temperature=0.7)
-        return recommendation or f"Отличный маршрут для вас! Наслаждайтесь прогулкой по Нижнему Новгороду! 🌆"
+        values = self.parse_route_texts(text)
+        # Полный ответ разбираем как JSON: так отсекаются обрывки и лишний текст вокруг объекта
+        try:
+            parsed = json.loads(text[text.index("{"):text.rindex("}") + 1], strict=False)
+            if isinstance(parsed, dict):
+                values = {key: (value, True) for key, value in parsed.items()}
+        except ValueError:
+            pass
+        final = {key: value for key, (value, complete) in values.items() if complete and self.valid_route_text(value)}
+        if self.cache is not None:
+            for position in stops:
+                description = final.get(str(position + 1))
+                if description:
+                    landmark = route[position]
+                    self.cache.set(self._description_cache_key(landmark, self.LANDMARKS.get(landmark, {}), user_interest),
+                                   description.strip(), namespace="landmark_description")
+        yield {key: (value.strip(), True) for key, value in final.items()}
 
 
 class YandexMaps: